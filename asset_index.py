@@ -0,0 +1,219 @@
+"""Index of asset IDs across all addon folders, used to find collisions.
+
+When two addons define the same block, item or biome the game silently keeps
+whichever is loaded last. The index maps every addon (including the base
+`cubyz` folder) to the IDs it defines so collisions can be reported before
+anyone starts a server.
+
+An asset's ID is its path inside the content folder without the data file
+extension: `blocks/ores/copper.zig.zon` defines the block `ores/copper`.
+Files starting with `_` (such as `_defaults.zig.zon`) are not assets.
+
+The index is stored in the manager's state folder. `install_addon` and
+`uninstall_addon` update the entry of the single addon they touch, from the
+installed folder, whatever the install came from; only the first install or
+query (or `--rebuild`) scans the whole assets root. Before an install
+writes anything, `install_conflicts` checks the IDs of the incoming addon
+(read from a folder, a zip's central directory or a staged tarball)
+against the index.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .core import state_dir
+
+ID_FOLDERS = ("blocks", "items", "biomes")
+DATA_SUFFIXES = (".zig.zon", ".zon", ".json")
+INDEX_FILE = "asset_index.json"
+INDEX_VERSION = 1
+
+AssetKey = Tuple[str, str]  # (folder, id)
+
+
+def asset_id(relative: str) -> Optional[Tuple[str, str]]:
+    """Map a path relative to the addon root to its (folder, id), if it is an asset."""
+    parts = relative.replace("\\", "/").strip("/").split("/")
+    if len(parts) < 2 or parts[0] not in ID_FOLDERS or parts[-1].startswith("_"):
+        return None
+    lower = parts[-1].lower()
+    for suffix in DATA_SUFFIXES:
+        if lower.endswith(suffix):
+            parts[-1] = parts[-1][:-len(suffix)]
+            return parts[0], "/".join(parts[1:])
+    return None
+
+
+def scan_ids(addon_path: Path) -> Dict[str, List[str]]:
+    """Return the IDs defined by an addon folder, grouped by content folder."""
+    ids: Dict[str, List[str]] = {}
+    for folder in ID_FOLDERS:
+        top = addon_path / folder
+        if not top.is_dir():
+            continue
+        for dirpath, _, filenames in os.walk(top):
+            rel_dir = os.path.relpath(dirpath, addon_path)
+            for fn in filenames:
+                key = asset_id(os.path.join(rel_dir, fn))
+                if key:
+                    ids.setdefault(key[0], []).append(key[1])
+    for values in ids.values():
+        values.sort()
+    return ids
+
+
+def ids_from_names(names: Iterable[str]) -> Dict[str, List[str]]:
+    """Like `scan_ids`, but for member names of an archive (already relative to the addon root)."""
+    ids: Dict[str, List[str]] = {}
+    for name in names:
+        key = asset_id(name)
+        if key:
+            ids.setdefault(key[0], []).append(key[1])
+    return ids
+
+
+class AssetIndex:
+    """Persistent addon -> asset ID mapping with an inverted ID -> addons view."""
+
+    def __init__(self, assets_root: Path):
+        self.assets_root = assets_root
+        self.path = state_dir(assets_root) / INDEX_FILE
+        self.addons: Dict[str, Dict[str, List[str]]] = {}
+        self._owners: Optional[Dict[AssetKey, List[str]]] = None
+
+    @classmethod
+    def load(cls, assets_root: Path, rebuild: bool = False, sync: bool = True) -> "AssetIndex":
+        """Load the saved index, building it from scratch when missing or `rebuild`.
+
+        With `sync`, addon folders added or removed since the last save are
+        picked up as well.
+        """
+        index = cls(assets_root)
+        if not rebuild and index.path.exists():
+            try:
+                data = json.loads(index.path.read_text(encoding="utf-8"))
+                if data.get("version") == INDEX_VERSION:
+                    index.addons = data["addons"]
+                    if sync:
+                        index.sync()
+                    return index
+            except (OSError, ValueError, KeyError):
+                pass
+        index.rebuild()
+        return index
+
+    def _addon_dirs(self) -> List[Path]:
+        if not self.assets_root.exists():
+            return []
+        return [p for p in self.assets_root.iterdir() if p.is_dir()]
+
+    def rebuild(self) -> None:
+        self.addons = {p.name: scan_ids(p) for p in self._addon_dirs()}
+        self._owners = None
+        self.save()
+
+    def sync(self) -> None:
+        """Pick up addon folders added or removed behind the manager's back.
+
+        This only lists the assets root; edits inside an already indexed addon
+        need `update_addon` or a rebuild.
+        """
+        present = {p.name: p for p in self._addon_dirs()}
+        changed = False
+        for name in set(self.addons) - set(present):
+            del self.addons[name]
+            changed = True
+        for name in set(present) - set(self.addons):
+            self.addons[name] = scan_ids(present[name])
+            changed = True
+        if changed:
+            self._owners = None
+            self.save()
+
+    def update_addon(self, name: str) -> None:
+        self.addons[name] = scan_ids(self.assets_root / name)
+        self._owners = None
+
+    def remove_addon(self, name: str) -> None:
+        if self.addons.pop(name, None) is not None:
+            self._owners = None
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": INDEX_VERSION, "addons": self.addons}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def owners(self) -> Dict[AssetKey, List[str]]:
+        if self._owners is None:
+            owners: Dict[AssetKey, List[str]] = {}
+            for addon in sorted(self.addons):
+                for folder, ids in self.addons[addon].items():
+                    for ident in ids:
+                        owners.setdefault((folder, ident), []).append(addon)
+            self._owners = owners
+        return self._owners
+
+    def conflicts(self, names: Optional[Iterable[str]] = None) -> Dict[AssetKey, List[str]]:
+        """IDs defined by more than one addon, optionally only those involving `names`."""
+        wanted = set(names) if names else None
+        return {key: addons for key, addons in sorted(self.owners().items())
+                if len(addons) > 1 and (wanted is None or wanted.intersection(addons))}
+
+    def conflicts_with(self, ids: Dict[str, List[str]], exclude: Optional[str] = None) -> Dict[AssetKey, List[str]]:
+        """Installed addons that already define any of `ids` (ignoring `exclude`)."""
+        owners = self.owners()
+        found = {}
+        for folder, idents in ids.items():
+            for ident in idents:
+                others = [a for a in owners.get((folder, ident), []) if a != exclude]
+                if others:
+                    found[(folder, ident)] = others
+        return found
+
+
+def addon_changed(assets_root: Path, name: str, removed: bool = False) -> None:
+    """Update a single addon in the index; called by install/uninstall.
+
+    The first call builds the index, so it always describes what is installed.
+    """
+    if removed:
+        addons_changed(assets_root, removed=[name])
+    else:
+        addons_changed(assets_root, [name])
+
+
+def addons_changed(assets_root: Path, updated: Iterable[str] = (), removed: Iterable[str] = ()) -> None:
+    """`addon_changed` for several addons at once, loading and saving the index once."""
+    from .locks import resource_lock
+
+    with resource_lock(assets_root, "asset-index"):
+        if not AssetIndex(assets_root).path.exists():
+            AssetIndex.load(assets_root)  # the first scan already sees these changes
+            return
+        index = AssetIndex.load(assets_root, sync=False)
+        for name in removed:
+            index.remove_addon(name)
+        for name in updated:
+            index.update_addon(name)
+        index.save()
+
+
+def install_conflicts(assets_root: Path, name: str, ids: Dict[str, List[str]]) -> Dict[AssetKey, List[str]]:
+    """Installed addons other than `name` that already define any of `ids`, before installing `name`."""
+    from .locks import resource_lock
+
+    if not ids:
+        return {}
+    with resource_lock(assets_root, "asset-index"):
+        return AssetIndex.load(assets_root).conflicts_with(ids, exclude=name)
+
+
+def format_conflict(key: AssetKey, addons: List[str]) -> str:
+    folder, ident = key
+    kind = folder[:-1] if folder.endswith("s") else folder
+    return f"{kind} '{ident}': {', '.join(addons)}"
@@ -0,0 +1,232 @@
+"""Benchmarks for the core install/list/validate paths on synthetic data.
+
+Generates synthetic assets roots and addon zips in a scratch directory, times
+the core operations and writes the results as JSON. When a saved baseline is
+given, cases that got slower than the allowed threshold are reported and the
+process exits with status 1.
+
+    python -m addon_manager.benchmarks.bench_core --out bench.json
+    python -m addon_manager.benchmarks.bench_core --baseline bench.json --quick
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .. import core
+
+SMALL_FILE = 64
+LARGE_FILE = 1024 * 1024
+
+
+@dataclass
+class ZipCase:
+    members: int
+    layout: str  # "single" (one top-level folder) or "flat"
+    file_size: int
+
+    @property
+    def name(self) -> str:
+        size = "large" if self.file_size >= LARGE_FILE else "small"
+        return f"{self.layout}-{self.members}-{size}"
+
+
+ROOT_SIZES = [10, 1000, 10000]
+ZIP_CASES = [
+    ZipCase(100, "single", SMALL_FILE),
+    ZipCase(100, "flat", SMALL_FILE),
+    ZipCase(100, "single", LARGE_FILE),
+    ZipCase(100, "flat", LARGE_FILE),
+    ZipCase(10000, "single", SMALL_FILE),
+    ZipCase(10000, "flat", SMALL_FILE),
+    ZipCase(100000, "single", SMALL_FILE),
+    ZipCase(100000, "flat", SMALL_FILE),
+]
+QUICK_ROOT_SIZES = [10, 1000]
+QUICK_ZIP_CASES = [case for case in ZIP_CASES if case.members <= 10000]
+
+
+def make_assets_root(root: Path, addons: int) -> Path:
+    """Create an assets root with the base `cubyz` folder and `addons` addons."""
+    (root / "cubyz" / "blocks").mkdir(parents=True, exist_ok=True)
+    for i in range(addons):
+        addon = root / f"addon{i:05d}"
+        (addon / "blocks").mkdir(parents=True, exist_ok=True)
+        manifest = {"name": f"Addon {i}", "version": f"1.0.{i}"}
+        (addon / "addon.json").write_text(json.dumps(manifest), encoding="utf-8")
+        (addon / "blocks" / "block.zig.zon").write_text('.{ .texture = "stone" }', encoding="utf-8")
+    return root
+
+
+def make_addon_zip(path: Path, case: ZipCase) -> Path:
+    """Create a synthetic addon zip described by `case`."""
+    prefix = f"{path.stem}/" if case.layout == "single" else ""
+    payload = (b"cubyz" * (case.file_size // 5 + 1))[:case.file_size]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"{prefix}addon.json", json.dumps({"name": path.stem, "version": "1.0.0"}))
+        for i in range(case.members - 1):
+            zf.writestr(f"{prefix}blocks/{i // 1000:03d}/block{i:06d}.zig.zon", payload)
+    return path
+
+
+def make_addon_folder(path: Path, files: int, file_size: int = SMALL_FILE) -> Path:
+    """Create a synthetic addon folder with `files` data files."""
+    payload = (b"cubyz" * (file_size // 5 + 1))[:file_size]
+    (path / "blocks").mkdir(parents=True, exist_ok=True)
+    (path / "addon.json").write_text(json.dumps({"name": path.name, "version": "1.0.0"}), encoding="utf-8")
+    for i in range(files - 1):
+        sub = path / "blocks" / f"{i // 1000:03d}"
+        sub.mkdir(exist_ok=True)
+        (sub / f"block{i:06d}.zig.zon").write_bytes(payload)
+    return path
+
+
+def _summarize(samples: List[float]) -> dict:
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "runs": len(samples),
+    }
+
+
+def time_call(fn: Callable[[], object], repeat: int,
+              setup: Optional[Callable[[], object]] = None,
+              teardown: Optional[Callable[[], object]] = None) -> List[float]:
+    """Time `fn` `repeat` times; `setup`/`teardown` run outside the timed region."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        if teardown:
+            teardown()
+    return samples
+
+
+def run_benchmarks(work: Path, root_sizes: Iterable[int], zip_cases: Iterable[ZipCase],
+                   repeat: int = 3, only: Optional[str] = None) -> Dict[str, dict]:
+    """Run every selected case inside `work` and return the timing results."""
+    results: Dict[str, dict] = {}
+
+    def selected(name: str) -> bool:
+        return not only or only in name
+
+    for size in root_sizes:
+        list_name = f"list_installed/{size}"
+        validate_name = f"validate_addon_dir/{size}"
+        if not (selected(list_name) or selected(validate_name)):
+            continue
+        root = make_assets_root(work / f"root{size}" / "assets", size)
+        if selected(list_name):
+            results[list_name] = _summarize(time_call(lambda: core.list_installed(root), repeat))
+        if selected(validate_name):
+            dirs = [p for p in root.iterdir() if p.is_dir()]
+            results[validate_name] = _summarize(
+                time_call(lambda: [core.validate_addon_dir(d) for d in dirs], repeat))
+        shutil.rmtree(root.parent)
+
+    assets = work / "install" / "assets"
+    (assets / "cubyz").mkdir(parents=True, exist_ok=True)
+    for case in zip_cases:
+        install_name = f"install_addon/zip/{case.name}"
+        uninstall_name = f"uninstall_addon/{case.name}"
+        if not (selected(install_name) or selected(uninstall_name)):
+            continue
+        archive = make_addon_zip(work / f"bench_{case.name.replace('-', '_')}.zip", case)
+        addon = archive.stem
+        install_samples, uninstall_samples = [], []
+        for _ in range(repeat):
+            install_samples += time_call(lambda: core.install_addon(archive, assets), 1)
+            uninstall_samples += time_call(lambda: core.uninstall_addon(addon, assets), 1)
+        if selected(install_name):
+            results[install_name] = _summarize(install_samples)
+        if selected(uninstall_name):
+            results[uninstall_name] = _summarize(uninstall_samples)
+        archive.unlink()
+
+    for case in zip_cases:
+        if case.layout != "single":
+            continue
+        name = f"install_addon/folder/{case.members}-{'large' if case.file_size >= LARGE_FILE else 'small'}"
+        if not selected(name):
+            continue
+        src = make_addon_folder(work / "folder_src" / f"folder{case.members}", case.members, case.file_size)
+        results[name] = _summarize(time_call(
+            lambda: core.install_addon(src, assets), repeat,
+            teardown=lambda: core.uninstall_addon(src.name, assets)))
+        shutil.rmtree(src.parent)
+
+    return results
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float = 0.2) -> List[str]:
+    """Return a description of every case whose median regressed past `threshold`.
+
+    `threshold` is relative: 0.2 flags cases that are more than 20% slower
+    than the baseline. Cases missing from either side are ignored.
+    """
+    regressions = []
+    for name, result in sorted(current.items()):
+        base = baseline.get(name)
+        if not base or base["median"] <= 0:
+            continue
+        ratio = result["median"] / base["median"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {base['median'] * 1000:.2f}ms -> {result['median'] * 1000:.2f}ms ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench_core", description=__doc__.splitlines()[0])
+    parser.add_argument("--out", help="Write results JSON to this file", default=None)
+    parser.add_argument("--baseline", help="Compare against a saved results JSON", default=None)
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown flagged as a regression (default 0.2)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="Skip the largest cases")
+    parser.add_argument("--only", help="Only run cases whose name contains this text", default=None)
+    parser.add_argument("--workdir", help="Scratch directory (default: a temp dir)", default=None)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    root_sizes = QUICK_ROOT_SIZES if args.quick else ROOT_SIZES
+    zip_cases = QUICK_ZIP_CASES if args.quick else ZIP_CASES
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+        results = run_benchmarks(Path(tmp), root_sizes, zip_cases, repeat=args.repeat, only=args.only)
+
+    for name, result in sorted(results.items()):
+        print(f"{name:45s} {result['median'] * 1000:10.2f}ms (min {result['min'] * 1000:.2f}ms)")
+
+    if args.out:
+        payload = {
+            "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                     "repeat": args.repeat, "time": time.time()},
+            "results": results,
+        }
+        Path(args.out).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print("REGRESSION:", line)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Throughput of CLI calls with and without the resident server.
+
+Starts `serve` for a synthetic assets root and measures requests per second
+for `list`, run three ways: as one-shot processes that bypass the server, as
+processes that forward to it, and as `run` calls over one open connection
+(the cost of the server alone).
+
+    python -m addon_manager.benchmarks.bench_daemon --addons 1000 --calls 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .. import core, daemon
+from .bench_core import make_assets_root
+
+PACKAGE = core.__name__.rsplit(".", 1)[0]
+
+
+def _env(**extra: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    root = str(Path(core.__file__).resolve().parent.parent)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (root, env.get("PYTHONPATH")) if p)
+    env.pop(daemon.DISABLE_ENV_VAR, None)
+    env.update(extra)
+    return env
+
+
+def _cli(*args: str) -> List[str]:
+    return [sys.executable, "-m", f"{PACKAGE}.core", *args]
+
+
+def _rate(calls: int, fn) -> dict:
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - t0
+    return {"calls": calls, "seconds": elapsed, "per_second": calls / elapsed}
+
+
+def start_server(assets: Path, sock: Path, timeout: float = 10.0) -> subprocess.Popen:
+    """Start `serve` in a child process and wait until it accepts connections."""
+    proc = subprocess.Popen(_cli("serve", "--assets", str(assets), "--socket", str(sock)),
+                            env=_env(), stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        client = daemon.connect(sock)
+        if client is not None:
+            client.close()
+            return proc
+        if proc.poll() is not None:
+            break
+        time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("Server did not start")
+
+
+def run_benchmark(work: Path, addons: int, calls: int) -> Dict[str, dict]:
+    assets = make_assets_root(work / "assets", addons)
+    sock = work / "bench.sock"
+    argv = ["list", "--assets", str(assets)]
+    results = {}
+
+    def one_shot(env):
+        subprocess.run(_cli(*argv), env=env, stdout=subprocess.DEVNULL, check=True)
+
+    results["one-shot"] = _rate(calls, lambda: one_shot(_env(**{daemon.DISABLE_ENV_VAR: "1"})))
+    proc = start_server(assets, sock)
+    try:
+        results["forwarded"] = _rate(calls, lambda: one_shot(_env(**{daemon.SOCKET_ENV_VAR: str(sock)})))
+        with daemon.Client(sock) as client:
+            results["rpc"] = _rate(calls, lambda: client.call("run", argv=argv))
+        daemon.stop(sock)
+        proc.wait(timeout=10)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+    return results
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench_daemon", description=__doc__.splitlines()[0])
+    parser.add_argument("--addons", type=int, default=1000, help="Addons in the synthetic assets root")
+    parser.add_argument("--calls", type=int, default=20, help="Calls per mode")
+    parser.add_argument("--out", help="Write results JSON to this file", default=None)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run_benchmark(Path(tmp), args.addons, args.calls)
+    for name, result in results.items():
+        print(f"{name:12s} {result['per_second']:10.1f} req/s ({result['calls']} calls)")
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
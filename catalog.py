@@ -0,0 +1,326 @@
+"""The online addon catalog and update checks against it.
+
+The catalog is a JSON list of entries (`id`, `name`, `version`, `download`,
+...). Installed addons are matched to entries through a dict keyed by every
+name an entry's folder can have, so checking all installed addons is a
+single pass instead of a scan of the catalog per addon.
+
+The catalog is read from the configured `base_url` (see `config`), which can
+also be a `file://` mirror; `open_url` gives both kinds of URL the same
+response interface.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from urllib.request import url2pathname
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from . import profiling
+from .config import DEFAULTS, base_url
+from .core import AddonInfo, ConflictCallback, _download, archive_name, archive_suffix, install_addon
+from .progress import ProgressCallback, throttled
+from .receipts import Receipt
+
+BASE_URL = DEFAULTS["base_url"]
+CATALOG_FILE = "addons.json"
+CATALOG_URL = BASE_URL + CATALOG_FILE
+TIMEOUT = 10
+DOWNLOAD_WORKERS = 4
+# Entry fields holding links, resolved against the catalog URL when fetched
+URL_FIELDS = ("download", "icon", "thumbnail")
+
+_VERSION_SPLIT = re.compile(r"[.\-_]")
+
+
+def catalog_url(assets_root: Path) -> str:
+    """URL of the catalog for the configured base URL."""
+    return base_url(assets_root) + CATALOG_FILE
+
+
+def file_path(url: str) -> Path:
+    """Local path of a file:// URL."""
+    return Path(url2pathname(urlparse(url).path))
+
+
+class FileResponse:
+    """The parts of `requests.Response` the manager uses, for file:// URLs.
+
+    The ETag is derived from size and mtime, so conditional requests work
+    the same way against a local mirror as against an HTTP server.
+    """
+
+    def __init__(self, url: str, headers: Optional[dict] = None):
+        self.url = url
+        self.path = file_path(url)
+        self.headers: CaseInsensitiveDict = CaseInsensitiveDict()
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self.status_code = 404
+            return
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        self.headers.update({"Content-Length": str(st.st_size), "ETag": etag})
+        self.status_code = 304 if (headers or {}).get("If-None-Match") == etag else 200
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code}: {self.path} not found", response=self)
+
+    @property
+    def content(self) -> bytes:
+        return self.path.read_bytes()
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 65536):
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def close(self) -> None:
+        pass
+
+
+# Shared connection pool, installed by long-running processes (see `use_session`)
+_session: Optional[requests.Session] = None
+
+
+def use_session(session: Optional[requests.Session]) -> None:
+    """Send HTTP requests through `session` (keeping connections alive), or plain `requests` for None."""
+    global _session
+    _session = session
+
+
+def open_url(url: str, method: str = "GET", stream: bool = False, timeout: float = TIMEOUT,
+             headers: Optional[dict] = None):
+    """GET (or HEAD) an http(s) or file:// URL."""
+    if urlparse(url).scheme == "file":
+        return FileResponse(url, headers)
+    http = _session or requests
+    if method == "HEAD":
+        return http.head(url, timeout=timeout, headers=headers, allow_redirects=True)
+    return http.get(url, stream=stream, timeout=timeout, headers=headers)
+
+
+def fetch_catalog(url: str = CATALOG_URL, timeout: float = TIMEOUT) -> List[dict]:
+    """Download and decode the catalog.
+
+    Relative links in the entries are made absolute, so entries stay usable
+    whichever source they came from.
+    """
+    with profiling.span("catalog.fetch", url=url) as sp:
+        r = open_url(url, timeout=timeout)
+        r.raise_for_status()
+        entries = resolve_links(r.json(), url)
+        sp.set(entries=len(entries))
+    return entries
+
+
+def resolve_links(entries: List[dict], url: str) -> List[dict]:
+    """Make the links of catalog entries fetched from `url` absolute (in place)."""
+    if not isinstance(entries, list):
+        raise ValueError(f"Catalog at {url} is not a list of addons")
+    for entry in entries:
+        for key in URL_FIELDS:
+            if isinstance(entry.get(key), str):
+                entry[key] = urljoin(url, entry[key])
+    return entries
+
+
+def download_url(entry: dict) -> str:
+    return urljoin(BASE_URL, entry["download"])
+
+
+def _part(text: str) -> Tuple[int, object]:
+    # Numbers sort before words so "1.0.1" > "1.0.beta"
+    return (0, int(text)) if text.isdigit() else (1, text.lower())
+
+
+def parse_version(version: str) -> tuple:
+    """Sort key for a version string.
+
+    Numeric parts compare as numbers ("1.10" > "1.9"), trailing zeros are
+    insignificant ("1.0" == "1"), a leading "v" and "+build" metadata are
+    ignored, and a "-pre" suffix sorts before the release ("1.0-beta" < "1.0").
+    """
+    version = str(version).strip()
+    if version[:1] in ("v", "V"):
+        version = version[1:]
+    version = version.split("+", 1)[0]
+    release, _, pre = version.partition("-")
+    parts = [_part(p) for p in release.split(".") if p]
+    while parts and parts[-1] == (0, 0):
+        parts.pop()
+    if not pre:
+        return (tuple(parts), (1,))
+    return (tuple(parts), (0, tuple(_part(p) for p in _VERSION_SPLIT.split(pre) if p)))
+
+
+def is_newer(candidate: Optional[str], current: Optional[str]) -> bool:
+    """True if `candidate` is a later version than `current` (False if either is unknown)."""
+    if not candidate or not current:
+        return False
+    return parse_version(candidate) > parse_version(current)
+
+
+def entry_names(entry: dict) -> List[str]:
+    """Lower-cased folder names an installed copy of `entry` may have."""
+    names = [str(entry.get("id", "")).lower()]
+    if entry.get("name"):
+        names.append(entry["name"].lower().replace(" ", "_"))
+        names.append(entry["name"].lower().replace(" ", ""))
+    if entry.get("download"):
+        names.append(archive_name(Path(urlparse(entry["download"]).path)).lower())
+    return [n for n in names if n]
+
+
+def entry_key(entry: dict) -> str:
+    """Key identifying a catalog entry across fetches: its id, or its name without one."""
+    return str(entry.get("id") or entry.get("name") or "").lower()
+
+
+def diff_entries(old: Iterable[dict], new: Iterable[dict]) -> Tuple[List[str], List[str], List[str]]:
+    """Return the (added, removed, changed) keys between two catalogs, in catalog order."""
+    before = {entry_key(e): e for e in old}
+    after = {entry_key(e): e for e in new}
+    added = [k for k in after if k not in before]
+    removed = [k for k in before if k not in after]
+    changed = [k for k in after if k in before and after[k] != before[k]]
+    return added, removed, changed
+
+
+class CatalogIndex:
+    """Catalog entries by folder name; the first entry claiming a name wins."""
+
+    def __init__(self, entries: Iterable[dict]):
+        self.entries = list(entries)
+        self.by_name: Dict[str, dict] = {}
+        self.by_id: Dict[str, dict] = {}
+        for entry in self.entries:
+            if entry.get("id"):
+                self.by_id.setdefault(str(entry["id"]).lower(), entry)
+            for n in entry_names(entry):
+                self.by_name.setdefault(n, entry)
+
+    def match(self, addon: AddonInfo) -> Optional[dict]:
+        if addon.manifest and addon.manifest.get("id"):
+            entry = self.by_name.get(str(addon.manifest["id"]).lower())
+            if entry is not None:
+                return entry
+        return self.by_name.get(addon.name.lower())
+
+
+@dataclass
+class Outdated:
+    name: str  # installed folder name
+    installed: str
+    latest: str
+    entry: dict
+
+
+def find_outdated(installed: Iterable[AddonInfo], catalog: Iterable[dict],
+                  receipts: Optional[Dict[str, Receipt]] = None) -> List[Outdated]:
+    """Installed addons whose catalog entry has a newer version, sorted by name.
+
+    With `receipts` (by lower-cased folder name, see `ReceiptStore.all`),
+    addons are matched by the catalog id they were installed from, and the
+    receipt's version is used when addon.json has none. Other addons are
+    matched by name; those without any known version are skipped, since
+    there is nothing to compare.
+    """
+    index = catalog if isinstance(catalog, CatalogIndex) else CatalogIndex(catalog)
+    found = []
+    for addon in installed:
+        current = addon.manifest.get("version") if addon.manifest else None
+        receipt = receipts.get(addon.name.lower()) if receipts else None
+        entry = index.by_id.get(receipt.catalog_id.lower()) if receipt and receipt.catalog_id else None
+        if receipt is not None and current is None:
+            current = receipt.version
+        if entry is None:
+            entry = index.match(addon)
+        if entry is not None and is_newer(entry.get("version"), current):
+            found.append(Outdated(addon.name, str(current), str(entry["version"]), entry))
+    return sorted(found, key=lambda o: o.name.lower())
+
+
+def entry_suffix(entry: dict) -> str:
+    """Archive suffix of an entry's download (".zip" unless it names another archive type)."""
+    return archive_suffix(urlparse(entry["download"]).path) or ".zip"
+
+
+def entry_origin(entry: dict) -> dict:
+    """Install receipt fields for a catalog entry (see `receipts`)."""
+    return {"catalog_id": entry.get("id"), "source": entry.get("source"), "url": download_url(entry),
+            "version": None if entry.get("version") is None else str(entry["version"])}
+
+
+def download_entry(entry: dict, target: Path, progress: Optional[ProgressCallback] = None) -> Path:
+    """Download the archive of a catalog entry to `target`."""
+    r = open_url(download_url(entry), stream=True)
+    r.raise_for_status()
+    return _download(r, target, throttled(progress))
+
+
+def install_entry(entry: dict, assets_root: Path, name: Optional[str] = None,
+                  progress: Optional[ProgressCallback] = None,
+                  on_conflicts: Optional[ConflictCallback] = None) -> Path:
+    """Install (or replace) a catalog entry as folder `name` (default: its archive name).
+
+    `on_conflicts` is passed on to `install_addon`.
+    """
+    report = throttled(progress)
+    name = name or archive_name(Path(urlparse(entry["download"]).path))
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = download_entry(entry, Path(tmp) / f"{name}{entry_suffix(entry)}", report)
+        return install_addon(archive, assets_root, overwrite=True, progress=report,
+                             origin=entry_origin(entry), on_conflicts=on_conflicts)
+
+
+@dataclass
+class UpgradeResult:
+    item: Outdated
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def upgrade_addons(items: List[Outdated], assets_root: Path,
+                   workers: Optional[int] = None) -> List[UpgradeResult]:
+    """Download all `items` concurrently and install each as soon as it arrives.
+
+    Installs run one at a time on the calling thread, so the manager's
+    bookkeeping is never updated concurrently. Each addon keeps its folder
+    name. A failed download or install is reported and does not stop the
+    others.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            profiling.span("upgrade", addons=len(items)), \
+            ThreadPoolExecutor(max_workers=workers or DOWNLOAD_WORKERS) as pool:
+        futures = {pool.submit(download_entry, item.entry, Path(tmp) / f"{item.name}{entry_suffix(item.entry)}"): item
+                   for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                install_addon(future.result(), assets_root, overwrite=True, origin=entry_origin(item.entry))
+                results.append(UpgradeResult(item))
+            except Exception as e:
+                results.append(UpgradeResult(item, str(e)))
+    return sorted(results, key=lambda r: r.item.name.lower())
@@ -0,0 +1,106 @@
+"""User settings for the manager.
+
+Settings are stored as JSON in `config.json` in the manager's state folder
+and can be overridden per process with environment variables named
+`CUBYZ_ADDON_<KEY>` (e.g. `CUBYZ_ADDON_BASE_URL`), which is handy for
+pointing a deployment at a catalog mirror without touching its files.
+(The `serve` process reads them from each forwarded command's environment
+instead, see `environment`.)
+
+`base_url` is where the catalog (`addons.json`) lives; relative `download`
+and icon paths in the catalog are resolved against it. Besides http(s), it
+may be a `file://` URL of a local mirror. `lock_timeout` is how long an
+operation waits for another process working on the same addon, and the
+`max_*` settings limit what an archive may unpack to.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Mapping
+
+from .core import state_dir
+
+CONFIG_FILE = "config.json"
+ENV_PREFIX = "CUBYZ_ADDON_"
+DEFAULTS: Dict[str, Any] = {
+    "base_url": "https://addons.ashframe.net/",
+    "sources": [],  # catalog sources to merge (see `sources`); empty means just base_url
+    "lock_timeout": 60,  # seconds to wait for another process (see `locks`)
+    # Archive limits checked before extraction (see `preflight`); 0 disables one
+    "max_unpacked_mb": 4096,
+    "max_files": 250000,
+    "max_compression_ratio": 200,
+}
+
+_env = threading.local()
+
+
+def config_path(assets_root: Path) -> Path:
+    return state_dir(assets_root) / CONFIG_FILE
+
+
+def _read(assets_root: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads(config_path(assets_root).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+@contextmanager
+def environment(env: Mapping[str, str]) -> Iterator[None]:
+    """Take `CUBYZ_ADDON_*` overrides from `env` instead of `os.environ` on this thread."""
+    previous = getattr(_env, "mapping", None)
+    _env.mapping = env
+    try:
+        yield
+    finally:
+        _env.mapping = previous
+
+
+def env_overrides() -> Dict[str, str]:
+    """The `CUBYZ_ADDON_*` variables of this process, to send along with a forwarded command."""
+    return {k: v for k, v in os.environ.items() if k.startswith(ENV_PREFIX)}
+
+
+def load_config(assets_root: Path) -> Dict[str, Any]:
+    """Defaults, overridden by config.json, overridden by the environment."""
+    config = dict(DEFAULTS)
+    config.update(_read(assets_root))
+    environ = getattr(_env, "mapping", None)
+    if environ is None:
+        environ = os.environ
+    for key in list(config):
+        env = environ.get(ENV_PREFIX + key.upper())
+        if env is not None:
+            config[key] = env
+    return config
+
+
+def get_setting(assets_root: Path, key: str) -> Any:
+    return load_config(assets_root).get(key)
+
+
+def set_setting(assets_root: Path, key: str, value: Any) -> None:
+    """Store `key` in config.json; a value of None removes it."""
+    data = _read(assets_root)
+    if value is None:
+        data.pop(key, None)
+    else:
+        data[key] = value
+    path = config_path(assets_root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def base_url(assets_root: Path) -> str:
+    """Configured catalog base URL, always ending in a slash."""
+    url = str(get_setting(assets_root, "base_url"))
+    return url if url.endswith("/") else url + "/"
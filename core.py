@@ -2,20 +2,31 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import shutil
+import sys
 import tempfile
-import requests
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urlparse
 
+from . import profiling
+from .filters import ArchiveFilter
+from .progress import ProgressCallback, TerminalProgress, Throttle, format_bytes, throttled
+
+# Called with an addon's name and the asset IDs ((folder, id) -> other addons) it would collide on
+ConflictCallback = Callable[[str, Dict[Tuple[str, str], List[str]]], None]
+
 
 @dataclass
 class AddonInfo:
     name: str
     path: Path
     manifest: Optional[dict] = None
+    size: Optional[int] = None  # bytes on disk, only filled in when requested
+    file_count: Optional[int] = None
+    enabled: bool = True  # False for addons moved aside with `profiles.disable_addon`
 
 
 def find_assets_root(start: Path) -> Path:
@@ -32,23 +43,133 @@ def find_assets_root(start: Path) -> Path:
     return start.resolve() / "assets"
 
 
-def list_installed(addons_dir: Path) -> List[AddonInfo]:
+def state_dir(assets_root: Path) -> Path:
+    """Folder for the manager's own bookkeeping (caches, indexes, manifests).
+
+    It lives next to `assets/` rather than inside it so the game never tries
+    to load it as an addon.
+    """
+    return assets_root.parent / ".cubyz_addon_manager"
+
+
+ARCHIVE_SUFFIXES = (".tar.gz", ".tgz", ".tar", ".zip")
+STAGING_DIR = "staging"
+DISABLED_DIR = "disabled"
+
+
+def disabled_dir(assets_root: Path) -> Path:
+    """Where disabled addons are kept: in the state folder, so moving one there is a rename."""
+    return state_dir(assets_root) / DISABLED_DIR
+
+
+def archive_suffix(name: str) -> Optional[str]:
+    """The archive suffix of a file name or URL path (e.g. ".tar.gz"), or None."""
+    lower = name.lower()
+    return next((suffix for suffix in ARCHIVE_SUFFIXES if lower.endswith(suffix)), None)
+
+
+def archive_name(path: Path) -> str:
+    """Addon folder name for an archive: its file name without the archive suffix."""
+    suffix = archive_suffix(path.name)
+    return path.name[:-len(suffix)] if suffix else path.stem
+
+
+# Parsed addon.json files by path, with the (mtime, size) they were read at.
+# Only kept by long-running processes (see `keep_manifests_warm`).
+_manifest_cache: Optional[Dict[Path, Tuple[Tuple[int, int], Optional[dict]]]] = None
+
+
+def keep_manifests_warm() -> None:
+    """Reuse parsed addon.json files across `list_installed` calls while they are unchanged."""
+    global _manifest_cache
+    if _manifest_cache is None:
+        _manifest_cache = {}
+
+
+def _read_manifest(manifest_file: Path) -> Optional[dict]:
+    if _manifest_cache is not None:
+        try:
+            st = manifest_file.stat()
+        except OSError:
+            _manifest_cache.pop(manifest_file, None)
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        cached = _manifest_cache.get(manifest_file)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+    elif not manifest_file.exists():
+        return None
+    try:
+        manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+    except Exception:
+        manifest = None
+    if _manifest_cache is not None:
+        _manifest_cache[manifest_file] = (key, manifest)
+    return manifest
+
+
+def list_installed(addons_dir: Path, sizes: bool = False, disabled: bool = False) -> List[AddonInfo]:
+    """List the addon folders in `addons_dir`.
+
+    With `sizes`, `size` and `file_count` are filled in as well (see `usage`).
+    With `disabled`, disabled addons are listed too, with `enabled` False.
+    """
+    from .locks import assets_lock
+
     addons = []
     if not addons_dir.exists():
         return addons
-    for child in addons_dir.iterdir():
-        if child.is_dir():
-            manifest = None
-            manifest_file = child / "addon.json"
-            if manifest_file.exists():
-                try:
-                    manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
-                except Exception:
-                    manifest = None
-            addons.append(AddonInfo(child.name, child, manifest))
+    with profiling.span("list_installed", assets=str(addons_dir)) as sp, assets_lock(addons_dir):
+        for child in addons_dir.iterdir():
+            if child.is_dir():
+                addons.append(AddonInfo(child.name, child, _read_manifest(child / "addon.json")))
+        off = disabled_dir(addons_dir)
+        if disabled and off.is_dir():
+            for child in off.iterdir():
+                if child.is_dir():
+                    addons.append(AddonInfo(child.name, child, _read_manifest(child / "addon.json"),
+                                            enabled=False))
+        sp.set(addons=len(addons))
+    if sizes:
+        from .usage import addon_usage
+
+        usage = addon_usage([a.path for a in addons], addons_dir)
+        for a in addons:
+            a.size, a.file_count = usage[a.path]
     return addons
 
 
+def addon_signatures(addons_dir: Path) -> Dict[str, Optional[Tuple[int, int]]]:
+    """Map every addon folder to a cheap change signature.
+
+    The signature is the (mtime, size) of its addon.json, or None without one.
+    Comparing two snapshots with `diff_signatures` tells which addons were
+    added, removed or need their manifest re-read.
+    """
+    signatures: Dict[str, Optional[Tuple[int, int]]] = {}
+    if not addons_dir.exists():
+        return signatures
+    with os.scandir(addons_dir) as it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            try:
+                st = os.stat(os.path.join(entry.path, "addon.json"))
+                signatures[entry.name] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                signatures[entry.name] = None
+    return signatures
+
+
+def diff_signatures(old: Dict[str, Optional[Tuple[int, int]]],
+                    new: Dict[str, Optional[Tuple[int, int]]]) -> Tuple[List[str], List[str], List[str]]:
+    """Return sorted (added, removed, changed) addon names between two snapshots."""
+    added = sorted(set(new) - set(old))
+    removed = sorted(set(old) - set(new))
+    changed = sorted(name for name in set(old) & set(new) if old[name] != new[name])
+    return added, removed, changed
+
+
 def validate_addon_dir(addon_path: Path) -> bool:
     """Basic validation: an addon folder should contain at least one of
     'blocks', 'items', 'biomes', or 'textures' subfolders, or an addon.json.
@@ -63,13 +184,164 @@ def validate_addon_dir(addon_path: Path) -> bool:
     return False
 
 
-def install_addon(zip_path: Path, assets_root: Path, overwrite: bool = False) -> Path:
+def _copytree(src: Path, dest: Path, report: Optional[Throttle] = None, total: Optional[int] = None) -> None:
+    """copytree reported as a profiling stage and as the `copy` progress phase."""
+    with profiling.span("copytree", src=str(src), dest=str(dest)) as sp:
+        profile = profiling.enabled()
+        if not profile and (report is None or report.callback is None):
+            shutil.copytree(src, dest)
+            return
+        copied = 0
+
+        def counting_copy(s, d):
+            nonlocal copied
+            result = shutil.copy2(s, d)
+            copied += 1
+            if profile:
+                sp.add(files=1, bytes=os.path.getsize(d))
+            if report is not None:
+                report("copy", copied, total, "files")
+            return result
+
+        shutil.copytree(src, dest, copy_function=counting_copy)
+        if report is not None:
+            report("copy", copied, total, "files", final=True)
+
+
+def _extract_all(zf, dest, report: Throttle) -> None:
+    """`extractall`, one member at a time so extraction progress can be reported."""
+    infos = zf.infolist()
+    total = len(infos)
+    with profiling.span("zip.extract", dest=str(dest), files=total):
+        for done, info in enumerate(infos, 1):
+            zf.extract(info, dest)
+            report("extract", done, total, "files")
+        report("extract", total, total, "files", final=True)
+
+
+def _extract_selected(zf, selected, dest: Path, report: Throttle) -> None:
+    """Extract the (ZipInfo, path) pairs chosen by `filters.select_zip_members` straight into `dest`."""
+    total = len(selected)
+    with profiling.span("zip.extract", dest=str(dest), files=total):
+        dest.mkdir(parents=True, exist_ok=True)
+        for done, (info, rel) in enumerate(selected, 1):
+            path = dest / rel
+            if info.is_dir():
+                path.mkdir(parents=True, exist_ok=True)
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with zf.open(info) as src, open(path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            report("extract", done, total, "files")
+        report("extract", total, total, "files", final=True)
+
+
+def _download(response, target: Path, report: Optional[Throttle] = None) -> Path:
+    """Stream an HTTP response body into `target`."""
+    report = report or Throttle(None)
+    try:
+        total = int(response.headers.get('content-length', ''))
+    except ValueError:
+        total = None
+    with profiling.span("download", url=response.url, file=str(target)) as sp:
+        done = 0
+        with open(target, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=65536):
+                if chunk:
+                    f.write(chunk)
+                    done += len(chunk)
+                    report("download", done, total)
+        sp.set(bytes=done)
+        report("download", done, total, final=True)
+    return target
+
+
+def install_addon(zip_path: Path, assets_root: Path, overwrite: bool = False,
+                  progress: Optional[ProgressCallback] = None, optimize_textures: bool = False,
+                  origin: Optional[dict] = None, filters: Optional[ArchiveFilter] = None,
+                  on_conflicts: Optional[ConflictCallback] = None) -> Path:
     """Install an addon from a zip-like folder or an already-extracted folder.
 
     If zip_path is a directory, it will be copied into assets_root.
-    If zip_path is a .zip file, it will be extracted.
+    If zip_path is a .zip, .tar, .tar.gz or .tgz file, it will be extracted.
+    `progress` receives rate-limited `Progress` events for the extract and
+    copy phases. With `optimize_textures`, the installed PNG textures are
+    losslessly recompressed (see `optimize`). `origin` describes where the
+    addon came from (catalog id, source, URL, version) for its install
+    receipt (see `receipts`). `filters` installs only part of an archive
+    (see `filters`); an .addonignore in the archive is honored either way.
+    `on_conflicts` is told, before anything is written, which block, item
+    and biome IDs of the addon other installed addons already define; it
+    may raise to abort the install.
     Returns the installed addon folder path.
     """
+    from .locks import addon_lock
+
+    if zip_path.is_dir():
+        if filters is not None and filters.active:
+            raise ValueError("A subdirectory or include/exclude patterns only apply to archives")
+        name = zip_path.name
+    else:
+        name = filters.addon_name(archive_name(zip_path)) if filters else archive_name(zip_path)
+    with profiling.span("install_addon", source=str(zip_path)), addon_lock(assets_root, name):
+        dest = _install_addon(zip_path, assets_root, overwrite, throttled(progress), filters, on_conflicts)
+        return _finish_install(assets_root, dest, zip_path, origin, optimize_textures)
+
+
+def _finish_install(assets_root: Path, dest: Path, source: Optional[Path], origin: Optional[dict],
+                    optimize_textures: bool) -> Path:
+    if optimize_textures:
+        from .optimize import optimize_addons
+
+        optimize_addons([dest], assets_root)
+    _after_install(assets_root, dest.name, source, origin)
+    return dest
+
+
+def _existing_copy(assets_root: Path, name: str) -> Optional[Path]:
+    """The installed copy of addon `name`, enabled or disabled, if there is one."""
+    for path in (assets_root / name, disabled_dir(assets_root) / name):
+        if path.exists():
+            return path
+    return None
+
+
+def _check_conflicts(assets_root: Path, name: str, ids: Dict[str, List[str]],
+                     on_conflicts: ConflictCallback) -> None:
+    """Pass the asset IDs in `ids` that other installed addons define to `on_conflicts`, if there are any."""
+    from .asset_index import install_conflicts
+
+    conflicts = install_conflicts(assets_root, name, ids)
+    if conflicts:
+        on_conflicts(name, conflicts)
+
+
+def _after_install(assets_root: Path, name: str, source: Optional[Path], origin: Optional[dict] = None) -> None:
+    """Update the manager's bookkeeping for a freshly installed addon."""
+    from .asset_index import addon_changed
+    from .integrity import record_manifest
+    from .receipts import record_install
+
+    disabled = disabled_dir(assets_root) / name
+    if disabled.exists():
+        shutil.rmtree(disabled)  # replaced by the enabled copy just installed
+    addon_changed(assets_root, name)
+    record_manifest(assets_root, name)
+    record_install(assets_root, name, source, origin)
+
+
+def _after_uninstall(assets_root: Path, name: str) -> None:
+    from .asset_index import addon_changed
+    from .integrity import remove_manifest
+    from .receipts import remove_receipt
+
+    addon_changed(assets_root, name, removed=True)
+    remove_receipt(assets_root, name)
+    remove_manifest(assets_root, name)
+
+
+def _install_addon(zip_path: Path, assets_root: Path, overwrite: bool, report: Throttle,
+                   filters: Optional[ArchiveFilter] = None, on_conflicts: Optional[ConflictCallback] = None) -> Path:
     addons_folder = assets_root
     if not addons_folder.exists():
         addons_folder.mkdir(parents=True, exist_ok=True)
@@ -77,108 +349,378 @@ def install_addon(zip_path: Path, assets_root: Path, overwrite: bool = False) ->
     if zip_path.is_dir():
         src = zip_path
         dest = addons_folder / src.name
+        existing = _existing_copy(addons_folder, src.name)
+        if existing is not None and not overwrite:
+            raise FileExistsError(f"Addon already installed: {existing}")
+        if on_conflicts is not None:
+            from .asset_index import scan_ids
+
+            _check_conflicts(addons_folder, src.name, scan_ids(src), on_conflicts)
         if dest.exists():
-            if overwrite:
-                shutil.rmtree(dest)
-            else:
-                raise FileExistsError(f"Addon already installed: {dest}")
-        shutil.copytree(src, dest)
+            shutil.rmtree(dest)
+        total = sum(len(files) for _, _, files in os.walk(src)) if report.callback else None
+        try:
+            _copytree(src, dest, report, total)
+        except BaseException:
+            shutil.rmtree(dest, ignore_errors=True)
+            raise
         return dest
 
     if zip_path.suffix.lower() == ".zip":
         import zipfile
 
+        from .filters import select_zip_members
+        from .preflight import check_zip
+
         with zipfile.ZipFile(zip_path, 'r') as zf:
-            # Use the zip file name as the addon name
-            addon_name = zip_path.stem
+            # Use the zip file name (or the installed subdirectory's) as the addon name
+            addon_name = filters.addon_name(zip_path.stem) if filters else zip_path.stem
             target = addons_folder / addon_name
             
-            if target.exists():
-                if overwrite:
-                    shutil.rmtree(target)
-                else:
-                    raise FileExistsError(f"Addon already installed: {target}")
+            existing = _existing_copy(addons_folder, addon_name)
+            if existing is not None and not overwrite:
+                raise FileExistsError(f"Addon already installed: {existing}")
             
             # Check if zip has a single top-level folder
-            names = zf.namelist()
-            top_folders = set()
-            for name in names:
-                if '/' in name:
-                    top_folders.add(name.split('/')[0])
-                elif name and not name.endswith('/'):
-                    top_folders.add('')  # Files at root level
-            
-            if len(top_folders) == 1 and '' not in top_folders:
-                # Single top-level folder - extract its contents to target
-                top_folder = list(top_folders)[0]
-                import tempfile
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    zf.extractall(temp_dir)
-                    temp_path = Path(temp_dir) / top_folder
-                    shutil.copytree(temp_path, target)
-            else:
-                # Multiple items at root or files at root - extract directly
-                zf.extractall(target)
+            with profiling.span("zip.scan", archive=str(zip_path)) as sp:
+                names = zf.namelist()
+                top_folders = set()
+                for name in names:
+                    if '/' in name:
+                        top_folders.add(name.split('/')[0])
+                    elif name and not name.endswith('/'):
+                        top_folders.add('')  # Files at root level
+                sp.set(members=len(names))
+                if profiling.enabled():
+                    sp.set(bytes=sum(i.file_size for i in zf.infolist()))
+            staged = len(top_folders) == 1 and '' not in top_folders
+
+            # Only the members kept by `filters` and an .addonignore, extracted straight into place
+            selected = select_zip_members(zf, filters, next(iter(top_folders)) if staged else "")
+            if on_conflicts is not None:
+                # From the central directory, before anything is extracted
+                from .asset_index import ids_from_names
+
+                if selected is not None:
+                    rels = [rel for _, rel in selected]
+                else:
+                    rels = [n.split('/', 1)[1] if staged else n for n in names if not n.endswith('/')]
+                _check_conflicts(addons_folder, addon_name, ids_from_names(rels), on_conflicts)
+            if selected is not None:
+                check_zip(zf, assets_root, [target], [info for info, _ in selected])
+                if target.exists():
+                    shutil.rmtree(target)
+                try:
+                    _extract_selected(zf, selected, target, report)
+                except BaseException:
+                    shutil.rmtree(target, ignore_errors=True)
+                    raise
+                return target
             
+            # Reject hostile or oversized archives before anything is removed or written
+            check_zip(zf, assets_root, [target, Path(tempfile.gettempdir())] if staged else [target])
+            if target.exists():
+                shutil.rmtree(target)
+
+            try:
+                if staged:
+                    # Single top-level folder - extract its contents to target
+                    top_folder = list(top_folders)[0]
+                    with tempfile.TemporaryDirectory() as temp_dir:
+                        _extract_all(zf, temp_dir, report)
+                        temp_path = Path(temp_dir) / top_folder
+                        files = sum(1 for n in names if not n.endswith('/'))
+                        _copytree(temp_path, target, report, files)
+                else:
+                    # Multiple items at root or files at root - extract directly
+                    _extract_all(zf, target, report)
+            except BaseException:
+                shutil.rmtree(target, ignore_errors=True)
+                raise
+
             return target
 
-    raise ValueError("Unsupported addon source: must be a folder or a .zip file")
+    if archive_suffix(zip_path.name):
+        import tarfile
+
+        with tarfile.open(zip_path, "r:*") as tf:
+            name = filters.addon_name(archive_name(zip_path)) if filters else archive_name(zip_path)
+            return _install_tar(tf, name, assets_root, overwrite, report, filters=filters,
+                                on_conflicts=on_conflicts)
+
+    raise ValueError("Unsupported addon source: must be a folder or a .zip, .tar, .tar.gz or .tgz file")
+
 
+def _install_tar(tf, name: str, assets_root: Path, overwrite: bool, report: Throttle,
+                 stream: Optional["_CountingReader"] = None, filters: Optional[ArchiveFilter] = None,
+                 on_conflicts: Optional[ConflictCallback] = None) -> Path:
+    """Extract a tar archive member by member as it is read, then move it into place.
+
+    Works on streams ("r|*" mode): members are checked against the preflight
+    limits and written as they arrive. The extraction goes to a staging
+    folder, so an existing copy is only replaced once the archive is
+    complete. A single top-level folder is unwrapped like for zips; links
+    and special files are skipped. Members left out by `filters` or an
+    .addonignore are read past without being written. Conflicts are checked
+    on the staged folder, before it is moved into the assets folder.
+    """
+    from .filters import IGNORE_FILE, clean_name
+    from .preflight import PreflightError, StreamCheck
+
+    target = assets_root / name
+    existing = _existing_copy(assets_root, name)
+    if existing is not None and not overwrite:
+        raise FileExistsError(f"Addon already installed: {existing}")
+    staging_root = state_dir(assets_root) / STAGING_DIR
+    staging_root.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f"{name}-", dir=staging_root))
+    try:
+        check = StreamCheck.from_config(assets_root, [staging])
+        spec = filters or ArchiveFilter()
+        matcher = None
+        written: List[Tuple[str, Path]] = []  # (member name, staged file)
 
-def install_addon_from_url(url: str, assets_root: Path, overwrite: bool = False) -> Path:
-    """Download an addon from a URL (supports zip files or GitHub repo URLs) and install it.
+        def prune() -> None:
+            """Drop staged files that the filter (grown since they were written) leaves out."""
+            nonlocal written
+            for full, path in written:
+                if not matcher.keep(matcher.relative(full) or ""):
+                    path.unlink()
+            written = [(full, path) for full, path in written if path.exists()]
 
+        with profiling.span("tar.extract", dest=str(target)) as sp:
+            skipped = filtered = 0
+            for member in tf:
+                full = clean_name(member.name)
+                if matcher is None:  # a tarball that starts with a folder is taken to be wrapped in it
+                    matcher = spec.matcher(full.split("/")[0] if member.isdir() or "/" in full else "")
+                wrapped = matcher.root
+                rel = matcher.relative(full)
+                if wrapped and not matcher.root:  # it was not: paths in the addon start at the top
+                    prune()
+                if rel == IGNORE_FILE and member.isfile():
+                    # usually the first file of its folder; drop whatever it excludes that came before
+                    matcher.add_ignore(tf.extractfile(member).read().decode("utf-8", "replace"))
+                    prune()
+                    continue
+                if rel is None or not matcher.keep(rel, member.isdir()):
+                    filtered += rel != ""
+                    continue
+                check.member(member.name, member.size if member.isfile() else 0, member.isdir(),
+                             stream.count if stream is not None else None)
+                path = staging / full
+                if member.isdir():
+                    path.mkdir(parents=True, exist_ok=True)
+                    continue
+                if not member.isfile():
+                    skipped += 1
+                    continue
+                path.parent.mkdir(parents=True, exist_ok=True)
+                src = tf.extractfile(member)
+                if src is None:
+                    raise PreflightError(f"Cannot read archive member {member.name!r}")
+                with src, open(path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                written.append((full, path))
+                report("extract", check.stats.files, None, "files")
+            report("extract", check.stats.files, check.stats.files, "files", final=True)
+            sp.set(files=check.stats.files, bytes=check.stats.total_size, skipped=skipped, filtered=filtered)
+        if spec.subdir:
+            if matcher is None or matcher.matched is None:
+                raise ValueError(f"Archive has no folder {spec.subdir!r}")
+            root = staging / matcher.matched
+        else:  # unwrap a single top-level folder, judged by the whole archive like for zips
+            root = staging / matcher.root if matcher is not None and matcher.root else staging
+        root.mkdir(parents=True, exist_ok=True)
+        if on_conflicts is not None:
+            from .asset_index import scan_ids
+
+            _check_conflicts(assets_root, name, scan_ids(root), on_conflicts)
+        if target.exists():
+            shutil.rmtree(target)
+        shutil.move(str(root), str(target))  # a rename unless the state folder is on another volume
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+class _CountingReader:
+    """File-like view of an HTTP body that counts (and hashes) the bytes read.
+
+    Reports `download` progress while a tar stream is extracted from it.
+    """
+
+    def __init__(self, raw, report: Throttle, total: Optional[int]):
+        import hashlib
+
+        self.raw = raw
+        self.report = report
+        self.total = total
+        self.count = 0
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.count += len(data)
+        self.sha256.update(data)
+        self.report("download", self.count, self.total)
+        return data
+
+
+def install_addon_stream(raw, name: str, assets_root: Path, overwrite: bool = False,
+                         progress: Optional[ProgressCallback] = None, optimize_textures: bool = False,
+                         origin: Optional[dict] = None, total: Optional[int] = None,
+                         filters: Optional[ArchiveFilter] = None,
+                         on_conflicts: Optional[ConflictCallback] = None) -> Path:
+    """Install a tar (optionally gzip-compressed) archive read from the file-like `raw`.
+
+    Members are extracted while the data arrives, so for an HTTP response the
+    download and the extraction overlap and the archive never touches disk.
+    `total` is the expected size in bytes, for progress. The addon is
+    installed as `name`, or as the name of the `filters` subdirectory.
+    """
+    import tarfile
+    from .locks import addon_lock
+
+    report = throttled(progress)
+    reader = _CountingReader(raw, report, total)
+    name = filters.addon_name(name) if filters else name
+    with profiling.span("install_addon_stream", addon=name) as sp, addon_lock(assets_root, name):
+        with tarfile.open(fileobj=reader, mode="r|*") as tf:
+            dest = _install_tar(tf, name, assets_root, overwrite, report, reader, filters, on_conflicts)
+        report("download", reader.count, reader.count, final=True)
+        sp.set(bytes=reader.count)
+        origin = dict(origin or {}, sha256=reader.sha256.hexdigest())
+        return _finish_install(assets_root, dest, None, origin, optimize_textures)
+
+
+def install_addon_from_url(url: str, assets_root: Path, overwrite: bool = False,
+                           progress: Optional[ProgressCallback] = None,
+                           optimize_textures: bool = False, origin: Optional[dict] = None,
+                           filters: Optional[ArchiveFilter] = None,
+                           on_conflicts: Optional[ConflictCallback] = None) -> Path:
+    """Download an addon from a URL (zip or tar files, or GitHub repo URLs) and install it.
+
+    Tarballs (including GitHub's) are extracted while they download, without
+    a temporary archive on disk.
+    `file://` URLs (e.g. archives in a local catalog mirror) are installed
+    in place without a download.
+    `progress` receives rate-limited `Progress` events for the download,
+    extract and copy phases. The URL is recorded in the install receipt,
+    together with `origin`; `filters` picks part of the archive and
+    `on_conflicts` hears about asset ID collisions (see `install_addon`).
     Returns the installed folder Path.
     """
+    origin = dict({"url": url}, **(origin or {}))
     parsed = urlparse(url)
+    if parsed.scheme == "file":
+        from .catalog import file_path
+
+        return install_addon(file_path(url), assets_root, overwrite=overwrite, progress=progress,
+                             optimize_textures=optimize_textures, origin=origin, filters=filters,
+                             on_conflicts=on_conflicts)
     if parsed.scheme not in ("http", "https"):
-        raise ValueError("URL must be http or https")
+        raise ValueError("URL must be http, https or file")
+
+    with profiling.span("install_addon_from_url", url=url):
+        return _install_addon_from_url(url, assets_root, overwrite, throttled(progress), optimize_textures, origin,
+                                       filters, on_conflicts)
+
+
+def _install_addon_from_url(url: str, assets_root: Path, overwrite: bool, report: Throttle,
+                            optimize_textures: bool = False, origin: Optional[dict] = None,
+                            filters: Optional[ArchiveFilter] = None,
+                            on_conflicts: Optional[ConflictCallback] = None) -> Path:
+    import requests  # imported here so commands that never download start faster
+
+    parsed = urlparse(url)
+
+    # Tarballs are extracted while they download
+    if archive_suffix(parsed.path) in ('.tar.gz', '.tgz', '.tar'):
+        r = requests.get(url, stream=True)
+        r.raise_for_status()
+        return _install_response_tar(r, archive_name(Path(parsed.path)), assets_root, overwrite, report,
+                                     optimize_textures, origin, filters, on_conflicts)
 
     # If URL directly points to a zip, download and extract
     if url.lower().endswith('.zip'):
         r = requests.get(url, stream=True)
         r.raise_for_status()
-        tf = Path(tempfile.gettempdir()) / (Path(url).stem + '.zip')
-        with open(tf, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-        return install_addon(tf, assets_root, overwrite=overwrite)
+        tf = _download(r, Path(tempfile.gettempdir()) / (Path(url).stem + '.zip'), report)
+        return install_addon(tf, assets_root, overwrite=overwrite, progress=report,
+                             optimize_textures=optimize_textures, origin=origin, filters=filters,
+                             on_conflicts=on_conflicts)
 
     # Heuristic: handle GitHub repo page like https://github.com/owner/repo or with branch
     if 'github.com' in parsed.netloc:
         parts = parsed.path.strip('/').split('/')
         if len(parts) >= 2:
             owner, repo = parts[0], parts[1]
-            # try main then master
+            # try main then master; the tarball streams, and installs as the repo name
             for branch in ('main', 'master'):
-                zip_url = f'https://github.com/{owner}/{repo}/archive/refs/heads/{branch}.zip'
+                tar_url = f'https://github.com/{owner}/{repo}/archive/refs/heads/{branch}.tar.gz'
                 try:
-                    r = requests.head(zip_url, allow_redirects=True)
-                    if r.status_code == 200:
-                        return install_addon_from_url(zip_url, assets_root, overwrite=overwrite)
+                    with profiling.span("probe", url=tar_url) as sp:
+                        r = requests.get(tar_url, stream=True)
+                        sp.set(status=r.status_code)
                 except Exception:
                     continue
+                if r.status_code == 200:
+                    return _install_response_tar(r, repo, assets_root, overwrite, report, optimize_textures, origin,
+                                                 filters, on_conflicts)
+                r.close()
     # Fallback: attempt to GET and check content-type
     r = requests.get(url, stream=True)
     r.raise_for_status()
     ct = r.headers.get('content-type', '')
+    if 'gzip' in ct or 'tar' in ct:
+        return _install_response_tar(r, Path(parsed.path).stem, assets_root, overwrite, report,
+                                     optimize_textures, origin, filters, on_conflicts)
     if 'zip' in ct or url.lower().endswith('.zip'):
-        tf = Path(tempfile.gettempdir()) / (Path(urlparse(url).path).stem + '.zip')
-        with open(tf, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-        return install_addon(tf, assets_root, overwrite=overwrite)
+        tf = _download(r, Path(tempfile.gettempdir()) / (Path(urlparse(url).path).stem + '.zip'), report)
+        return install_addon(tf, assets_root, overwrite=overwrite, progress=report,
+                             optimize_textures=optimize_textures, origin=origin, filters=filters,
+                             on_conflicts=on_conflicts)
 
     raise ValueError('Could not determine how to download/install the provided URL')
 
 
+def _install_response_tar(r, name: str, assets_root: Path, overwrite: bool, report: Throttle,
+                          optimize_textures: bool, origin: Optional[dict],
+                          filters: Optional[ArchiveFilter] = None,
+                          on_conflicts: Optional[ConflictCallback] = None) -> Path:
+    try:
+        total = int(r.headers.get('content-length', ''))
+    except ValueError:
+        total = None
+    r.raw.decode_content = True  # undo a Content-Encoding; tarfile handles the gzip layer itself
+    with r:
+        return install_addon_stream(r.raw, name, assets_root, overwrite, report, optimize_textures, origin, total,
+                                    filters, on_conflicts)
+
+
 def uninstall_addon(name: str, assets_root: Path) -> None:
-    path = assets_root / name
-    if not path.exists():
-        raise FileNotFoundError("Addon not found: %s" % name)
-    shutil.rmtree(path)
+    """Remove addon folder `name`, or the folder catalog entry `name` was installed as.
+
+    Disabled addons are removed as well.
+    """
+    from .locks import addon_lock
+    from .receipts import ReceiptStore
+
+    if not (assets_root / name).exists() and not (disabled_dir(assets_root) / name).exists():
+        with ReceiptStore(assets_root) as store:
+            receipt = store.find(name)
+        if receipt is not None:
+            name = receipt.addon
+    with addon_lock(assets_root, name):
+        path = assets_root / name
+        if not path.exists():
+            path = disabled_dir(assets_root) / name
+        if not path.exists():
+            raise FileNotFoundError("Addon not found: %s" % name)
+        with profiling.span("uninstall_addon", addon=name):
+            shutil.rmtree(path)
+            _after_uninstall(assets_root, name)
 
 
 def load_manifest(addon_path: Path) -> Optional[dict]:
@@ -191,46 +733,285 @@ def load_manifest(addon_path: Path) -> Optional[dict]:
         return None
 
 
-def cli(argv: Optional[Iterable[str]] = None) -> int:
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="cubyz-addon")
+    parser.add_argument("--profile", metavar="FILE", default=None,
+                        help="Record stage timings to FILE (also: $%s)" % profiling.ENV_VAR)
+    parser.add_argument("--profile-format", choices=profiling.FORMATS, default=None,
+                        help="jsonl or chrome trace (default: chrome for .json files)")
+    parser.add_argument("--cprofile", metavar="FILE", default=None,
+                        help="Capture a cProfile dump of the command to FILE")
     sub = parser.add_subparsers(dest="cmd")
 
-    p_list = sub.add_parser("list", help="List installed addons")
+    p_list = sub.add_parser("list", help="List installed addons (disabled ones are marked)")
     p_list.add_argument("--assets", help="Path to game assets folder", default=None)
+    p_list.add_argument("--sizes", action="store_true", help="Show disk usage and file counts")
+
+    p_du = sub.add_parser("du", help="Show disk usage of installed addons, largest first")
+    p_du.add_argument("--assets", help="Path to game assets folder", default=None)
+    p_du.add_argument("--top", type=int, default=None, metavar="N", help="Only show the N largest")
 
-    p_install = sub.add_parser("install", help="Install addon (folder or zip)")
-    p_install.add_argument("source", help="Folder or zip to install")
+    p_install = sub.add_parser("install", help="Install addon (folder, zip, URL or catalog ID)")
+    p_install.add_argument("source", help="Folder, zip, http(s) URL or catalog addon ID to install")
     p_install.add_argument("--assets", help="Path to game assets folder", default=None)
     p_install.add_argument("--overwrite", action="store_true")
+    p_install.add_argument("--optimize-textures", action="store_true",
+                           help="Losslessly recompress PNG textures after installing")
+    p_install.add_argument("--no-deps", action="store_true", help="Do not install missing dependencies")
+    p_install.add_argument("--catalog", help="Catalog URL for dependencies and catalog IDs", default=None)
+    p_install.add_argument("--subdir", metavar="PATH", default=None,
+                           help="Only install this folder of the archive (e.g. addons/foo)")
+    p_install.add_argument("--include", metavar="GLOB", action="append", default=[],
+                           help="Only extract matching files and folders (repeatable)")
+    p_install.add_argument("--exclude", metavar="GLOB", action="append", default=[],
+                           help="Never extract matching files and folders (repeatable)")
 
     p_un = sub.add_parser("uninstall", help="Uninstall addon by name")
-    p_un.add_argument("name", help="Name of addon folder to remove")
+    p_un.add_argument("name", help="Name of addon folder (or catalog ID it was installed from) to remove")
     p_un.add_argument("--assets", help="Path to game assets folder", default=None)
 
-    args = parser.parse_args(list(argv) if argv else None)
+    p_en = sub.add_parser("enable", help="Enable disabled addons again")
+    p_en.add_argument("names", nargs="+", help="Addon folders (or catalog IDs) to enable")
+    p_en.add_argument("--assets", help="Path to game assets folder", default=None)
+
+    p_dis = sub.add_parser("disable", help="Disable addons without uninstalling them")
+    p_dis.add_argument("names", nargs="+", help="Addon folders (or catalog IDs) to disable")
+    p_dis.add_argument("--assets", help="Path to game assets folder", default=None)
+
+    p_prof = sub.add_parser("profile", help="Save named sets of enabled addons and switch between them")
+    p_prof.add_argument("action", choices=["list", "save", "use", "delete"])
+    p_prof.add_argument("name", nargs="?", help="Profile name")
+    p_prof.add_argument("addons", nargs="*", help="Addons for save (default: the enabled ones)")
+    p_prof.add_argument("--assets", help="Path to game assets folder", default=None)
+
+    p_snap = sub.add_parser("snapshot", help="Hard-link snapshots of the assets folder, for rolling back")
+    p_snap.add_argument("action", choices=["create", "list", "restore", "delete"])
+    p_snap.add_argument("name", nargs="?", help="Snapshot name (create: default is the date and time)")
+    p_snap.add_argument("--assets", help="Path to game assets folder", default=None)
+
+    p_val = sub.add_parser("validate", help="Validate installed addons")
+    p_val.add_argument("names", nargs="*", help="Addon folders to validate (default: all)")
+    p_val.add_argument("--assets", help="Path to game assets folder", default=None)
+    p_val.add_argument("--deep", action="store_true",
+                       help="Parse every data file and check referenced textures")
+    p_val.add_argument("--jobs", type=int, default=None, help="Worker processes for --deep")
+    p_val.add_argument("--no-cache", action="store_true", help="Ignore cached parse results")
+
+    p_conf = sub.add_parser("conflicts", help="Show asset IDs defined by more than one addon")
+    p_conf.add_argument("names", nargs="*", help="Only show conflicts involving these addons")
+    p_conf.add_argument("--assets", help="Path to game assets folder", default=None)
+    p_conf.add_argument("--rebuild", action="store_true", help="Rescan every addon folder")
+
+    p_ver = sub.add_parser("verify", help="Check installed addons against their install manifests")
+    p_ver.add_argument("names", nargs="*", help="Addon folders to verify (default: all)")
+    p_ver.add_argument("--assets", help="Path to game assets folder", default=None)
+    p_ver.add_argument("--full", action="store_true",
+                       help="Rehash every file, even if size and mtime are unchanged")
+    p_ver.add_argument("--jobs", type=int, default=None, help="Hashing threads")
 
-    start = Path.cwd()
-    assets = Path(args.assets) if getattr(args, 'assets', None) else find_assets_root(start)
+    p_own = sub.add_parser("owner", help="Show which addon installed a file and where it came from")
+    p_own.add_argument("path", help="File in the assets folder")
+    p_own.add_argument("--assets", help="Path to game assets folder", default=None)
+
+    p_pack = sub.add_parser("pack", help="Build an installable zip from an addon folder")
+    p_pack.add_argument("folder", help="Addon folder to pack")
+    p_pack.add_argument("--out", help="Output zip (default: <folder name>.zip)", default=None)
+    p_pack.add_argument("--level", type=int, default=9, help="Deflate level 1-9 (default 9)")
+    p_pack.add_argument("--jobs", type=int, default=None, help="Compression threads")
+
+    p_opt = sub.add_parser("optimize", help="Losslessly shrink PNG textures of installed addons")
+    p_opt.add_argument("names", nargs="*", help="Addon folders to optimize (default: all)")
+    p_opt.add_argument("--assets", help="Path to game assets folder", default=None)
+    p_opt.add_argument("--level", type=int, default=9, help="zlib level 1-9 (default 9)")
+    p_opt.add_argument("--jobs", type=int, default=None, help="Worker processes")
+    p_opt.add_argument("--no-cache", action="store_true", help="Reprocess already optimized files")
+
+    p_out = sub.add_parser("outdated", help="List installed addons with a newer catalog version")
+    p_out.add_argument("--assets", help="Path to game assets folder", default=None)
+    p_out.add_argument("--catalog", help="Catalog URL", default=None)
+
+    p_up = sub.add_parser("upgrade", help="Update installed addons to the latest catalog version")
+    p_up.add_argument("names", nargs="*", help="Addon folders to upgrade")
+    p_up.add_argument("--all", action="store_true", help="Upgrade every outdated addon")
+    p_up.add_argument("--assets", help="Path to game assets folder", default=None)
+    p_up.add_argument("--catalog", help="Catalog URL", default=None)
+    p_up.add_argument("--jobs", type=int, default=None, help="Concurrent downloads")
+
+    p_mirror = sub.add_parser("mirror", help="Copy the catalog and its archives into a local folder")
+    p_mirror.add_argument("dest", help="Mirror folder (serve it over HTTP or use it as a file:// base URL)")
+    p_mirror.add_argument("--source", help="Base URL to mirror (default: the configured base_url)",
+                          default=None)
+    p_mirror.add_argument("--assets", help="Path to game assets folder", default=None)
+    p_mirror.add_argument("--jobs", type=int, default=None, help="Concurrent downloads")
+
+    p_src = sub.add_parser("sources", help="Fetch every catalog source and show its status")
+    p_src.add_argument("--assets", help="Path to game assets folder", default=None)
+
+    p_cfg = sub.add_parser("config", help="Show or change settings (e.g. base_url, sources)")
+    p_cfg.add_argument("key", nargs="?", help="Setting to show or change")
+    p_cfg.add_argument("value", nargs="?", help="New value (JSON for lists such as sources)")
+    p_cfg.add_argument("--unset", action="store_true", help="Remove the setting from config.json")
+    p_cfg.add_argument("--assets", help="Path to game assets folder", default=None)
+
+    p_serve = sub.add_parser("serve", help="Stay resident and answer CLI calls over a local socket")
+    p_serve.add_argument("--assets", help="Path to game assets folder", default=None)
+    p_serve.add_argument("--socket", help="Socket path (default: in the state folder)", default=None)
+    p_serve.add_argument("--stop", action="store_true", help="Stop the running server")
+
+    return parser
+
+
+def cli(argv: Optional[Iterable[str]] = None) -> int:
+    parser = build_parser()
+    argv = list(argv) if argv else sys.argv[1:]
+    args = parser.parse_args(argv)
+
+    # Hand the command to a running `serve` process if there is one
+    if args.cmd not in (None, "serve") and not args.profile and not args.cprofile:
+        from .daemon import LOCAL_COMMANDS, forward
+
+        code = None if args.cmd in LOCAL_COMMANDS else forward(argv, _assets_root(args))
+        if code is not None:
+            return code
+
+    if args.profile:
+        profiling.enable(args.profile, args.profile_format)
+    try:
+        if args.cprofile:
+            return profiling.run_with_cprofile(args.cprofile, _run_command, parser, args)
+        return _run_command(parser, args)
+    finally:
+        if args.profile:
+            profiling.disable()
+
+
+def _load_catalog(args: argparse.Namespace, assets: Path) -> List[dict]:
+    """Catalog entries from --catalog, or merged from the configured sources.
+
+    Sources that failed are reported on stderr; it is only an error when no
+    source produced any entries.
+    """
+    from .catalog import fetch_catalog
+    from .sources import load_catalog
+
+    if getattr(args, "catalog", None):
+        return fetch_catalog(args.catalog)
+    catalog = load_catalog(assets)
+    for status in catalog.errors:
+        fallback = " (using cached copy)" if status.cached else ""
+        print(f"Warning: catalog source {status.name} failed: {status.error}{fallback}", file=sys.stderr)
+    if not catalog.entries and catalog.errors:
+        raise RuntimeError("No catalog source could be read")
+    return catalog.entries
+
+
+def _assets_root(args: argparse.Namespace) -> Path:
+    return Path(args.assets) if getattr(args, 'assets', None) else find_assets_root(Path.cwd())
+
+
+def _run_command(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    assets = _assets_root(args)
 
     if args.cmd == "list":
-        addons = list_installed(assets)
+        addons = list_installed(assets, sizes=args.sizes, disabled=True)
         for a in addons:
             v = a.manifest.get('version') if a.manifest else 'unknown'
-            print(f"{a.name}\t{v}\t{a.path}")
+            state = "" if a.enabled else "\tdisabled"
+            if args.sizes:
+                print(f"{a.name}\t{v}\t{format_bytes(a.size)}\t{a.file_count} files\t{a.path}{state}")
+            else:
+                print(f"{a.name}\t{v}\t{a.path}{state}")
+        return 0
+
+    if args.cmd == "du":
+        addons = sorted(list_installed(assets, sizes=True), key=lambda a: a.size, reverse=True)
+        shown = addons[:args.top] if args.top else addons
+        for a in shown:
+            print(f"{format_bytes(a.size):>12}\t{a.file_count:>8} files\t{a.name}")
+        print(f"{format_bytes(sum(a.size for a in addons)):>12}\t"
+              f"{sum(a.file_count for a in addons):>8} files\ttotal")
         return 0
 
     if args.cmd == "install":
+        from .dependencies import (install_plan, parse_dependencies, resolve, source_manifest,
+                                   unsatisfied)
+        from .receipts import ReceiptStore
+
         src = Path(args.source)
+        is_url = urlparse(args.source).scheme in ("http", "https", "file")
+        from_catalog = not is_url and not src.exists()
+        filters = ArchiveFilter(args.subdir, args.include, args.exclude)
         try:
-            installed = install_addon(src, assets, overwrite=args.overwrite)
-            print(f"Installed: {installed}")
+            if from_catalog and filters.active:
+                raise ValueError("--subdir, --include and --exclude only apply to archives and URLs")
+            plan = []
+            # Disabled addons and receipts too, so a dependency already on disk is found by its catalog ID
+            with ReceiptStore(assets) as store:
+                receipts = store.all()
+            current = list_installed(assets, disabled=True)
+            if from_catalog:
+                plan = resolve(_load_catalog(args, assets),
+                               current, install_ids=[args.source],
+                               dependencies=not args.no_deps, receipts=receipts)
+                root = plan[-1]  # dependencies come first
+                existing = _existing_copy(assets, root.folder)
+                if existing is not None and not args.overwrite:
+                    raise FileExistsError(f"Addon already installed: {existing}")
+            elif not is_url:
+                manifest = source_manifest(src) or {}
+                requirements = parse_dependencies(manifest)
+                if not args.no_deps and unsatisfied(requirements, current, receipts):
+                    parent = str(manifest.get("id") or (src.name if src.is_dir() else archive_name(src))).lower()
+                    plan = resolve(_load_catalog(args, assets), current,
+                                   requirements=[(r, parent) for r in requirements], receipts=receipts)
+            for p in plan:
+                reason = f" (required by {', '.join(p.required_by)})" if p.required_by else ""
+                print(f"{'Enabling' if p.enable else 'Installing'}: {p.folder} {p.version}{reason}")
+            progress = TerminalProgress(sys.stderr) if sys.stderr.isatty() else None
+
+            def warn_conflicts(name, conflicts):
+                # Reported before the addon is written, whatever kind of source it comes from
+                from .asset_index import format_conflict
+
+                for key, owners in conflicts.items():
+                    print("Warning: conflicting", format_conflict(key, owners + [name]))
+
+            try:
+                for path in install_plan(plan, assets, progress=progress, optimize_textures=args.optimize_textures,
+                                         on_conflicts=warn_conflicts):
+                    print(f"Installed: {path}")
+                if from_catalog:
+                    installed = path
+                elif is_url:
+                    installed = install_addon_from_url(args.source, assets, overwrite=args.overwrite,
+                                                       progress=progress,
+                                                       optimize_textures=args.optimize_textures,
+                                                       filters=filters, on_conflicts=warn_conflicts)
+                else:
+                    installed = install_addon(src, assets, overwrite=args.overwrite, progress=progress,
+                                              optimize_textures=args.optimize_textures, filters=filters,
+                                              on_conflicts=warn_conflicts)
+            finally:
+                if progress:
+                    progress.close()
+            if not from_catalog:
+                print(f"Installed: {installed}")
+            with ReceiptStore(assets) as store:
+                receipts = store.all()
+            for r in unsatisfied(parse_dependencies(load_manifest(installed)), list_installed(assets), receipts):
+                print(f"Warning: {installed.name} needs {r}, which is not installed")
             return 0
         except Exception as e:
             print("Error:", e)
             return 2
 
     if args.cmd == "uninstall":
+        from .dependencies import dependents
+
         try:
+            users = dependents(list_installed(assets), args.name)
+            if users:
+                print(f"Warning: {', '.join(users)} depend(s) on {args.name}")
             uninstall_addon(args.name, assets)
             print("Uninstalled: ", args.name)
             return 0
@@ -238,6 +1019,271 @@ def cli(argv: Optional[Iterable[str]] = None) -> int:
             print("Error:", e)
             return 2
 
+    if args.cmd in ("enable", "disable"):
+        from .profiles import disable_addon, enable_addon
+
+        toggle = enable_addon if args.cmd == "enable" else disable_addon
+        try:
+            for name in args.names:
+                toggle(name, assets)
+                print(f"{args.cmd.capitalize()}d: {name}")
+            return 0
+        except Exception as e:
+            print("Error:", e)
+            return 2
+
+    if args.cmd == "profile":
+        from .profiles import current_profile, delete_profile, load_profiles, save_profile, use_profile
+
+        try:
+            if args.action == "list":
+                current = current_profile(assets)
+                for name, addons in sorted(load_profiles(assets).items()):
+                    marker = "*" if name == current else " "
+                    print(f"{marker} {name}\t{len(addons)} addons\t{', '.join(addons)}")
+                return 0
+            if not args.name:
+                raise ValueError(f"profile {args.action} needs a profile name")
+            if args.action == "save":
+                addons = save_profile(assets, args.name, args.addons or None)
+                print(f"Saved profile {args.name}: {', '.join(addons) or 'no addons'}")
+            elif args.action == "use":
+                enabled, disabled = use_profile(assets, args.name)
+                for name in enabled:
+                    print(f"Enabled: {name}")
+                for name in disabled:
+                    print(f"Disabled: {name}")
+                print(f"Using profile {args.name}")
+            else:
+                delete_profile(assets, args.name)
+                print(f"Deleted profile {args.name}")
+            return 0
+        except Exception as e:
+            print("Error:", e)
+            return 2
+
+    if args.cmd == "snapshot":
+        import time
+
+        from .snapshots import create_snapshot, delete_snapshot, list_snapshots, restore_snapshot
+
+        try:
+            if args.action == "list":
+                for s in list_snapshots(assets):
+                    created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(s.created))
+                    print(f"{s.name}\t{created}\t{s.files} files")
+                return 0
+            if args.action == "create":
+                s = create_snapshot(assets, args.name)
+                copied = f" ({s.copied} copied, hard links unsupported)" if s.copied else ""
+                print(f"Created snapshot {s.name}: {s.files} files{copied}")
+                return 0
+            if not args.name:
+                raise ValueError(f"snapshot {args.action} needs a snapshot name")
+            if args.action == "restore":
+                restore_snapshot(assets, args.name)
+                print(f"Restored snapshot {args.name}")
+            else:
+                delete_snapshot(assets, args.name)
+                print(f"Deleted snapshot {args.name}")
+            return 0
+        except Exception as e:
+            print("Error:", e)
+            return 2
+
+    if args.cmd == "validate":
+        if args.names:
+            paths = [assets / n for n in args.names]
+        else:
+            paths = [a.path for a in list_installed(assets)]
+        if not args.deep:
+            bad = [p for p in paths if not validate_addon_dir(p)]
+            for p in paths:
+                print(f"{p.name}\t{'invalid' if p in bad else 'ok'}")
+            return 1 if bad else 0
+        from .validation import deep_validate
+
+        reports = deep_validate(paths, assets, workers=args.jobs, use_cache=not args.no_cache)
+        for r in reports:
+            status = "ok" if r.ok else f"{len(r.issues)} problem(s)"
+            print(f"{r.name}\t{status}\t({r.files} files, {r.cached} cached)")
+            for issue in r.issues:
+                print(f"  {issue.path}: {issue.message}")
+        return 0 if all(r.ok for r in reports) else 1
+
+    if args.cmd == "conflicts":
+        from .asset_index import AssetIndex, format_conflict
+
+        conflicts = AssetIndex.load(assets, rebuild=args.rebuild).conflicts(args.names)
+        for key, owners in conflicts.items():
+            print(format_conflict(key, owners))
+        return 1 if conflicts else 0
+
+    if args.cmd == "verify":
+        from .integrity import verify_addon
+
+        names = args.names or list(dict.fromkeys(a.name for a in list_installed(assets, disabled=True)))
+        failed = False
+        for name in names:
+            try:
+                report = verify_addon(assets, name, full=args.full, workers=args.jobs)
+            except FileNotFoundError as e:
+                if args.names:
+                    print("Error:", e)
+                    failed = True
+                else:
+                    print(f"{name}\tno manifest")
+                continue
+            print(f"{name}\t{'ok' if report.ok else 'changed'}\t({report.checked} files, {report.hashed} hashed)")
+            for label, rels in (("modified", report.modified), ("missing", report.missing), ("extra", report.extra)):
+                for rel in rels:
+                    print(f"  {label}: {rel}")
+            failed = failed or not report.ok
+        return 1 if failed else 0
+
+    if args.cmd == "pack":
+        from .pack import pack_addon
+
+        try:
+            out = pack_addon(Path(args.folder), Path(args.out) if args.out else None,
+                             level=args.level, workers=args.jobs)
+            print(f"Packed: {out}")
+            return 0
+        except Exception as e:
+            print("Error:", e)
+            return 2
+
+    if args.cmd == "optimize":
+        from .integrity import load_manifest as load_integrity_manifest, record_manifest
+        from .optimize import optimize_addons
+
+        paths = [assets / n for n in args.names] if args.names else [a.path for a in list_installed(assets)]
+        results = optimize_addons(paths, assets, level=args.level, workers=args.jobs,
+                                  use_cache=not args.no_cache)
+        for r in results:
+            print(f"{r.name}\tsaved {format_bytes(r.saved)}\t({r.optimized} of {r.files} textures rewritten,"
+                  f" {r.skipped} cached" + (f", {r.failed} unreadable" if r.failed else "") + ")")
+            # The manager changed these files itself; keep `verify` quiet about them
+            if r.optimized and load_integrity_manifest(assets, r.name) is not None:
+                record_manifest(assets, r.name)
+        return 0
+
+    if args.cmd == "owner":
+        from .receipts import ReceiptStore
+
+        path = Path(args.path)
+        try:
+            rel = path.resolve().relative_to(assets.resolve()).as_posix()
+        except ValueError:
+            rel = path.as_posix()  # relative to the assets folder
+        with ReceiptStore(assets) as store:
+            addon = store.owner(rel)
+            receipt = store.get(addon) if addon else None
+        if receipt is None:
+            print(f"{rel}: not installed by the manager")
+            return 1
+        print(f"{rel}\t{receipt.addon}\t{receipt.catalog_id or '-'}\t{receipt.version or '-'}\t{receipt.url or '-'}")
+        return 0
+
+    if args.cmd in ("outdated", "upgrade"):
+        from .catalog import find_outdated, upgrade_addons
+        from .receipts import ReceiptStore
+
+        if args.cmd == "upgrade" and not args.names and not args.all:
+            print("Error: name the addons to upgrade or pass --all")
+            return 2
+        try:
+            catalog = _load_catalog(args, assets)
+        except Exception as e:
+            print("Error:", e)
+            return 2
+        with ReceiptStore(assets) as store:
+            receipts = store.all()
+        outdated = find_outdated(list_installed(assets), catalog, receipts)
+        if args.cmd == "outdated":
+            for o in outdated:
+                print(f"{o.name}\t{o.installed}\t->\t{o.latest}")
+            return 0
+        if args.names:
+            wanted = set(args.names)
+            outdated = [o for o in outdated if o.name in wanted]
+            for name in sorted(wanted - {o.name for o in outdated}):
+                print(f"{name}\tup to date or not in the catalog")
+        failed = False
+        for r in upgrade_addons(outdated, assets, workers=args.jobs):
+            if r.ok:
+                print(f"Upgraded: {r.item.name} {r.item.installed} -> {r.item.latest}")
+            else:
+                print(f"Error: {r.item.name}: {r.error}")
+                failed = True
+        return 2 if failed else 0
+
+    if args.cmd == "mirror":
+        from .config import base_url
+        from .mirror import mirror_catalog
+
+        try:
+            result = mirror_catalog(Path(args.dest), args.source or base_url(assets), workers=args.jobs)
+        except Exception as e:
+            print("Error:", e)
+            return 2
+        for rel, error in result.failed:
+            print(f"Error: {rel}: {error}")
+        print(f"Mirrored into {args.dest}: {len(result.fetched)} downloaded, {len(result.unchanged)} unchanged, "
+              f"{len(result.removed)} removed, {len(result.failed)} failed")
+        return 1 if result.failed else 0
+
+    if args.cmd == "config":
+        from .config import load_config, set_setting
+
+        if args.unset and args.key:
+            set_setting(assets, args.key, None)
+        elif args.value is not None:
+            try:
+                value = json.loads(args.value)
+            except ValueError:
+                value = args.value
+            set_setting(assets, args.key, value)
+        config = load_config(assets)
+        for key in [args.key] if args.key else sorted(config):
+            value = config.get(key, '')
+            print(f"{key}\t{value if isinstance(value, str) else json.dumps(value)}")
+        return 0
+
+    if args.cmd == "sources":
+        from .sources import catalog_sources, load_catalog
+
+        try:
+            sources = catalog_sources(assets)
+        except ValueError as e:
+            print("Error:", e)
+            return 2
+        catalog = load_catalog(assets, sources)
+        for source, status in zip(sources, catalog.sources):
+            state = "ok" if not status.error else f"failed: {status.error}"
+            if status.cached:
+                state += " (cached copy)"
+            print(f"{source.name}\tpriority {source.priority}\t{status.entries} addons\t{state}\t{source.url}")
+        print(f"{len(catalog.entries)} addons after merging")
+        return 1 if catalog.errors else 0
+
+    if args.cmd == "serve":
+        from .daemon import serve, socket_path, stop
+
+        path = Path(args.socket) if args.socket else socket_path(assets)
+        try:
+            if args.stop:
+                stop(path)
+                print(f"Stopped server on {path}")
+                return 0
+            print(f"Serving {assets} on {path}")
+            sys.stdout.flush()
+            serve(assets, path)
+            return 0
+        except Exception as e:
+            print("Error:", e)
+            return 2
+
     parser.print_help()
     return 1
 
@@ -0,0 +1,338 @@
+"""Resident server mode, so repeated CLI calls skip the startup costs.
+
+`cubyz-addon serve` listens on a Unix socket (by default in the state
+folder) and keeps the things a one-shot run has to rebuild warm: the
+interpreter and imported modules, parsed addon.json files (reused while
+unchanged), the merged catalog (for `CATALOG_TTL` seconds) and a pooled HTTP
+session. While it runs, other `cubyz-addon` invocations for the same assets
+folder forward their arguments to it and print its output, so scripts do not
+have to change. Set `CUBYZ_ADDON_NO_DAEMON=1` to bypass it, or
+`CUBYZ_ADDON_SOCKET` to use a server on a non-default socket. Commands
+that download and install (`LOCAL_COMMANDS`) always run in the calling
+process, since a forwarded command's output only arrives once it is done
+and they show progress as they go.
+
+The protocol is JSON-RPC 2.0 over newline-delimited JSON; a connection may
+send any number of requests:
+
+    {"jsonrpc": "2.0", "id": 1, "method": "run",
+     "params": {"argv": ["list"], "cwd": "/srv", "env": {"CUBYZ_ADDON_LOCK_TIMEOUT": "10"}}}
+    {"jsonrpc": "2.0", "id": 1, "result": {"exit": 0, "stdout": "...", "stderr": ""}}
+
+Methods: `ping`, `run` (a CLI command, output captured), `list` (installed
+addons as objects) and `shutdown`. Commands from different connections run
+concurrently, taking the same locks (see `locks`) as separate processes
+would, so work on different addons proceeds in parallel. Each command's
+output is captured separately, relative paths in its arguments are taken
+relative to the client's `cwd`, and the `CUBYZ_ADDON_*` settings in `env`
+apply to it alone (see `config.environment`).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from . import core
+from .config import env_overrides, environment
+
+SOCKET_NAME = "daemon.sock"
+SOCKET_ENV_VAR = "CUBYZ_ADDON_SOCKET"
+DISABLE_ENV_VAR = "CUBYZ_ADDON_NO_DAEMON"
+CATALOG_TTL = 300
+# Unix socket paths are limited to about 100 bytes
+MAX_SOCKET_PATH = 100
+# Long-running commands with live progress; never forwarded
+LOCAL_COMMANDS = ("install", "upgrade", "mirror")
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+# Arguments naming files or folders, made absolute against the client's working directory
+PATH_ARGS = ("assets", "folder", "out", "dest")
+# Arguments that may name a file or something else (a URL, catalog ID, assets-relative path)
+MAYBE_PATH_ARGS = ("source", "path")
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def socket_path(assets_root: Path) -> Path:
+    """Default socket for an assets folder (in the temp folder if that path is too long)."""
+    path = core.state_dir(assets_root.resolve()) / SOCKET_NAME
+    if len(str(path)) <= MAX_SOCKET_PATH:
+        return path
+    digest = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"cubyz-addon-{digest}.sock"
+
+
+class Client:
+    """A connection to a running server."""
+
+    def __init__(self, path: Path, timeout: Optional[float] = None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.settimeout(timeout)
+            self.sock.connect(str(path))
+        except OSError:
+            self.sock.close()
+            raise
+        self.file = self.sock.makefile("rwb")
+        self._next_id = 0
+
+    def call(self, method: str, **params):
+        self._next_id += 1
+        request = {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params}
+        self.file.write(json.dumps(request).encode("utf-8") + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise RPCError(response["error"]["code"], response["error"]["message"])
+        return response["result"]
+
+    def close(self) -> None:
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def connect(path: Path) -> Optional[Client]:
+    """Client for the server on `path`, or None if no server is listening."""
+    if not hasattr(socket, "AF_UNIX") or not path.exists():
+        return None
+    try:
+        return Client(path, timeout=1.0)
+    except OSError:
+        return None
+
+
+def forward(argv: Iterable[str], assets_root: Path) -> Optional[int]:
+    """Run a CLI command on the running server; None if there is none.
+
+    If the server fails or goes away before answering, the command may have
+    partly run there, so it is not run again locally: an error is printed and
+    2 returned.
+    """
+    if os.environ.get(DISABLE_ENV_VAR):
+        return None
+    path = Path(os.environ[SOCKET_ENV_VAR]) if os.environ.get(SOCKET_ENV_VAR) else socket_path(assets_root)
+    client = connect(path)
+    if client is None:
+        return None
+    try:
+        with client:
+            client.sock.settimeout(None)  # commands such as validate --deep may take a while
+            result = client.call("run", argv=list(argv), cwd=os.getcwd(), env=env_overrides())
+            stdout, stderr, code = result["stdout"], result["stderr"], result["exit"]
+    except (OSError, ValueError, KeyError, TypeError, RPCError) as e:
+        print(f"Error: the server on {path} did not complete the command ({str(e) or type(e).__name__}); "
+              f"set {DISABLE_ENV_VAR}=1 to run without it")
+        return 2
+    sys.stdout.write(stdout)
+    sys.stderr.write(stderr)
+    return code
+
+
+def stop(path: Path) -> None:
+    client = connect(path)
+    if client is None:
+        raise FileNotFoundError(f"No server listening on {path}")
+    with client:
+        client.call("shutdown")
+
+
+class _ThreadOutput(io.TextIOBase):
+    """Stand-in for sys.stdout/stderr that writes to the current request's buffer, if any."""
+
+    def __init__(self, fallback, name: str):
+        self.fallback = fallback
+        self.name = name
+
+    def _target(self):
+        return getattr(_captured, self.name, None) or self.fallback
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+
+_captured = threading.local()
+_install_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _capture_output() -> Iterable[tuple]:
+    """Capture what this thread prints, leaving other threads' output alone."""
+    with _install_lock:
+        for name in ("stdout", "stderr"):
+            if not isinstance(getattr(sys, name), _ThreadOutput):
+                setattr(sys, name, _ThreadOutput(getattr(sys, name), name))
+    out, err = io.StringIO(), io.StringIO()
+    _captured.stdout, _captured.stderr = out, err
+    try:
+        yield out, err
+    finally:
+        _captured.stdout = _captured.stderr = None
+
+
+def _absolute_paths(args, cwd: str) -> None:
+    """Make relative path arguments of `args` relative to `cwd` instead of the server's directory."""
+    for name in PATH_ARGS:
+        value = getattr(args, name, None)
+        if isinstance(value, str) and value:
+            setattr(args, name, os.path.join(cwd, value))
+    for name in MAYBE_PATH_ARGS:
+        value = getattr(args, name, None)
+        if isinstance(value, str) and value and not os.path.isabs(value) \
+                and os.path.exists(os.path.join(cwd, value)):
+            setattr(args, name, os.path.join(cwd, value))
+
+
+class Daemon:
+    def __init__(self, assets_root: Path):
+        self.assets_root = assets_root.resolve()
+        self.started = time.time()
+        self.parser = core.build_parser()
+        self.server: Optional[socketserver.BaseServer] = None
+        self.stopping = False
+
+    def dispatch(self, method: str, params: dict):
+        if method == "ping":
+            return {"pid": os.getpid(), "assets": str(self.assets_root), "uptime": time.time() - self.started}
+        if method == "run":
+            argv = params.get("argv")
+            if not isinstance(argv, list) or not all(isinstance(a, str) for a in argv):
+                raise RPCError(INVALID_PARAMS, "argv must be a list of strings")
+            env = params.get("env") or {}
+            if not isinstance(env, dict) or not all(isinstance(v, str) for v in env.values()):
+                raise RPCError(INVALID_PARAMS, "env must be an object of strings")
+            return self.run(argv, params.get("cwd"), env)
+        if method == "list":
+            return [{"name": a.name, "path": str(a.path),
+                     "version": a.manifest.get("version") if a.manifest else None}
+                    for a in core.list_installed(self.assets_root)]
+        if method == "shutdown":
+            self.stopping = True  # once the reply is sent (see `_Handler`)
+            return True
+        raise RPCError(METHOD_NOT_FOUND, f"Unknown method: {method}")
+
+    def run(self, argv: list, cwd: Optional[str], env: Optional[dict] = None) -> dict:
+        # The working directory is process-wide, so relative paths are resolved instead of chdir-ing
+        with _capture_output() as (out, err), environment(env or {}):
+            try:
+                args = self.parser.parse_args(argv)
+                if args.cmd in (None, "serve"):
+                    raise RPCError(INVALID_PARAMS, f"Cannot run {args.cmd or 'no command'} on the server")
+                if cwd:
+                    _absolute_paths(args, cwd)
+                if hasattr(args, "assets") and not args.assets:
+                    args.assets = str(self.assets_root)
+                code = core._run_command(self.parser, args)
+            except SystemExit as e:  # argparse errors and --help
+                code = e.code if isinstance(e.code, int) else 2
+            except RPCError:
+                raise
+            except Exception as e:
+                print("Error:", e)
+                code = 2
+        return {"exit": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+    def handle(self, line: bytes) -> dict:
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise RPCError(PARSE_ERROR, "Invalid JSON")
+            if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+                raise RPCError(INVALID_REQUEST, "Expected an object with a method")
+            request_id = request.get("id")
+            params = request.get("params") or {}
+            if not isinstance(params, dict):
+                raise RPCError(INVALID_PARAMS, "params must be an object")
+            with core.profiling.span("daemon.request", method=request["method"]):
+                result = self.dispatch(request["method"], params)
+            return {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except RPCError as e:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": e.code, "message": str(e)}}
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": INTERNAL_ERROR, "message": str(e)}}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.daemon.handle(line)
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+            if self.server.daemon.stopping:
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+def make_server(assets_root: Path, path: Path) -> socketserver.BaseServer:
+    """Bind the server socket (replacing a stale one) without starting to serve."""
+    if not hasattr(socket, "AF_UNIX"):
+        raise OSError("serve needs Unix domain sockets, which this platform does not support")
+    if connect(path) is not None:
+        raise FileExistsError(f"A server is already listening on {path}")
+    if path.exists():
+        path.unlink()  # left behind by a server that did not shut down cleanly
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    server = socketserver.ThreadingUnixStreamServer(str(path), _Handler)
+    server.daemon_threads = True
+    server.daemon = Daemon(assets_root)
+    server.daemon.server = server
+    os.chmod(path, 0o600)
+    return server
+
+
+def serve(assets_root: Path, path: Path) -> None:
+    """Serve until `shutdown` is requested or the process is interrupted."""
+    import requests
+
+    from . import catalog, sources
+
+    core.keep_manifests_warm()
+    sources.keep_warm(CATALOG_TTL)
+    catalog.use_session(requests.Session())
+    server = make_server(assets_root, path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,341 @@
+"""Addon dependencies and install planning.
+
+An addon lists what it needs in its addon.json, either as a mapping of
+addon IDs to version constraints or as a list of requirement strings:
+
+    "dependencies": {"ores": ">=1.2,<2", "lamps": "*"}
+    "dependencies": ["ores>=1.2,<2", "lamps"]
+
+The catalog publishes the same field for each entry, so the whole install
+closure is resolved against the catalog and the installed addons, and
+cycles or version conflicts are reported, before anything is downloaded.
+The closure is then downloaded concurrently and installed dependencies
+first; a disabled addon that satisfies its constraints is enabled instead.
+
+An addon's ID is the `id` from its addon.json, or its folder name; IDs are
+compared case-insensitively. An addon installed from the catalog is also
+known by the catalog ID on its install receipt, whatever its folder is
+called.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from . import profiling
+from .catalog import DOWNLOAD_WORKERS, CatalogIndex, download_entry, entry_origin, entry_suffix, parse_version
+from .core import AddonInfo, ConflictCallback, archive_name, install_addon, load_manifest
+from .profiles import enable_addon
+from .progress import ProgressCallback
+from .receipts import Receipt
+
+OPERATORS = ("==", "!=", ">=", "<=", ">", "<")
+_REQUIREMENT = re.compile(r"^\s*([A-Za-z0-9_.\-]+)\s*(.*)$")
+
+
+class DependencyError(ValueError):
+    """Dependencies cannot be satisfied (missing, conflicting or cyclic)."""
+
+
+@dataclass(frozen=True)
+class Requirement:
+    id: str
+    clauses: Tuple[Tuple[str, str], ...] = ()
+
+    def allows(self, version: Optional[str]) -> bool:
+        if not self.clauses:
+            return True
+        if not version:
+            return False
+        key = parse_version(version)
+        for op, wanted in self.clauses:
+            other = parse_version(wanted)
+            if not {
+                "==": key == other, "!=": key != other,
+                ">=": key >= other, "<=": key <= other,
+                ">": key > other, "<": key < other,
+            }[op]:
+                return False
+        return True
+
+    def __str__(self) -> str:
+        return self.id + ",".join(op + v for op, v in self.clauses)
+
+
+def parse_requirement(ident: str, spec: str = "") -> Requirement:
+    """Build a requirement from an ID and a constraint such as ">=1.2,<2" ("" or "*" for any)."""
+    clauses = []
+    for clause in str(spec or "").split(","):
+        clause = clause.strip()
+        if not clause or clause == "*":
+            continue
+        op = next((o for o in OPERATORS if clause.startswith(o)), None)
+        version = clause[len(op):].strip() if op else clause
+        if not version or any(o in version for o in OPERATORS):
+            raise DependencyError(f"Invalid version constraint for {ident}: {spec!r}")
+        clauses.append((op or "==", version))
+    return Requirement(ident.lower(), tuple(clauses))
+
+
+def parse_dependencies(manifest: Optional[dict]) -> List[Requirement]:
+    """Requirements declared by an addon.json or catalog entry."""
+    deps = (manifest or {}).get("dependencies") or {}
+    if isinstance(deps, dict):
+        return [parse_requirement(ident, spec) for ident, spec in sorted(deps.items())]
+    if isinstance(deps, list):
+        reqs = []
+        for text in deps:
+            m = _REQUIREMENT.match(str(text))
+            if not m:
+                raise DependencyError(f"Invalid dependency: {text!r}")
+            reqs.append(parse_requirement(m.group(1), m.group(2)))
+        return reqs
+    raise DependencyError("'dependencies' must be an object or a list")
+
+
+def addon_id(addon: AddonInfo) -> str:
+    if addon.manifest and addon.manifest.get("id"):
+        return str(addon.manifest["id"]).lower()
+    return addon.name.lower()
+
+
+def _version(addon: AddonInfo) -> Optional[str]:
+    return str(addon.manifest["version"]) if addon.manifest and addon.manifest.get("version") else None
+
+
+def installed_ids(installed: Iterable[AddonInfo],
+                  receipts: Optional[Dict[str, Receipt]] = None) -> Dict[str, AddonInfo]:
+    """Installed addons by ID, including the catalog ID on their receipt.
+
+    `receipts` are by lower-cased folder name (see `ReceiptStore.all`). When
+    an enabled and a disabled copy share an ID, the enabled one wins.
+    """
+    have: Dict[str, AddonInfo] = {}
+    for a in installed:
+        receipt = receipts.get(a.name.lower()) if receipts else None
+        idents = {addon_id(a)}
+        if receipt is not None and receipt.catalog_id:
+            idents.add(receipt.catalog_id.lower())
+        for ident in idents:
+            if ident not in have or (a.enabled and not have[ident].enabled):
+                have[ident] = a
+    return have
+
+
+@dataclass
+class PlannedInstall:
+    id: str
+    entry: dict
+    folder: str  # folder to install into (an existing one when upgrading)
+    required_by: List[str] = field(default_factory=list)
+    enable: bool = False  # enable the disabled copy in `folder` instead of downloading
+
+    @property
+    def version(self) -> str:
+        return str(self.entry.get("version", ""))
+
+
+def resolve(catalog, installed: Iterable[AddonInfo], install_ids: Iterable[str] = (),
+            requirements: Iterable[Tuple[Requirement, str]] = (),
+            dependencies: bool = True,
+            receipts: Optional[Dict[str, Receipt]] = None) -> List[PlannedInstall]:
+    """Plan the catalog installs needed for `install_ids` and `requirements`.
+
+    `install_ids` are catalog entries to install (or reinstall). Each of
+    `requirements` is a (requirement, required by) pair, e.g. the
+    dependencies of a local zip about to be installed. Installed addons that
+    satisfy every constraint on them are kept; otherwise the catalog version
+    is planned, provided it satisfies them all. Disabled addons in
+    `installed` that satisfy their constraints are planned with `enable`
+    set, along with their own dependencies. Pass `receipts` (see
+    `installed_ids`) to find addons by the catalog ID they were installed
+    from. With `dependencies=False` only `install_ids` themselves are
+    planned. Returns the installs in dependency order. Raises
+    DependencyError listing every missing, conflicting or cyclic dependency.
+    """
+    index = catalog if isinstance(catalog, CatalogIndex) else CatalogIndex(catalog)
+    have = installed_ids(installed, receipts)
+    constraints: Dict[str, List[Tuple[Requirement, Optional[str]]]] = {}
+    edges: Dict[str, set] = {}
+    planned: Dict[str, dict] = {}
+    enabling = set()  # planned IDs whose disabled copy is enabled; planned with its addon.json
+    errors = []
+
+    queue = deque((Requirement(i.lower()), None) for i in install_ids)
+    queue.extend(requirements)
+    roots = {req.id for req, parent in queue if parent is None}
+    # Addons being installed from elsewhere; only checked for cycles
+    local = {parent for req, parent in queue if parent is not None}
+
+    def plan(ident: str, entry: dict) -> None:
+        planned[ident] = entry
+        if not dependencies:
+            return
+        try:
+            deps = parse_dependencies(entry)
+        except DependencyError as e:
+            errors.append(f"{ident}: {e}")
+            return
+        queue.extend((dep, ident) for dep in deps)
+
+    while queue:
+        req, parent = queue.popleft()
+        constraints.setdefault(req.id, []).append((req, parent))
+        if parent is not None:
+            edges.setdefault(parent, set()).add(req.id)
+        if req.id in local or (req.id in planned and req.id not in enabling):
+            continue
+        current = have.get(req.id)
+        if req.id in roots or current is None or not all(
+                r.allows(_version(current)) for r, _ in constraints[req.id]):
+            entry = index.by_id.get(req.id) or index.by_name.get(req.id)
+            if entry is not None:
+                enabling.discard(req.id)
+                plan(req.id, entry)
+            elif current is None:
+                errors.append(f"{req.id}: not installed and not in the catalog"
+                              + (f" (required by {parent})" if parent else ""))
+        elif not current.enabled and req.id not in planned:
+            enabling.add(req.id)
+            plan(req.id, current.manifest or {})
+
+    for ident, reqs in sorted(constraints.items()):
+        if ident in planned and ident not in enabling:
+            version = planned[ident].get("version")
+            found = f"the catalog has {version or 'no version'}"
+        elif ident in have:
+            version = _version(have[ident])
+            found = f"{version or 'an unknown version'} is installed"
+        else:
+            continue
+        failed = [(r, parent) for r, parent in reqs if not r.allows(version)]
+        if failed:
+            wanted = "; ".join(f"{parent} needs {r}" for r, parent in failed)
+            errors.append(f"{ident}: {wanted}, but {found}")
+
+    order = _topological(planned, edges, errors)
+    if errors:
+        raise DependencyError("\n".join(errors))
+
+    required_by: Dict[str, List[str]] = {}
+    for parent, children in edges.items():
+        for child in children:
+            required_by.setdefault(child, []).append(parent)
+    return [
+        PlannedInstall(ident, planned[ident],
+                       have[ident].name if ident in have else archive_name(Path(urlparse(planned[ident]["download"]).path)),
+                       sorted(required_by.get(ident, [])), enable=ident in enabling)
+        for ident in order
+    ]
+
+
+def _topological(planned: Dict[str, dict], edges: Dict[str, set], errors: List[str]) -> List[str]:
+    """Planned IDs, dependencies first; cycles are appended to `errors`."""
+    order: List[str] = []
+    state: Dict[str, int] = {}  # 1: on the current path, 2: done
+    path: List[str] = []
+
+    def visit(node: str) -> None:
+        state[node] = 1
+        path.append(node)
+        for child in sorted(edges.get(node, ())):
+            if state.get(child) == 1:
+                cycle = path[path.index(child):] + [child]
+                errors.append("Dependency cycle: " + " -> ".join(cycle))
+            elif child not in state:
+                visit(child)
+        path.pop()
+        state[node] = 2
+        if node in planned:
+            order.append(node)
+
+    for node in sorted(set(planned) | set(edges)):
+        if node not in state:
+            visit(node)
+    return order
+
+
+def install_plan(plan: List[PlannedInstall], assets_root: Path, workers: Optional[int] = None,
+                 progress: Optional[ProgressCallback] = None, optimize_textures: bool = False,
+                 on_conflicts: Optional[ConflictCallback] = None) -> List[Path]:
+    """Download every planned addon concurrently, then install them in plan order.
+
+    Planned addons with `enable` set are enabled rather than downloaded.
+    `on_conflicts` is passed on to `install_addon`.
+    Installing stops at the first failure, since later addons may depend on
+    the one that failed.
+    """
+    installed = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            profiling.span("install_plan", addons=len(plan)), \
+            ThreadPoolExecutor(max_workers=workers or DOWNLOAD_WORKERS) as pool:
+        futures = [None if p.enable else
+                   pool.submit(download_entry, p.entry, Path(tmp) / f"{p.folder}{entry_suffix(p.entry)}")
+                   for p in plan]
+        try:
+            for p, future in zip(plan, futures):
+                if future is None:
+                    installed.append(enable_addon(p.folder, assets_root))
+                    continue
+                installed.append(install_addon(future.result(), assets_root, overwrite=True, progress=progress,
+                                               optimize_textures=optimize_textures, origin=entry_origin(p.entry),
+                                               on_conflicts=on_conflicts))
+        finally:
+            for future in futures:
+                if future is not None:
+                    future.cancel()
+    return installed
+
+
+def unsatisfied(requirements: Iterable[Requirement], installed: Iterable[AddonInfo],
+                receipts: Optional[Dict[str, Receipt]] = None) -> List[Requirement]:
+    """Requirements no enabled addon satisfies (see `installed_ids` for `receipts`)."""
+    have = installed_ids([a for a in installed if a.enabled], receipts)
+    return [r for r in requirements if r.id not in have or not r.allows(_version(have[r.id]))]
+
+
+def dependents(installed: Iterable[AddonInfo], name: str) -> List[str]:
+    """Names of installed addons that depend on the addon in folder `name`."""
+    installed = list(installed)
+    target = next((a for a in installed if a.name == name), None)
+    ident = addon_id(target) if target else name.lower()
+    found = []
+    for a in installed:
+        if a.name == name:
+            continue
+        try:
+            if any(r.id == ident for r in parse_dependencies(a.manifest)):
+                found.append(a.name)
+        except DependencyError:
+            continue
+    return sorted(found)
+
+
+def source_manifest(source: Path) -> Optional[dict]:
+    """addon.json of a folder or zip about to be installed (None if it has none)."""
+    if source.is_dir():
+        return load_manifest(source)
+    if source.suffix.lower() != ".zip":
+        return None  # tarballs can only be read front to back
+    import zipfile
+
+    with zipfile.ZipFile(source) as zf:
+        names = [n for n in zf.namelist() if not n.endswith("/")]
+        tops = {n.split("/")[0] if "/" in n else "" for n in names}
+        member = "addon.json"
+        if len(tops) == 1 and "" not in tops:
+            member = next(iter(tops)) + "/addon.json"
+        if member not in names:
+            return None
+        try:
+            return json.loads(zf.read(member).decode("utf-8"))
+        except ValueError:
+            return None
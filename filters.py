@@ -0,0 +1,181 @@
+"""Choosing which archive members an install extracts.
+
+Repository archives (GitHub tarballs in particular) carry a lot besides the
+addon: `.github/`, screenshots, source art, build folders. An
+`ArchiveFilter` narrows an install down to
+
+- `subdir`: one folder of the archive, installed as the addon (and named
+  after it). The path may start below the archive's single top-level
+  folder (`addons/foo` matches `repo-main/addons/foo`) or include it;
+- `include`: glob patterns; when given, only files matching one of them
+  (or inside a matching folder) are extracted;
+- `exclude`: glob patterns of files and folders that are never extracted.
+
+An `.addonignore` file at the top of the addon adds exclude patterns of its
+own (one per line, `#` starts a comment); it is never installed itself.
+
+Patterns follow .gitignore: a pattern without a `/` matches a file or
+folder name at any depth (`*.psd`, `.github`); one containing a `/` is
+matched against the path from the addon's top (`docs/*.png`); a trailing
+`/` matches folders only.
+
+Members are filtered while the archive's member list is enumerated, so
+filtered members are never extracted (for zips, never even decompressed).
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+IGNORE_FILE = ".addonignore"
+
+
+def parse_patterns(text: str) -> List[str]:
+    """Patterns of an .addonignore file: one per line, blank lines and `#` comments skipped."""
+    patterns = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            patterns.append(line)
+    return patterns
+
+
+def clean_name(name: str) -> str:
+    """Member name with '/' separators and without leading './' or trailing '/'."""
+    name = name.replace("\\", "/")
+    while name.startswith("./"):
+        name = name[2:]
+    return name.strip("/")
+
+
+class _Patterns:
+    """A list of patterns compiled into one regular expression per kind."""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns: List[str] = []
+        self.extend(patterns)
+
+    def extend(self, patterns: List[str]) -> None:
+        self.patterns.extend(patterns)
+        kinds = {(False, False): [], (False, True): [], (True, False): [], (True, True): []}
+        for pattern in self.patterns:
+            pattern = pattern.replace("\\", "/")
+            dirs_only = pattern.endswith("/")
+            anchored = "/" in pattern.rstrip("/")
+            pattern = pattern.strip("/")
+            if pattern:
+                kinds[anchored, dirs_only].append(fnmatch.translate(pattern))
+        self.names, self.name_dirs, self.paths, self.path_dirs = (
+            re.compile("|".join(kinds[key])).match if kinds[key] else None
+            for key in ((False, False), (False, True), (True, False), (True, True)))
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def match(self, rel: str, is_dir: bool) -> bool:
+        """Whether `rel` or one of the folders it is in matches a pattern."""
+        parts = rel.split("/")
+        last = len(parts) - 1
+        for i, part in enumerate(parts):
+            folder = i < last or is_dir
+            if self.names and self.names(part) or folder and self.name_dirs and self.name_dirs(part):
+                return True
+            if self.paths or self.path_dirs:
+                prefix = "/".join(parts[:i + 1])
+                if self.paths and self.paths(prefix) or folder and self.path_dirs and self.path_dirs(prefix):
+                    return True
+        return False
+
+
+@dataclass
+class ArchiveFilter:
+    subdir: Optional[str] = None
+    include: List[str] = field(default_factory=list)
+    exclude: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.subdir = clean_name(self.subdir) if self.subdir else None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.subdir or self.include or self.exclude)
+
+    def addon_name(self, default: str) -> str:
+        """Folder name of the installed addon: the subdir's name, else `default`."""
+        return self.subdir.rsplit("/", 1)[-1] if self.subdir else default
+
+    def matcher(self, root: str = "") -> "MemberFilter":
+        """A filter for one archive whose single top-level folder is `root` ("" for none)."""
+        return MemberFilter(self, root)
+
+
+class MemberFilter:
+    """`ArchiveFilter` applied to the members of one archive.
+
+    For archives read as a stream the top-level folder is a guess from the
+    first member; it is dropped as soon as a member outside it turns up.
+    """
+
+    def __init__(self, spec: ArchiveFilter, root: str = ""):
+        self.spec = spec
+        self.root = clean_name(root)
+        self.include = _Patterns(spec.include)
+        self.exclude = _Patterns(spec.exclude)
+        self.matched: Optional[str] = None  # the archive path `subdir` was found at
+
+    def relative(self, name: str) -> Optional[str]:
+        """Path of member `name` inside the addon ("" for its top folder), or None if outside it."""
+        name = clean_name(name)
+        subdir, root = self.spec.subdir, self.root
+        if subdir:
+            for prefix in (subdir, f"{root}/{subdir}") if root else (subdir,):
+                if name == prefix or name.startswith(prefix + "/"):
+                    self.matched = prefix
+                    return name[len(prefix) + 1:]
+            return None
+        if root:
+            if name == root or name.startswith(root + "/"):
+                return name[len(root) + 1:]
+            self.root = ""
+        return name
+
+    def add_ignore(self, text: str) -> None:
+        """Add the patterns of an .addonignore file to the excludes."""
+        self.exclude.extend(parse_patterns(text))
+
+    def keep(self, rel: str, is_dir: bool = False) -> bool:
+        """Whether the member at addon path `rel` is extracted."""
+        if not rel or rel == IGNORE_FILE:
+            return False
+        if self.exclude and self.exclude.match(rel, is_dir):
+            return False
+        if self.include:
+            return not is_dir and self.include.match(rel, is_dir)
+        return True
+
+
+def select_zip_members(zf, spec: Optional[ArchiveFilter], root: str = "") -> Optional[List[Tuple[object, str]]]:
+    """The (ZipInfo, addon path) pairs of an open zip that `spec` and its .addonignore keep.
+
+    Returns None when there is nothing to filter: no active `spec` and no
+    .addonignore in the archive.
+    """
+    spec = spec or ArchiveFilter()
+    infos = zf.infolist()
+    if not spec.active and f"/{IGNORE_FILE}\n" not in "/" + "\n/".join(i.filename for i in infos) + "\n":
+        return None
+    matcher = spec.matcher(root)
+    rels = [matcher.relative(i.filename) for i in infos]
+    if spec.subdir and matcher.matched is None:
+        raise ValueError(f"Archive has no folder {spec.subdir!r}")
+    for info, rel in zip(infos, rels):
+        if rel == IGNORE_FILE and not info.is_dir():
+            matcher.add_ignore(zf.read(info).decode("utf-8", "replace"))
+            break
+    else:
+        if not spec.active:  # an .addonignore deeper down, not at the addon's top
+            return None
+    return [(info, rel) for info, rel in zip(infos, rels) if rel and matcher.keep(rel, info.is_dir())]
@@ -0,0 +1,154 @@
+"""Per-file hash manifests for installed addons and the `verify` check.
+
+`install_addon` records a manifest of every installed file (size, mtime and
+SHA-256) in the manager's state folder. `verify_addon` compares the folder
+against it and reports modified, missing and extra files.
+
+Files are hashed on a thread pool (hashlib releases the GIL on large
+buffers); big files are mapped with mmap, small ones are read in one go.
+Unless `full` is requested, files whose size and mtime still match the
+manifest are trusted without rehashing.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import profiling
+from .core import disabled_dir, state_dir
+
+MANIFEST_DIR = "manifests"
+MANIFEST_VERSION = 1
+# Files at least this large are hashed through mmap instead of read().
+MMAP_THRESHOLD = 1024 * 1024
+
+
+@dataclass
+class VerifyReport:
+    name: str
+    modified: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    checked: int = 0
+    hashed: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not (self.modified or self.missing or self.extra)
+
+
+def hash_file(path: Path) -> str:
+    """SHA-256 of a file, using mmap for large files."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+        elif size:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def walk_files(root: Path) -> Dict[str, os.stat_result]:
+    """Map every file below `root` (as a '/'-separated relative path) to its stat."""
+    files: Dict[str, os.stat_result] = {}
+    stack = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        with os.scandir(directory) as it:
+            for entry in it:
+                rel = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((Path(entry.path), rel + "/"))
+                elif entry.is_file():
+                    files[rel] = entry.stat()
+    return files
+
+
+def _hash_many(root: Path, rels: List[str], workers: Optional[int]) -> Dict[str, str]:
+    if len(rels) <= 1 or workers == 1:
+        return {rel: hash_file(root / rel) for rel in rels}
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4)) as pool:
+        return dict(zip(rels, pool.map(lambda rel: hash_file(root / rel), rels)))
+
+
+def manifest_path(assets_root: Path, name: str) -> Path:
+    return state_dir(assets_root) / MANIFEST_DIR / f"{name}.json"
+
+
+def build_manifest(addon_path: Path, workers: Optional[int] = None) -> dict:
+    files = walk_files(addon_path)
+    with profiling.span("integrity.hash", files=len(files)) as sp:
+        hashes = _hash_many(addon_path, sorted(files), workers)
+        sp.set(bytes=sum(st.st_size for st in files.values()))
+    return {
+        "version": MANIFEST_VERSION,
+        "files": {rel: {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": hashes[rel]}
+                  for rel, st in sorted(files.items())},
+    }
+
+
+def record_manifest(assets_root: Path, name: str, workers: Optional[int] = None) -> Path:
+    """Hash the installed addon `name` and save its manifest."""
+    path = manifest_path(assets_root, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(build_manifest(assets_root / name, workers)), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def load_manifest(assets_root: Path, name: str) -> Optional[dict]:
+    path = manifest_path(assets_root, name)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data if data.get("version") == MANIFEST_VERSION else None
+
+
+def remove_manifest(assets_root: Path, name: str) -> None:
+    try:
+        manifest_path(assets_root, name).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def verify_addon(assets_root: Path, name: str, full: bool = False,
+                 workers: Optional[int] = None) -> VerifyReport:
+    """Compare an installed addon, enabled or disabled, with its manifest.
+
+    Raises FileNotFoundError if the addon has no manifest (it was installed
+    before manifests existed or by hand).
+    """
+    manifest = load_manifest(assets_root, name)
+    if manifest is None:
+        raise FileNotFoundError(f"No integrity manifest for addon: {name}")
+    root = assets_root / name
+    if not root.is_dir() and (disabled_dir(assets_root) / name).is_dir():
+        root = disabled_dir(assets_root) / name
+    expected = manifest["files"]
+    actual = walk_files(root) if root.is_dir() else {}
+    report = VerifyReport(name, checked=len(expected))
+    report.missing = sorted(set(expected) - set(actual))
+    report.extra = sorted(set(actual) - set(expected))
+    to_hash = []
+    for rel in sorted(set(expected) & set(actual)):
+        want, st = expected[rel], actual[rel]
+        if st.st_size != want["size"]:
+            report.modified.append(rel)
+        elif full or st.st_mtime_ns != want["mtime_ns"]:
+            to_hash.append(rel)
+    with profiling.span("verify", addon=name, files=len(to_hash)):
+        hashes = _hash_many(root, to_hash, workers)
+    report.hashed = len(to_hash)
+    report.modified = sorted(report.modified + [rel for rel in to_hash if hashes[rel] != expected[rel]["sha256"]])
+    return report
@@ -0,0 +1,193 @@
+"""Advisory file locks, so several CLI/GUI processes can share an assets folder.
+
+Lock files live in the state folder (`locks/`):
+
+- `assets.lock` guards the folder as a whole. Reads such as `list` and every
+  install or uninstall hold it shared; operations that rewrite many addons
+  at once hold it exclusively.
+- `addon-<name>.lock` is held exclusively while one addon is installed or
+  removed, so work on different addons runs in parallel while two
+  processes touching the same addon take turns.
+- Other `resource-<name>.lock` files guard shared bookkeeping files such as
+  the asset index.
+
+Waiting is bounded by the `lock_timeout` setting (seconds, see `config`);
+`LockTimeout` names the lock and the process holding it. Every contended
+lock is recorded as a `lock.wait` profiling span with the time spent
+waiting, so `--profile` shows where concurrent runs held each other up.
+
+Locks are re-entrant within a thread. On Windows (msvcrt) every lock is
+exclusive, so there readers and writers simply take turns.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from . import profiling
+from .config import DEFAULTS, get_setting
+from .core import state_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_DIR = "locks"
+# Poll interval while waiting, doubling up to the maximum
+POLL_START = 0.005
+POLL_MAX = 0.1
+
+_held = threading.local()
+
+
+class LockTimeout(TimeoutError):
+    def __init__(self, lock: str, waited: float, holder: Optional[str] = None):
+        message = f"Timed out after {waited:.1f}s waiting for the {lock} lock"
+        if holder:
+            message += f" (held by process {holder})"
+        super().__init__(message)
+        self.lock = lock
+        self.waited = waited
+        self.holder = holder
+
+
+def lock_timeout(assets_root: Path) -> float:
+    try:
+        return float(get_setting(assets_root, "lock_timeout"))
+    except (TypeError, ValueError):
+        return float(DEFAULTS["lock_timeout"])
+
+
+def _file_name(kind: str, name: str) -> str:
+    """Lock file name; addon names are compared case-insensitively like on Windows."""
+    key = name.lower()
+    if not re.fullmatch(r"[a-z0-9._-]{1,64}", key):
+        key = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return f"{kind}-{key}.lock"
+
+
+def _try_lock(fd: int, shared: bool) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _holder(path: Path) -> Optional[str]:
+    try:
+        return path.read_text(encoding="ascii").strip() or None
+    except (OSError, ValueError):
+        return None
+
+
+def _wait(fd: int, path: Path, shared: bool, timeout: float, label: str) -> None:
+    """Poll for a contended lock, recording the wait as a profiling span."""
+    with profiling.span("lock.wait", lock=label, shared=shared, holder=_holder(path)) as sp:
+        start = time.monotonic()
+        delay = POLL_START
+        while not _try_lock(fd, shared):
+            waited = time.monotonic() - start
+            if waited >= timeout:
+                sp.set(waited=waited, timed_out=True)
+                raise LockTimeout(label, waited, _holder(path))
+            time.sleep(min(delay, timeout - waited))
+            delay = min(delay * 2, POLL_MAX)
+        sp.set(waited=time.monotonic() - start)
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False, timeout: float = DEFAULTS["lock_timeout"],
+              label: Optional[str] = None) -> Iterator[None]:
+    """Hold an advisory lock on `path` (created if needed) for the `with` block.
+
+    A shared lock that cannot be created (e.g. a read-only state folder) is
+    skipped, so reading never fails because of locking.
+    """
+    label = label or path.stem
+    held: Dict[str, list] = _held.__dict__.setdefault("locks", {})
+    key = str(path)
+    if key in held:
+        if not shared and held[key][1]:
+            raise RuntimeError(f"Cannot upgrade the shared {label} lock to exclusive")
+        held[key][2] += 1  # re-entered by this thread
+        try:
+            yield
+        finally:
+            held[key][2] -= 1
+        return
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    except OSError:
+        if not shared:
+            raise
+        fd = None
+    if fd is None:
+        yield
+        return
+    try:
+        if not _try_lock(fd, shared):
+            _wait(fd, path, shared, timeout, label)
+        if not shared:
+            os.ftruncate(fd, 0)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, str(os.getpid()).encode("ascii"))
+        held[key] = [fd, shared, 1]
+        try:
+            yield
+        finally:
+            del held[key]
+            if not shared:
+                os.ftruncate(fd, 0)
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def _timeout(assets_root: Path, timeout: Optional[float]) -> float:
+    return lock_timeout(assets_root) if timeout is None else timeout
+
+
+def assets_lock(assets_root: Path, shared: bool = True, timeout: Optional[float] = None):
+    """Lock the assets folder as a whole (shared for readers)."""
+    return file_lock(state_dir(assets_root) / LOCK_DIR / "assets.lock", shared,
+                     _timeout(assets_root, timeout), "assets folder")
+
+
+def resource_lock(assets_root: Path, resource: str, timeout: Optional[float] = None):
+    """Exclusive lock on a piece of shared bookkeeping, such as the asset index."""
+    return file_lock(state_dir(assets_root) / LOCK_DIR / _file_name("resource", resource), False,
+                     _timeout(assets_root, timeout), resource)
+
+
+@contextmanager
+def addon_lock(assets_root: Path, name: str, timeout: Optional[float] = None) -> Iterator[None]:
+    """Exclusive lock on one addon (plus a shared lock on the assets folder)."""
+    timeout = _timeout(assets_root, timeout)
+    with assets_lock(assets_root, shared=True, timeout=timeout), \
+            file_lock(state_dir(assets_root) / LOCK_DIR / _file_name("addon", name), False,
+                      timeout, f"addon '{name}'"):
+        yield
@@ -0,0 +1,151 @@
+"""Local mirror of the addon catalog.
+
+`mirror_catalog` copies `addons.json` and every archive and icon it
+references from a source base URL into a folder. The folder can be served
+by any static HTTP server or used directly as a `file://` base URL (see
+`config`).
+
+Syncs are incremental: the ETag and size of every mirrored file are kept in
+`.mirror.json`. Files the source reports unchanged (304 to If-None-Match,
+or the same Content-Length when it sends no ETag) are not downloaded again,
+and files the catalog no longer references are removed. Downloads run
+concurrently and the catalog is replaced last, so clients never see entries
+whose archives are still missing: a link is rewritten to the mirrored copy
+only once that file is in the mirror, and keeps pointing at the source when
+its download failed. Links to other hosts are stored below
+`_external/<host>/` and rewritten in the mirrored catalog.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote, urljoin, urlparse
+
+from . import profiling
+from .catalog import CATALOG_FILE, DOWNLOAD_WORKERS, URL_FIELDS, open_url
+from .core import _download
+
+STATE_FILE = ".mirror.json"
+EXTERNAL_DIR = "_external"
+
+
+@dataclass
+class MirrorResult:
+    fetched: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def local_name(url: str, source: str) -> Optional[str]:
+    """Path inside the mirror for `url`, or None if it would escape the mirror."""
+    parsed = urlparse(url)
+    if url.startswith(source):
+        rel = urlparse(url[len(source):]).path
+    else:
+        rel = f"{EXTERNAL_DIR}/{parsed.netloc or 'local'}{parsed.path}"
+    parts = PurePosixPath(unquote(rel)).parts
+    if not parts or parts[0] == "/" or any(p in ("..", ".") for p in parts) or parts[-1] == STATE_FILE:
+        return None
+    return "/".join(parts)
+
+
+def _load_state(dest: Path) -> Dict[str, dict]:
+    try:
+        return json.loads((dest / STATE_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def sync_file(url: str, target: Path, known: Optional[dict]) -> Tuple[bool, dict]:
+    """Bring `target` up to date with `url`; returns (downloaded, state)."""
+    headers = {}
+    if known and target.exists() and target.stat().st_size == known.get("size"):
+        if known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        else:
+            head = open_url(url, method="HEAD")
+            head.raise_for_status()
+            if head.headers.get("content-length") == str(known["size"]):
+                return False, known
+    r = open_url(url, stream=True, headers=headers)
+    if r.status_code == 304:
+        return False, known
+    r.raise_for_status()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".part")
+    try:
+        _download(r, tmp)
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return True, {"etag": r.headers.get("etag"), "size": target.stat().st_size}
+
+
+def mirror_catalog(dest: Path, source: str, workers: Optional[int] = None) -> MirrorResult:
+    """Mirror the catalog at base URL `source` into `dest`."""
+    source = source if source.endswith("/") else source + "/"
+    dest.mkdir(parents=True, exist_ok=True)
+    state = _load_state(dest)
+    result = MirrorResult()
+    with profiling.span("mirror", source=source) as sp:
+        r = open_url(source + CATALOG_FILE)
+        r.raise_for_status()
+        entries = r.json()
+
+        files: Dict[str, str] = {}
+        links: List[Tuple[dict, str, str, str]] = []  # entry, field, mirror path, source URL
+        for entry in entries:
+            for key in URL_FIELDS:
+                if not isinstance(entry.get(key), str):
+                    continue
+                url = urljoin(source + CATALOG_FILE, entry[key])
+                rel = local_name(url, source)
+                if rel is None:
+                    result.failed.append((entry[key], "unsafe path"))
+                    continue
+                files[rel] = url
+                links.append((entry, key, rel, url))
+
+        new_state: Dict[str, dict] = {}
+        with ThreadPoolExecutor(max_workers=workers or DOWNLOAD_WORKERS) as pool:
+            futures = {pool.submit(sync_file, url, dest / rel, state.get(rel)): rel
+                       for rel, url in sorted(files.items())}
+            for future in as_completed(futures):
+                rel = futures[future]
+                try:
+                    downloaded, new_state[rel] = future.result()
+                except Exception as e:
+                    result.failed.append((rel, str(e)))
+                    if rel in state:
+                        new_state[rel] = state[rel]  # keep serving the previous copy
+                    continue
+                (result.fetched if downloaded else result.unchanged).append(rel)
+
+        for rel in sorted(set(state) - set(files)):
+            try:
+                (dest / rel).unlink()
+            except FileNotFoundError:
+                pass
+            result.removed.append(rel)
+
+        for entry, key, rel, url in links:
+            entry[key] = quote(rel) if (dest / rel).is_file() else url
+        _write(dest / CATALOG_FILE, json.dumps(entries, indent=2))
+        _write(dest / STATE_FILE, json.dumps(new_state, indent=2, sort_keys=True))
+        sp.set(fetched=len(result.fetched), unchanged=len(result.unchanged), failed=len(result.failed))
+    for names in (result.fetched, result.unchanged):
+        names.sort()
+    return result
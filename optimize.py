@@ -0,0 +1,219 @@
+"""Lossless PNG optimization for addon textures.
+
+Each PNG below a `textures/` folder is rewritten with its image data
+recompressed at a higher zlib level and its ancillary chunks (text,
+timestamps, color profiles, ...) removed. Pixels are untouched: the
+decompressed IDAT stream is re-deflated as-is, and `tRNS`, which changes how
+pixels render, is kept. Animated PNGs are left alone.
+
+Files are processed in a process pool. Results are cached by (path, size,
+mtime, level) so files that were already optimized at that level, or could
+not be improved, are skipped on later runs. A file that cannot be read or
+replaced is counted as failed and left as it was, without stopping the run. Rewritten files replace the
+original by rename, so hardlinked copies of the old file (snapshots) are
+never modified.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import profiling
+from .core import state_dir
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+KEPT_CHUNKS = frozenset({b"IHDR", b"PLTE", b"tRNS", b"IDAT", b"IEND"})
+ANIMATION_CHUNKS = frozenset({b"acTL", b"fcTL", b"fdAT"})
+CACHE_FILE = "optimize_cache.json"
+CACHE_VERSION = 2
+# Below this many files the process pool costs more than it saves.
+PARALLEL_THRESHOLD = 8
+
+
+@dataclass
+class OptimizeResult:
+    name: str
+    files: int = 0
+    optimized: int = 0
+    skipped: int = 0  # unchanged since the last run (cached)
+    failed: int = 0  # could not be read or replaced; left as they were
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+def _chunks(data: bytes):
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if len(body) != length:
+            raise ValueError("Truncated PNG chunk")
+        yield ctype, body
+        pos += 12 + length
+        if ctype == b"IEND":
+            return
+    raise ValueError("PNG has no IEND chunk")
+
+
+def _chunk(ctype: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body))
+
+
+def optimize_png(data: bytes, level: int = 9) -> Optional[bytes]:
+    """Return a smaller, pixel-identical PNG, or None if it cannot be improved."""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+    chunks = list(_chunks(data))
+    if any(ctype in ANIMATION_CHUNKS for ctype, _ in chunks):
+        return None
+    raw = zlib.decompress(b"".join(body for ctype, body in chunks if ctype == b"IDAT"))
+    best = None
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        comp = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+        candidate = comp.compress(raw) + comp.flush()
+        if best is None or len(candidate) < len(best):
+            best = candidate
+    out = [PNG_SIGNATURE]
+    idat_written = False
+    for ctype, body in chunks:
+        if ctype not in KEPT_CHUNKS:
+            continue
+        if ctype == b"IDAT":
+            if not idat_written:
+                out.append(_chunk(b"IDAT", best))
+                idat_written = True
+            continue
+        out.append(_chunk(ctype, body))
+    result = b"".join(out)
+    return result if len(result) < len(data) else None
+
+
+def optimize_file(path: str, level: int = 9) -> Optional[Tuple[int, int]]:
+    """Optimize one PNG in place; returns (size before, size after).
+
+    Returns None, leaving the file as it was, if it cannot be read or replaced.
+    """
+    p = Path(path)
+    try:
+        data = p.read_bytes()
+    except OSError:
+        return None
+    try:
+        smaller = optimize_png(data, level)
+    except (ValueError, zlib.error):
+        smaller = None
+    if smaller is None:
+        return len(data), len(data)
+    tmp = p.with_name(p.name + ".opt")
+    try:
+        st = p.stat()
+        tmp.write_bytes(smaller)
+        os.chmod(tmp, st.st_mode)
+        os.replace(tmp, p)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return None
+    return len(data), len(smaller)
+
+
+def _optimize_file_job(args: Tuple[str, int]) -> Optional[Tuple[int, int]]:
+    return optimize_file(*args)
+
+
+def texture_files(addon_path: Path) -> List[Path]:
+    """Every PNG below a `textures` folder of the addon."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(addon_path):
+        dirnames.sort()
+        rel_parts = Path(dirpath).relative_to(addon_path).parts
+        if "textures" not in rel_parts:
+            continue
+        found.extend(Path(dirpath) / f for f in sorted(filenames) if f.lower().endswith(".png"))
+    return found
+
+
+class _Cache:
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.entries: Dict[str, list] = {}
+        if path is not None and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("version") == CACHE_VERSION:
+                    self.entries = data["entries"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def fresh(self, f: Path, st: os.stat_result, level: int) -> bool:
+        return self.entries.get(str(f)) == [st.st_size, st.st_mtime_ns, level]
+
+    def mark(self, f: Path, level: int) -> None:
+        try:
+            st = f.stat()
+        except OSError:
+            self.entries.pop(str(f), None)
+            return
+        self.entries[str(f)] = [st.st_size, st.st_mtime_ns, level]
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "entries": self.entries}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def optimize_addons(addon_paths: List[Path], assets_root: Path, level: int = 9,
+                    workers: Optional[int] = None, use_cache: bool = True) -> List[OptimizeResult]:
+    """Optimize the textures of several addons; returns one result per addon."""
+    cache = _Cache(state_dir(assets_root) / CACHE_FILE if use_cache else None)
+    results = []
+    jobs: List[Tuple[OptimizeResult, Path]] = []
+    for addon in addon_paths:
+        result = OptimizeResult(addon.name)
+        for f in texture_files(addon):
+            result.files += 1
+            st = f.stat()
+            if cache.fresh(f, st, level):
+                result.skipped += 1
+                result.bytes_before += st.st_size
+                result.bytes_after += st.st_size
+            else:
+                jobs.append((result, f))
+        results.append(result)
+
+    with profiling.span("optimize", files=len(jobs)) as sp:
+        args = [(str(f), level) for _, f in jobs]
+        if len(jobs) < PARALLEL_THRESHOLD or workers == 1:
+            sizes = list(map(_optimize_file_job, args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                sizes = list(pool.map(_optimize_file_job, args, chunksize=4))
+        for (result, f), done in zip(jobs, sizes):
+            if done is None:  # left alone and tried again next time
+                result.failed += 1
+                continue
+            before, after = done
+            result.bytes_before += before
+            result.bytes_after += after
+            if after < before:
+                result.optimized += 1
+            cache.mark(f, level)
+        sp.set(bytes_saved=sum(r.saved for r in results))
+    cache.save()
+    return results
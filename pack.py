@@ -0,0 +1,169 @@
+"""Build installable addon zips from addon folders.
+
+The archive uses the single top-level folder layout that `install_addon`
+expects (`myaddon/blocks/...`). Members are compressed on a thread pool
+(zlib releases the GIL) and written in order by a small zip writer, because
+`zipfile` can only compress on the writing thread. Formats that are already
+compressed (PNG, OGG, ...) are stored as-is.
+
+Output is reproducible: entries are sorted, timestamps are fixed to
+1980-01-01 and permissions are normalized, so packing the same folder twice
+produces byte-identical zips.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from . import profiling
+
+STORED_SUFFIXES = frozenset({".png", ".ogg", ".mp3", ".jpg", ".jpeg", ".webp", ".zip", ".gz", ".xz", ".7z"})
+SKIPPED_NAMES = frozenset({".git", ".hg", ".svn", "__pycache__", ".DS_Store", "Thumbs.db"})
+
+_DOS_DATE = (0 << 9) | (1 << 5) | 1  # 1980-01-01
+_DOS_TIME = 0
+_FILE_ATTR = (0o100644 << 16)
+_DIR_ATTR = (0o040755 << 16) | 0x10
+_MADE_BY = (3 << 8) | 45  # unix, spec 4.5
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP64_COUNT_LIMIT = 0xFFFF
+_UTF8_FLAG = 0x800
+
+
+class _Member(NamedTuple):
+    name: str
+    method: int
+    crc: int
+    size: int
+    data: bytes
+    is_dir: bool
+
+
+def collect_members(addon_dir: Path) -> List[Tuple[str, Optional[Path]]]:
+    """Sorted (archive name, source file) pairs; directories have no source.
+
+    Only empty directories get their own entry, files imply their parents.
+    """
+    prefix = addon_dir.name
+    members: List[Tuple[str, Optional[Path]]] = []
+    for dirpath, dirnames, filenames in os.walk(addon_dir):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIPPED_NAMES)
+        files = sorted(f for f in filenames if f not in SKIPPED_NAMES)
+        rel = os.path.relpath(dirpath, addon_dir).replace(os.sep, "/")
+        base = prefix if rel == "." else f"{prefix}/{rel}"
+        if not files and not dirnames:
+            members.append((base + "/", None))
+        for f in files:
+            members.append((f"{base}/{f}", Path(dirpath) / f))
+    members.sort(key=lambda m: m[0])
+    return members
+
+
+def _compress(name: str, source: Optional[Path], level: int) -> _Member:
+    if source is None:
+        return _Member(name, 0, 0, 0, b"", True)
+    raw = source.read_bytes()
+    crc = zlib.crc32(raw)
+    if source.suffix.lower() not in STORED_SUFFIXES and raw:
+        comp = zlib.compressobj(level, zlib.DEFLATED, -15)
+        data = comp.compress(raw) + comp.flush()
+        if len(data) < len(raw):
+            return _Member(name, 8, crc, len(raw), data, False)
+    return _Member(name, 0, crc, len(raw), raw, False)
+
+
+class _ZipWriter:
+    """Writes precompressed members, with Zip64 records when needed."""
+
+    def __init__(self, f):
+        self.f = f
+        self.offset = 0
+        self.central: List[bytes] = []
+
+    def _write(self, data: bytes) -> None:
+        self.f.write(data)
+        self.offset += len(data)
+
+    def add(self, m: _Member) -> None:
+        name = m.name.encode("utf-8")
+        csize = len(m.data)
+        zip64 = m.size >= _ZIP64_LIMIT or csize >= _ZIP64_LIMIT
+        extra = struct.pack("<HHQQ", 1, 16, m.size, csize) if zip64 else b""
+        needed = 45 if zip64 else 20
+        local_offset = self.offset
+        self._write(struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, needed, _UTF8_FLAG, m.method, _DOS_TIME, _DOS_DATE,
+            m.crc, _ZIP64_LIMIT if zip64 else csize, _ZIP64_LIMIT if zip64 else m.size,
+            len(name), len(extra)) + name + extra)
+        self._write(m.data)
+
+        fields = []
+        if zip64:
+            fields += [m.size, csize]
+        if local_offset >= _ZIP64_LIMIT:
+            fields.append(local_offset)
+        cextra = struct.pack("<HH", 1, 8 * len(fields)) + struct.pack("<%dQ" % len(fields), *fields) if fields else b""
+        self.central.append(struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, _MADE_BY, 45 if fields else needed, _UTF8_FLAG, m.method,
+            _DOS_TIME, _DOS_DATE, m.crc, _ZIP64_LIMIT if zip64 else csize,
+            _ZIP64_LIMIT if zip64 else m.size, len(name), len(cextra), 0, 0, 0,
+            _DIR_ATTR if m.is_dir else _FILE_ATTR,
+            min(local_offset, _ZIP64_LIMIT)) + name + cextra)
+
+    def close(self) -> None:
+        start = self.offset
+        for record in self.central:
+            self._write(record)
+        size = self.offset - start
+        count = len(self.central)
+        if count >= _ZIP64_COUNT_LIMIT or start >= _ZIP64_LIMIT or size >= _ZIP64_LIMIT:
+            eocd64 = self.offset
+            self._write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, _MADE_BY, 45, 0, 0,
+                                    count, count, size, start))
+            self._write(struct.pack("<IIQI", 0x07064B50, 0, eocd64, 1))
+            count16 = min(count, 0xFFFF)
+            size32, start32 = min(size, _ZIP64_LIMIT), min(start, _ZIP64_LIMIT)
+        else:
+            count16, size32, start32 = count, size, start
+        self._write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count16, count16, size32, start32, 0))
+
+
+def pack_addon(addon_dir: Path, out: Optional[Path] = None, level: int = 9,
+               workers: Optional[int] = None) -> Path:
+    """Zip `addon_dir` into `out` (default: `<addon name>.zip` in the current directory).
+
+    Returns the path of the written archive.
+    """
+    addon_dir = Path(addon_dir)
+    if not addon_dir.is_dir():
+        raise NotADirectoryError(f"Not an addon folder: {addon_dir}")
+    out = Path(out) if out else Path.cwd() / f"{addon_dir.name}.zip"
+    members = collect_members(addon_dir)
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    tmp = out.with_name(out.name + ".part")
+    with profiling.span("pack", addon=str(addon_dir), members=len(members)) as sp:
+        try:
+            with open(tmp, "wb") as f, ThreadPoolExecutor(max_workers=workers) as pool:
+                writer = _ZipWriter(f)
+                # Keep a bounded window of members in flight so memory stays flat
+                pending: deque = deque()
+                for name, source in members:
+                    pending.append(pool.submit(_compress, name, source, level))
+                    if len(pending) >= workers * 2:
+                        writer.add(pending.popleft().result())
+                while pending:
+                    writer.add(pending.popleft().result())
+                writer.close()
+                sp.set(bytes=writer.offset)
+            os.replace(tmp, out)
+        except BaseException:
+            if tmp.exists():
+                tmp.unlink()
+            raise
+    return out
@@ -0,0 +1,196 @@
+"""Enabling and disabling addons, and named profiles of enabled addons.
+
+Disabling an addon moves its folder out of `assets/` into `disabled/` in
+the state folder, which sits next to `assets/` and so on the same volume:
+one rename, whatever the addon's size, and enabling it again is the rename
+back instead of a new download and extraction. Receipts and install
+manifests are kept; the asset index drops a disabled addon's IDs until it
+is enabled again.
+
+A profile is a named set of enabled addons, stored in `profiles.json` in the
+state folder. `use_profile` enables exactly that set and disables every
+other addon (the base game's `cubyz` folder is never touched) while holding
+the assets folder lock exclusively. Everything is checked before the first
+rename, and if a rename still fails the ones already done are undone, so a
+switch happens completely or not at all.
+"""
+
+from __future__ import annotations
+
+import errno
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import profiling
+from .core import disabled_dir, list_installed, state_dir
+
+PROFILES_FILE = "profiles.json"
+# Folders that are always enabled
+PROTECTED = ("cubyz",)
+
+
+def _move(src: Path, dest: Path) -> None:
+    try:
+        os.rename(src, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(str(src), str(dest))  # assets/ is a mount point of its own
+
+
+def _folder(assets_root: Path, name: str) -> str:
+    """Addon folder `name`, or the folder catalog entry `name` was installed as."""
+    if (assets_root / name).exists() or (disabled_dir(assets_root) / name).exists():
+        return name
+    from .receipts import ReceiptStore
+
+    with ReceiptStore(assets_root) as store:
+        receipt = store.find(name)
+    return receipt.addon if receipt is not None else name
+
+
+def _check_protected(name: str) -> None:
+    if name.lower() in PROTECTED:
+        raise ValueError(f"{name} holds the base game assets and cannot be disabled")
+
+
+def disable_addon(name: str, assets_root: Path) -> Path:
+    """Move addon `name` (a folder or catalog ID) aside so the game no longer loads it.
+
+    Returns its new location. Disabling a disabled addon does nothing.
+    """
+    from .asset_index import addon_changed
+    from .locks import addon_lock
+
+    name = _folder(assets_root, name)
+    _check_protected(name)
+    src, dest = assets_root / name, disabled_dir(assets_root) / name
+    with addon_lock(assets_root, name), profiling.span("disable_addon", addon=name):
+        if not src.is_dir():
+            if dest.is_dir():
+                return dest
+            raise FileNotFoundError("Addon not found: %s" % name)
+        if dest.exists():
+            raise FileExistsError(f"A disabled copy of {name} is in the way: {dest}")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        _move(src, dest)
+        addon_changed(assets_root, name, removed=True)
+    return dest
+
+
+def enable_addon(name: str, assets_root: Path) -> Path:
+    """Move disabled addon `name` back into the assets folder. Enabling an enabled addon does nothing."""
+    from .asset_index import addon_changed
+    from .locks import addon_lock
+
+    name = _folder(assets_root, name)
+    src, dest = disabled_dir(assets_root) / name, assets_root / name
+    with addon_lock(assets_root, name), profiling.span("enable_addon", addon=name):
+        if not src.is_dir():
+            if dest.is_dir():
+                return dest
+            raise FileNotFoundError("Addon not found: %s" % name)
+        if dest.exists():
+            raise FileExistsError(f"Another copy of {name} is installed: {dest}")
+        _move(src, dest)
+        addon_changed(assets_root, name)
+    return dest
+
+
+def profiles_path(assets_root: Path) -> Path:
+    return state_dir(assets_root) / PROFILES_FILE
+
+
+def load_profiles(assets_root: Path) -> Dict[str, List[str]]:
+    """Every profile: its name and the addon folders it enables."""
+    try:
+        data = json.loads(profiles_path(assets_root).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {name: [str(a) for a in addons] for name, addons in data.items() if isinstance(addons, list)}
+
+
+def _write_profiles(assets_root: Path, profiles: Dict[str, List[str]]) -> None:
+    path = profiles_path(assets_root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(profiles, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _enabled(assets_root: Path) -> List[str]:
+    return sorted((a.name for a in list_installed(assets_root) if a.name.lower() not in PROTECTED), key=str.lower)
+
+
+def save_profile(assets_root: Path, name: str, addons: Optional[List[str]] = None) -> List[str]:
+    """Store profile `name` as `addons`, by default the addons enabled right now."""
+    addons = _enabled(assets_root) if addons is None else sorted(set(addons), key=str.lower)
+    profiles = load_profiles(assets_root)
+    profiles[name] = addons
+    _write_profiles(assets_root, profiles)
+    return addons
+
+
+def delete_profile(assets_root: Path, name: str) -> None:
+    profiles = load_profiles(assets_root)
+    if profiles.pop(name, None) is None:
+        raise ValueError(f"No profile named {name!r}")
+    _write_profiles(assets_root, profiles)
+
+
+def current_profile(assets_root: Path) -> Optional[str]:
+    """The profile whose addons are exactly the enabled ones, if any."""
+    enabled = {a.lower() for a in _enabled(assets_root)}
+    for name, addons in sorted(load_profiles(assets_root).items()):
+        if {a.lower() for a in addons} - set(PROTECTED) == enabled:
+            return name
+    return None
+
+
+def use_profile(assets_root: Path, name: str) -> Tuple[List[str], List[str]]:
+    """Enable exactly the addons of profile `name`; returns the (enabled, disabled) folders."""
+    from .asset_index import addons_changed
+    from .locks import assets_lock
+
+    profiles = load_profiles(assets_root)
+    if name not in profiles:
+        raise ValueError(f"No profile named {name!r}")
+    wanted = {a.lower() for a in profiles[name]}
+    off = disabled_dir(assets_root)
+    with assets_lock(assets_root, shared=False), profiling.span("use_profile", profile=name) as sp:
+        addons = [a for a in list_installed(assets_root, disabled=True) if a.name.lower() not in PROTECTED]
+        on = {a.name.lower() for a in addons if a.enabled}
+        missing = wanted - {a.name.lower() for a in addons} - set(PROTECTED)
+        if missing:
+            raise FileNotFoundError(f"Profile {name!r} names addons that are not installed: "
+                                    f"{', '.join(sorted(missing))}")
+        moves = []
+        for a in addons:
+            key = a.name.lower()
+            if a.enabled and key not in wanted:
+                moves.append((a.path, off / a.name))
+            elif not a.enabled and key in wanted and key not in on:
+                moves.append((a.path, assets_root / a.name))
+        in_the_way = [str(dest) for _, dest in moves if dest.exists()]
+        if in_the_way:
+            raise FileExistsError(f"Cannot switch profiles, in the way: {', '.join(in_the_way)}")
+        off.mkdir(parents=True, exist_ok=True)
+        done = []
+        try:
+            for src, dest in moves:
+                _move(src, dest)
+                done.append((src, dest))
+        except BaseException:
+            for src, dest in reversed(done):
+                _move(dest, src)
+            raise
+        enabled = sorted((dest.name for _, dest in moves if dest.parent == assets_root), key=str.lower)
+        disabled = sorted((dest.name for _, dest in moves if dest.parent == off), key=str.lower)
+        sp.set(enabled=len(enabled), disabled=len(disabled))
+        addons_changed(assets_root, enabled, disabled)
+    return enabled, disabled
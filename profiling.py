@@ -0,0 +1,199 @@
+"""Stage-level timing for the addon pipelines.
+
+Core operations report what they spend time on through `span()`:
+
+    with profiling.span("zip.extract", archive=str(path)) as sp:
+        ...
+        sp.set(files=count, bytes=total)
+
+Recording is off unless `enable()` was called (the CLI does this for
+`--profile`) or the `CUBYZ_ADDON_PROFILE` environment variable names an
+output file. When disabled, `span()` only costs a function call and a
+context manager. Spans are written either as JSON lines or as a Chrome trace
+(`chrome://tracing` / Perfetto) when the profiler is flushed.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+ENV_VAR = "CUBYZ_ADDON_PROFILE"
+FORMAT_ENV_VAR = "CUBYZ_ADDON_PROFILE_FORMAT"
+FORMATS = ("jsonl", "chrome")
+
+
+class Span:
+    """A running span; attributes set on it end up in the output record."""
+
+    __slots__ = ("name", "attrs")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def add(self, **counts) -> None:
+        """Increment numeric attributes, e.g. `sp.add(bytes=len(chunk))`."""
+        for key, value in counts.items():
+            self.attrs[key] = self.attrs.get(key, 0) + value
+
+
+class _NullSpan(Span):
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def add(self, **counts) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan("", {})
+
+
+class Profiler:
+    """Collects finished spans and writes them out on `flush()`."""
+
+    def __init__(self, path: Path, fmt: str = "jsonl"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown profile format: {fmt}")
+        self.path = Path(path)
+        self.fmt = fmt
+        self.records: List[dict] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, attrs: dict) -> Iterator[Span]:
+        stack = self._stack()
+        sp = Span(name, attrs)
+        parent = stack[-1].name if stack else None
+        stack.append(sp)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield sp
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            record = {
+                "name": name,
+                "start": start - self._origin,
+                "duration": end - start,
+                "thread": threading.get_ident(),
+                "parent": parent,
+                "attrs": sp.attrs,
+            }
+            if error:
+                record["error"] = error
+            with self._lock:
+                self.records.append(record)
+
+    def flush(self) -> None:
+        with self._lock:
+            records, self.records = self.records, []
+        if not records:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.fmt == "chrome":
+            pid = os.getpid()
+            events = [{
+                "name": r["name"],
+                "ph": "X",
+                "ts": r["start"] * 1e6,
+                "dur": r["duration"] * 1e6,
+                "pid": pid,
+                "tid": r["thread"],
+                "args": dict(r["attrs"], **({"error": r["error"]} if "error" in r else {})),
+            } for r in records]
+            self.path.write_text(json.dumps({"traceEvents": events}, default=str), encoding="utf-8")
+        else:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for r in records:
+                    f.write(json.dumps(r, default=str) + "\n")
+
+
+_active: Optional[Profiler] = None
+_env_checked = False
+
+
+def enable(path, fmt: Optional[str] = None) -> Profiler:
+    """Start recording spans to `path`; they are flushed at interpreter exit.
+
+    The format defaults to a Chrome trace for `.json` paths and JSON lines
+    otherwise.
+    """
+    global _active, _env_checked
+    if fmt is None:
+        fmt = "chrome" if str(path).lower().endswith(".json") else "jsonl"
+    if _active is not None:
+        _active.flush()
+    _active = Profiler(Path(path), fmt)
+    _env_checked = True
+    atexit.register(_active.flush)
+    return _active
+
+
+def disable() -> None:
+    """Flush and stop recording."""
+    global _active
+    if _active is not None:
+        _active.flush()
+        atexit.unregister(_active.flush)
+    _active = None
+
+
+def _profiler() -> Optional[Profiler]:
+    global _env_checked
+    if not _env_checked:
+        _env_checked = True
+        path = os.environ.get(ENV_VAR)
+        if path:
+            enable(path, os.environ.get(FORMAT_ENV_VAR) or None)
+    return _active
+
+
+def enabled() -> bool:
+    """True when spans are being recorded; use it to skip costly measurements."""
+    return _profiler() is not None
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """Time the enclosed block as a stage called `name`."""
+    prof = _profiler()
+    if prof is None:
+        yield _NULL_SPAN
+        return
+    with prof.span(name, attrs) as sp:
+        yield sp
+
+
+def run_with_cprofile(path, fn, *args, **kwargs):
+    """Run `fn` under cProfile and dump the stats to `path` (for `pstats`/snakeviz)."""
+    import cProfile
+
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn, *args, **kwargs)
+    finally:
+        prof.dump_stats(str(path))
@@ -0,0 +1,143 @@
+"""Progress reporting for long-running addon operations.
+
+Core functions accept an optional `progress` callback that receives
+`Progress` events: bytes downloaded out of the Content-Length, members
+extracted out of the archive total, files copied, and so on. Callers wrap
+their callback in `Throttle` implicitly; events for the same phase are
+delivered at most every `interval` seconds, so hot loops such as extraction
+only pay for a clock read per member.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+class InstallCancelled(Exception):
+    """Raised from a progress callback to abort the running operation."""
+
+
+@dataclass
+class Progress:
+    phase: str  # "download", "extract", "copy", ...
+    done: int
+    total: Optional[int] = None  # None when the total is unknown
+    unit: str = "bytes"  # "bytes" or "files"
+
+    @property
+    def fraction(self) -> Optional[float]:
+        if not self.total:
+            return None
+        return min(1.0, self.done / self.total)
+
+
+ProgressCallback = Callable[[Progress], None]
+
+
+class Throttle:
+    """Rate-limit a progress callback.
+
+    The first and last event of every phase are always delivered; events in
+    between are dropped unless `interval` seconds have passed since the last
+    delivered one.
+    """
+
+    def __init__(self, callback: Optional[ProgressCallback], interval: float = 0.1):
+        self.callback = callback
+        self.interval = interval
+        self._phase: Optional[str] = None
+        self._last = 0.0
+
+    def __call__(self, phase: str, done: int, total: Optional[int] = None,
+                 unit: str = "bytes", final: bool = False) -> None:
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if not final and phase == self._phase and now - self._last < self.interval:
+            if total is None or done < total:
+                return
+        self._phase = phase
+        self._last = now
+        self.callback(Progress(phase, done, total, unit))
+
+
+def throttled(callback) -> Throttle:
+    """Return `callback` as a `Throttle`, wrapping it if necessary."""
+    if isinstance(callback, Throttle):
+        return callback
+    return Throttle(callback)
+
+
+class RateMeter:
+    """Tracks the throughput and ETA of the current phase from progress events."""
+
+    def __init__(self):
+        self.phase: Optional[str] = None
+        self._start = 0.0
+        self._start_done = 0
+
+    def update(self, p: Progress):
+        """Return (rate per second, seconds remaining or None) for event `p`."""
+        now = time.monotonic()
+        if p.phase != self.phase:
+            self.phase = p.phase
+            self._start = now
+            self._start_done = p.done
+            return 0.0, None
+        elapsed = now - self._start
+        rate = (p.done - self._start_done) / elapsed if elapsed > 0 else 0.0
+        eta = (p.total - p.done) / rate if p.total and rate > 0 else None
+        return rate, eta
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024 or unit == "GiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GiB"
+
+
+def describe(p: Progress, rate: float, eta: Optional[float]) -> str:
+    """One-line human readable description, e.g. `download 1.2/4.0 MiB 800 KiB/s ETA 0:04`."""
+    if p.unit == "bytes":
+        amount = format_bytes(p.done) + (f" / {format_bytes(p.total)}" if p.total else "")
+        speed = f"{format_bytes(rate)}/s"
+    else:
+        amount = f"{p.done}" + (f"/{p.total}" if p.total else "") + f" {p.unit}"
+        speed = f"{rate:.0f} {p.unit}/s"
+    text = f"{p.phase}: {amount}"
+    if rate:
+        text += f"  {speed}"
+    if eta is not None:
+        minutes, seconds = divmod(int(eta), 60)
+        text += f"  ETA {minutes}:{seconds:02d}"
+    return text
+
+
+class TerminalProgress:
+    """Progress callback that keeps a single status line updated on a terminal."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.meter = RateMeter()
+        self._phase: Optional[str] = None
+        self._width = 0
+
+    def __call__(self, p: Progress) -> None:
+        if self._phase is not None and p.phase != self._phase:
+            self.stream.write("\n")
+            self._width = 0
+        self._phase = p.phase
+        text = describe(p, *self.meter.update(p))
+        self.stream.write("\r" + text.ljust(self._width))
+        self._width = len(text)
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self._phase is not None:
+            self.stream.write("\n")
+            self.stream.flush()
+            self._phase = None
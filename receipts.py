@@ -0,0 +1,204 @@
+"""Install receipts: where each installed addon came from.
+
+Every install records a receipt in `receipts.sqlite3` in the state folder:
+the addon folder, the catalog id, catalog source and URL it came from, its
+version, the SHA-256 of the installed archive, the install time and the
+list of installed files. Receipts are indexed by catalog id and the files
+by path, so "is catalog entry X installed, and as which folder?", "which
+addon owns this file?" and "what did this addon install?" are single
+lookups instead of directory scans and name matching.
+
+Addons installed before receipts existed (or copied in by hand) simply
+have no receipt; callers fall back to matching folder names.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .core import load_manifest, state_dir
+
+RECEIPTS_FILE = "receipts.sqlite3"
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipts (
+    addon TEXT PRIMARY KEY COLLATE NOCASE,
+    catalog_id TEXT COLLATE NOCASE,
+    source TEXT,
+    url TEXT,
+    version TEXT,
+    sha256 TEXT,
+    installed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS receipts_catalog_id ON receipts (catalog_id);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT NOT NULL,
+    addon TEXT NOT NULL COLLATE NOCASE REFERENCES receipts (addon) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS files_path ON files (path);
+CREATE INDEX IF NOT EXISTS files_addon ON files (addon);
+"""
+# How long to wait for another process writing the database (seconds)
+BUSY_TIMEOUT = 30.0
+
+
+@dataclass
+class Receipt:
+    addon: str  # installed folder name
+    catalog_id: Optional[str] = None
+    source: Optional[str] = None  # catalog source name
+    url: Optional[str] = None
+    version: Optional[str] = None
+    sha256: Optional[str] = None  # of the installed archive; None for folders
+    installed_at: float = 0.0
+
+
+_COLUMNS = "addon, catalog_id, source, url, version, sha256, installed_at"
+
+
+def receipts_path(assets_root: Path) -> Path:
+    return state_dir(assets_root) / RECEIPTS_FILE
+
+
+class ReceiptStore:
+    """Receipts of one assets root. Reads on a missing database return nothing."""
+
+    def __init__(self, assets_root: Path):
+        self.assets_root = assets_root
+        self.path = receipts_path(assets_root)
+        self.db: Optional[sqlite3.Connection] = None
+        if self.path.exists():
+            self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT)
+            self.db.execute("PRAGMA foreign_keys = ON")
+            if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self.db.execute("PRAGMA journal_mode = WAL")  # readers never wait for an install
+                self.db.executescript(SCHEMA)
+                self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        return self.db
+
+    def close(self) -> None:
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def __enter__(self) -> "ReceiptStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        if self.db is None:
+            return []
+        return self.db.execute(sql, params).fetchall()
+
+    def record(self, receipt: Receipt, files: Iterable[str]) -> None:
+        """Store `receipt`, replacing the addon's previous one and its file list."""
+        db = self._connect()
+        with db:
+            db.execute("DELETE FROM receipts WHERE addon = ?", (receipt.addon,))
+            db.execute(f"INSERT INTO receipts ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (receipt.addon, receipt.catalog_id, receipt.source, receipt.url,
+                        receipt.version, receipt.sha256, receipt.installed_at))
+            db.executemany("INSERT INTO files (path, addon) VALUES (?, ?)",
+                           ((path, receipt.addon) for path in files))
+
+    def remove(self, addon: str) -> None:
+        if self.db is not None:
+            with self.db:
+                self.db.execute("DELETE FROM receipts WHERE addon = ?", (addon,))
+
+    def clear(self) -> None:
+        """Forget every receipt."""
+        if self.db is not None:
+            with self.db:
+                self.db.execute("DELETE FROM receipts")
+
+    def get(self, addon: str) -> Optional[Receipt]:
+        rows = self._query(f"SELECT {_COLUMNS} FROM receipts WHERE addon = ?", (addon,))
+        return Receipt(*rows[0]) if rows else None
+
+    def find(self, catalog_id: str) -> Optional[Receipt]:
+        """The most recent install of catalog entry `catalog_id`."""
+        rows = self._query(f"SELECT {_COLUMNS} FROM receipts WHERE catalog_id = ? "
+                           "ORDER BY installed_at DESC LIMIT 1", (catalog_id,))
+        return Receipt(*rows[0]) if rows else None
+
+    def all(self) -> Dict[str, Receipt]:
+        """Every receipt by lower-cased folder name."""
+        return {row[0].lower(): Receipt(*row) for row in self._query(f"SELECT {_COLUMNS} FROM receipts")}
+
+    def files(self, addon: str) -> List[str]:
+        return [row[0] for row in self._query("SELECT path FROM files WHERE addon = ? ORDER BY path", (addon,))]
+
+    def owner(self, path: str) -> Optional[str]:
+        """Folder of the addon that installed `path` (relative to the assets root, '/'-separated)."""
+        rows = self._query("SELECT addon FROM files WHERE path = ? LIMIT 1", (path,))
+        return rows[0][0] if rows else None
+
+
+def copy_database(src: Path, dest: Path) -> None:
+    """Copy the receipts database `src` over `dest` with SQLite's online backup.
+
+    The copy is consistent even while another process writes to `src`.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with closing(sqlite3.connect(str(src), timeout=BUSY_TIMEOUT)) as source, \
+            closing(sqlite3.connect(str(dest), timeout=BUSY_TIMEOUT)) as target:
+        source.backup(target)
+
+
+def archive_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def installed_files(assets_root: Path, name: str) -> List[str]:
+    """Files of an installed addon, relative to the assets root with '/' separators."""
+    files = []
+    for dirpath, _, filenames in os.walk(assets_root / name):
+        rel = Path(dirpath).relative_to(assets_root).as_posix()
+        files.extend(f"{rel}/{f}" for f in filenames)
+    return files
+
+
+def record_install(assets_root: Path, name: str, source: Optional[Path], origin: Optional[dict] = None) -> Receipt:
+    """Write the receipt for addon folder `name`, just installed from `source`.
+
+    `origin` may carry `catalog_id`, `source`, `url`, `version` and `sha256`
+    (for archives that were streamed, so `source` is None); without a version
+    the installed addon.json's is used.
+    """
+    origin = origin or {}
+    version = origin.get("version")
+    if version is None:
+        manifest = load_manifest(assets_root / name)
+        version = manifest.get("version") if manifest else None
+    receipt = Receipt(
+        name, origin.get("catalog_id"), origin.get("source"), origin.get("url"),
+        None if version is None else str(version),
+        origin.get("sha256") or (archive_hash(source) if source is not None and source.is_file() else None),
+        time.time())
+    with ReceiptStore(assets_root) as store:
+        store.record(receipt, installed_files(assets_root, name))
+    return receipt
+
+
+def remove_receipt(assets_root: Path, name: str) -> None:
+    with ReceiptStore(assets_root) as store:
+        store.remove(name)
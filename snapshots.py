@@ -0,0 +1,240 @@
+"""Snapshots of the assets folder for rolling back a bad upgrade.
+
+A snapshot is a tree of hard links to the files in `assets/`, kept in
+`snapshots/<name>/` in the state folder (next to `assets/`, so on the same
+volume). Creating one costs a link per file and no file data is copied, so
+it takes about as long as listing the folder and uses almost no space.
+Along with the files it keeps disabled addons (`disabled/`) and the
+bookkeeping that describes them: the install receipts (an SQLite backup),
+the install manifests and the asset index.
+
+This relies on nothing changing an installed file in place: installs
+replace an addon's whole folder with newly written files, and `optimize`
+and the bookkeeping write a new file and rename it over the old one. Files
+a snapshot shares with `assets/` therefore keep the content they had when
+it was taken. (Editing a file by hand in an editor that rewrites it in
+place does change the snapshot's copy too.)
+
+Restoring links the snapshot's trees into a new folder, which then swap
+places with `assets/` and the state entries by renames while the assets
+lock is held exclusively; the snapshot stays as it was and can be restored
+again. The replaced trees are only deleted once every step has succeeded,
+so a failed restore is undone and leaves the files and their bookkeeping
+as they were.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from . import profiling
+from .core import state_dir
+
+SNAPSHOT_DIR = "snapshots"
+INFO_FILE = "snapshot.json"
+_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{0,63}")
+
+
+@dataclass
+class Snapshot:
+    name: str
+    path: Path
+    created: float = 0.0
+    files: int = 0
+    copied: int = 0  # files that could not be linked and were copied instead
+
+
+def snapshots_dir(assets_root: Path) -> Path:
+    return state_dir(assets_root) / SNAPSHOT_DIR
+
+
+def _state_entries() -> Tuple[str, ...]:
+    """Disabled addons and the bookkeeping files and folders, besides the receipts, that describe `assets/`."""
+    from .asset_index import INDEX_FILE
+    from .core import DISABLED_DIR
+    from .integrity import MANIFEST_DIR
+
+    return DISABLED_DIR, INDEX_FILE, MANIFEST_DIR
+
+
+def link_tree(src: Path, dest: Path) -> Tuple[int, int]:
+    """Recreate the tree `src` at `dest` with hard links; returns (linked, copied) file counts.
+
+    Files that cannot be linked (e.g. on a file system without hard links)
+    are copied. Symbolic links are recreated, not followed.
+    """
+    linked = copied = 0
+    stack = [(str(src), str(dest))]
+    while stack:
+        src_dir, dest_dir = stack.pop()
+        os.mkdir(dest_dir)
+        with os.scandir(src_dir) as it:
+            for entry in it:
+                target = os.path.join(dest_dir, entry.name)
+                if entry.is_symlink():
+                    os.symlink(os.readlink(entry.path), target)
+                elif entry.is_dir():
+                    stack.append((entry.path, target))
+                else:
+                    try:
+                        os.link(entry.path, target)
+                        linked += 1
+                    except OSError:
+                        shutil.copy2(entry.path, target)
+                        copied += 1
+    return linked, copied
+
+
+def _link(src: Path, dest: Path) -> None:
+    """`link_tree` for a single file or folder."""
+    if src.is_dir():
+        link_tree(src, dest)
+    else:
+        os.link(src, dest)
+
+
+def _check_name(name: str) -> None:
+    if not _NAME.fullmatch(name):
+        raise ValueError(f"Invalid snapshot name {name!r}: use letters, digits, '.', '_' and '-'")
+
+
+def _read_info(path: Path) -> Optional[Snapshot]:
+    try:
+        info = json.loads((path / INFO_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return Snapshot(path.name, path, float(info.get("created", 0)), int(info.get("files", 0)),
+                    int(info.get("copied", 0)))
+
+
+def get_snapshot(assets_root: Path, name: str) -> Snapshot:
+    _check_name(name)
+    snapshot = _read_info(snapshots_dir(assets_root) / name)
+    if snapshot is None:
+        raise FileNotFoundError(f"No snapshot named {name!r}")
+    return snapshot
+
+
+def list_snapshots(assets_root: Path) -> List[Snapshot]:
+    """Every complete snapshot, oldest first."""
+    root = snapshots_dir(assets_root)
+    if not root.is_dir():
+        return []
+    snapshots = [_read_info(p) for p in root.iterdir() if p.is_dir() and _NAME.fullmatch(p.name)]
+    return sorted((s for s in snapshots if s is not None), key=lambda s: (s.created, s.name))
+
+
+def create_snapshot(assets_root: Path, name: Optional[str] = None) -> Snapshot:
+    """Snapshot the assets folder as `name` (default: the current date and time)."""
+    from .locks import assets_lock
+    from .receipts import copy_database, receipts_path
+
+    name = name or time.strftime("%Y%m%d-%H%M%S")
+    _check_name(name)
+    root = snapshots_dir(assets_root)
+    dest = root / name
+    if dest.exists():
+        raise FileExistsError(f"Snapshot already exists: {name}")
+    root.mkdir(parents=True, exist_ok=True)
+    # Built under a hidden name and renamed once complete, so a half-made snapshot never shows up
+    work = Path(tempfile.mkdtemp(prefix=f".{name}-", dir=root))
+    try:
+        with assets_lock(assets_root, shared=False), profiling.span("snapshot.create", snapshot=name) as sp:
+            linked, copied = link_tree(assets_root, work / "assets")
+            state = state_dir(assets_root)
+            (work / "state").mkdir()
+            for entry in _state_entries():
+                if (state / entry).exists():
+                    _link(state / entry, work / "state" / entry)
+            if receipts_path(assets_root).exists():
+                copy_database(receipts_path(assets_root), work / "state" / receipts_path(assets_root).name)
+            sp.set(files=linked + copied, copied=copied)
+        snapshot = Snapshot(name, dest, time.time(), linked + copied, copied)
+        (work / INFO_FILE).write_text(json.dumps({"created": snapshot.created, "files": snapshot.files,
+                                                  "copied": snapshot.copied}), encoding="utf-8")
+        os.rename(work, dest)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return snapshot
+
+
+def delete_snapshot(assets_root: Path, name: str) -> None:
+    snapshot = get_snapshot(assets_root, name)
+    trash = Path(tempfile.mkdtemp(prefix=".deleted-", dir=snapshots_dir(assets_root)))
+    os.rename(snapshot.path, trash / name)  # gone from the list at once, however long removal takes
+    shutil.rmtree(trash)
+
+
+def _swap_in(new: Optional[Path], live: Path, old: Path, done: List[Tuple[Path, Optional[Path]]]) -> None:
+    """Move `live` (if any) to `old` and `new` (if any) to `live`, recording the move for `_undo`."""
+    if live.exists() or live.is_symlink():
+        os.rename(live, old)
+        done.append((live, old))
+    else:
+        done.append((live, None))
+    if new is not None:
+        os.rename(new, live)
+
+
+def _undo(done: List[Tuple[Path, Optional[Path]]], trash: Path) -> None:
+    """Put back everything `_swap_in` replaced, newest first."""
+    for i, (live, old) in enumerate(reversed(done)):
+        if live.exists() or live.is_symlink():
+            os.rename(live, trash / f"undone-{i}")
+        if old is not None:
+            os.rename(old, live)
+
+
+def restore_snapshot(assets_root: Path, name: str) -> Snapshot:
+    """Put the assets folder (and its bookkeeping) back the way it was at snapshot `name`.
+
+    Addons installed since are removed, replaced ones come back. The
+    snapshot itself is kept.
+    """
+    from .locks import assets_lock
+    from .receipts import ReceiptStore, copy_database, receipts_path
+
+    snapshot = get_snapshot(assets_root, name)
+    work = Path(tempfile.mkdtemp(prefix=".restore-", dir=snapshots_dir(assets_root)))
+    done: List[Tuple[Path, Optional[Path]]] = []
+    receipts, backup = receipts_path(assets_root), work / "receipts.replaced"
+    try:
+        with assets_lock(assets_root, shared=False), profiling.span("snapshot.restore", snapshot=name) as sp:
+            # Link everything first, so the swaps below are nothing but renames
+            linked, copied = link_tree(snapshot.path / "assets", work / "assets")
+            sp.set(files=linked + copied)
+            state, saved = state_dir(assets_root), snapshot.path / "state"
+            (work / "state").mkdir()
+            for entry in _state_entries():
+                if (saved / entry).exists():
+                    _link(saved / entry, work / "state" / entry)
+            if receipts.exists():
+                copy_database(receipts, backup)
+
+            try:
+                _swap_in(work / "assets", assets_root, work / "replaced", done)
+                for entry in _state_entries():
+                    new = work / "state" / entry
+                    _swap_in(new if new.exists() else None, state / entry, work / f"{entry}.replaced", done)
+                saved_receipts = saved / receipts.name
+                if saved_receipts.exists():
+                    copy_database(saved_receipts, receipts)
+                else:
+                    with ReceiptStore(assets_root) as store:
+                        store.clear()
+            except BaseException:
+                _undo(done, work)
+                if backup.exists():
+                    copy_database(backup, receipts)
+                raise
+    finally:
+        shutil.rmtree(work, ignore_errors=True)  # the replaced trees, once the restore is complete or undone
+    return snapshot
@@ -0,0 +1,198 @@
+"""Several catalog sources, fetched concurrently and merged.
+
+Sources are configured with the `sources` setting (see `config`), a list of
+objects such as:
+
+    [{"name": "internal", "url": "http://intranet/addons/", "priority": 10, "timeout": 5},
+     {"name": "public", "url": "https://addons.ashframe.net/addons.json"}]
+
+A URL ending in "/" means the `addons.json` inside it. Without the setting
+the single configured `base_url` is used.
+
+Every source is fetched on its own thread, and its `timeout` is a deadline
+for the whole fetch: a source that has not answered by then is treated as
+failed (its cached copy is used), so a slow source delays the result by at
+most its own timeout. Entries are merged by
+`id`: the source with the higher priority wins, ties go to the source
+listed first. Each source's last good response is cached in the state
+folder (and revalidated with its ETag), so a source that is down still
+contributes its cached entries and never hides the others.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from . import profiling
+from .catalog import CATALOG_FILE, TIMEOUT, catalog_url, entry_key, open_url, resolve_links
+from .config import get_setting
+from .core import state_dir
+
+CACHE_DIR = "catalog_cache"
+
+# Merged catalogs kept in memory by long-running processes (see `keep_warm`)
+_memo_ttl: Optional[float] = None
+_memo: Dict[tuple, Tuple[float, "MergedCatalog"]] = {}
+
+
+@dataclass
+class CatalogSource:
+    name: str
+    url: str
+    priority: int = 0
+    timeout: float = TIMEOUT
+
+
+@dataclass
+class SourceStatus:
+    name: str
+    entries: int = 0
+    cached: bool = False  # fetching failed and the last good copy was used
+    error: Optional[str] = None
+
+
+@dataclass
+class MergedCatalog:
+    entries: List[dict] = field(default_factory=list)
+    sources: List[SourceStatus] = field(default_factory=list)
+
+    @property
+    def errors(self) -> List[SourceStatus]:
+        return [s for s in self.sources if s.error]
+
+
+def catalog_sources(assets_root: Path) -> List[CatalogSource]:
+    """The configured sources, or the base URL's catalog if none are configured.
+
+    Raises ValueError for a malformed `sources` setting.
+    """
+    configured = get_setting(assets_root, "sources")
+    try:
+        if isinstance(configured, str):
+            configured = json.loads(configured)  # from the environment
+        if not configured:
+            return [CatalogSource("default", catalog_url(assets_root))]
+        if not isinstance(configured, list):
+            raise TypeError("expected a list of sources")
+        sources = []
+        for i, item in enumerate(configured, 1):
+            if isinstance(item, str):
+                item = {"url": item}
+            if not isinstance(item, dict) or not isinstance(item.get("url"), str):
+                raise TypeError(f"source {i} needs a url")
+            url = item["url"] if not item["url"].endswith("/") else item["url"] + CATALOG_FILE
+            sources.append(CatalogSource(
+                str(item.get("name") or urlparse(url).netloc or f"source{i}"), url,
+                int(item.get("priority", 0)), float(item.get("timeout", TIMEOUT))))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid sources setting: {e}") from None
+    return sources
+
+
+def _cache_path(cache_dir: Path, url: str) -> Path:
+    return cache_dir / (hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".json")
+
+
+def _read_cache(cache_dir: Path, source: CatalogSource) -> Optional[dict]:
+    try:
+        cached = json.loads(_cache_path(cache_dir, source.url).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return cached if isinstance(cached, dict) and isinstance(cached.get("entries"), list) else None
+
+
+def _fallback(source: CatalogSource, cached: Optional[dict], error: str) -> Tuple[List[dict], SourceStatus]:
+    if cached:
+        return cached["entries"], SourceStatus(source.name, len(cached["entries"]), True, error)
+    return [], SourceStatus(source.name, error=error)
+
+
+def fetch_source(source: CatalogSource, cache_dir: Path) -> Tuple[List[dict], SourceStatus]:
+    """Entries of one source, falling back to its cached copy on failure."""
+    path = _cache_path(cache_dir, source.url)
+    cached = _read_cache(cache_dir, source)
+    headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else None
+    with profiling.span("catalog.source", source=source.name, url=source.url) as sp:
+        try:
+            r = open_url(source.url, timeout=source.timeout, headers=headers)
+            if r.status_code == 304 and cached:
+                sp.set(status=304)
+                return cached["entries"], SourceStatus(source.name, len(cached["entries"]))
+            r.raise_for_status()
+            entries = resolve_links(r.json(), source.url)
+        except Exception as e:
+            sp.set(error=str(e))
+            return _fallback(source, cached, str(e))
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"url": source.url, "etag": r.headers.get("etag"),
+                                       "entries": entries}), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            pass
+        sp.set(entries=len(entries))
+        return entries, SourceStatus(source.name, len(entries))
+
+
+def merge_catalogs(results: List[Tuple[CatalogSource, List[dict]]]) -> List[dict]:
+    """Merge entries by id; higher priority first, then configuration order.
+
+    Each merged entry records the name of the source it came from in `source`.
+    """
+    order = sorted(range(len(results)), key=lambda i: (-results[i][0].priority, i))
+    merged = {}
+    for i in order:
+        source, entries = results[i]
+        for entry in entries:
+            key = entry_key(entry)
+            if key and key not in merged:
+                merged[key] = dict(entry, source=source.name)
+    return list(merged.values())
+
+
+def keep_warm(ttl: Optional[float]) -> None:
+    """Reuse a merged catalog for `ttl` seconds if every source answered (None turns this off)."""
+    global _memo_ttl
+    _memo_ttl = ttl
+    _memo.clear()
+
+
+def load_catalog(assets_root: Path, sources: Optional[List[CatalogSource]] = None) -> MergedCatalog:
+    """Fetch all sources concurrently and merge them."""
+    sources = sources or catalog_sources(assets_root)
+    cache_dir = state_dir(assets_root) / CACHE_DIR
+    key = (str(cache_dir),) + tuple((s.name, s.url, s.priority, s.timeout) for s in sources)
+    if _memo_ttl is not None and key in _memo and time.monotonic() - _memo[key][0] < _memo_ttl:
+        return _memo[key][1]
+    with profiling.span("catalog.load", sources=len(sources)) as sp:
+        # Not a `with` block: leaving it would wait for sources past their deadline
+        pool = ThreadPoolExecutor(max_workers=len(sources))
+        try:
+            start = time.monotonic()
+            futures = [pool.submit(fetch_source, s, cache_dir) for s in sources]
+            results = []
+            for source, future in zip(sources, futures):
+                wait([future], timeout=max(0.0, start + source.timeout - time.monotonic()))
+                if future.done():
+                    results.append(future.result())
+                else:
+                    # Late answers still refresh the cache for next time
+                    results.append(_fallback(source, _read_cache(cache_dir, source),
+                                             f"no answer within {source.timeout:g}s"))
+        finally:
+            pool.shutdown(wait=False)
+        entries = merge_catalogs([(s, r[0]) for s, r in zip(sources, results)])
+        sp.set(entries=len(entries))
+    merged = MergedCatalog(entries, [status for _, status in results])
+    if _memo_ttl is not None and not merged.errors:
+        _memo[key] = (time.monotonic(), merged)
+    return merged
@@ -0,0 +1,94 @@
+from addon_manager import core
+from addon_manager.asset_index import AssetIndex, asset_id, install_conflicts, scan_ids
+from pathlib import Path
+import tarfile
+import zipfile
+
+import pytest
+
+
+def _addon(root: Path, name: str, *files: str) -> Path:
+    for f in files:
+        p = root / name / f
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(".{}")
+    return root / name
+
+
+def test_asset_id():
+    assert asset_id("blocks/ores/copper.zig.zon") == ("blocks", "ores/copper")
+    assert asset_id("items/stick.json") == ("items", "stick")
+    assert asset_id("blocks/_defaults.zig.zon") is None
+    assert asset_id("blocks/textures/stone.png") is None
+    assert asset_id("recipes/stick.zig.zon") is None
+
+
+def test_conflicts_maintained_incrementally(tmp_path: Path):
+    assets = tmp_path / "assets"
+    _addon(assets, "cubyz", "blocks/stone.zig.zon", "items/stick.zig.zon")
+    index = AssetIndex.load(assets)
+    assert index.conflicts() == {}
+
+    src = _addon(tmp_path, "rocks", "blocks/stone.zig.zon", "blocks/marble.zig.zon")
+    assert install_conflicts(assets, "rocks", scan_ids(src)) == {("blocks", "stone"): ["cubyz"]}
+    core.install_addon(src, assets)
+    assert AssetIndex.load(assets, sync=False).conflicts() == {("blocks", "stone"): ["cubyz", "rocks"]}
+
+    core.uninstall_addon("rocks", assets)
+    assert AssetIndex.load(assets, sync=False).conflicts() == {}
+
+
+class _Abort(Exception):
+    pass
+
+
+def test_conflicts_are_checked_before_anything_is_written(tmp_path: Path):
+    assets = tmp_path / "assets"
+    _addon(assets, "cubyz", "items/stick.zig.zon", "blocks/stone.zig.zon")
+    src = _addon(tmp_path / "src", "pack", "items/stick.zig.zon", "items/rope.zig.zon")
+    zp = tmp_path / "pack.zip"
+    with zipfile.ZipFile(zp, "w") as zf:
+        zf.writestr("pack-main/items/stick.zig.zon", ".{}")
+        zf.writestr("pack-main/addon.json", "{}")
+    tp = tmp_path / "pack.tar.gz"
+    with tarfile.open(tp, "w:gz") as tf:
+        tf.add(src, arcname="pack-main")
+
+    seen = []
+
+    def refuse(name, conflicts):
+        seen.append((name, conflicts))
+        raise _Abort()
+
+    for source in (src, zp, tp):
+        with pytest.raises(_Abort):
+            core.install_addon(source, assets, on_conflicts=refuse)
+        assert not (assets / "pack").exists()
+    assert seen == [("pack", {("items", "stick"): ["cubyz"]})] * 3
+
+    # only the members a filter keeps count
+    core.install_addon(zp, assets, filters=core.ArchiveFilter(exclude=["items/stick.zig.zon"]),
+                       on_conflicts=refuse)
+    assert (assets / "pack").is_dir() and len(seen) == 3
+
+
+def test_cli_conflicts(tmp_path: Path, capsys):
+    assets = tmp_path / "assets"
+    _addon(assets, "cubyz", "items/stick.zig.zon")
+    _addon(assets, "other", "items/stick.zig.zon")
+    assert core.cli(["conflicts", "--assets", str(assets)]) == 1
+    assert "item 'stick': cubyz, other" in capsys.readouterr().out
+
+
+def test_install_reports_conflicts_for_any_archive(tmp_path: Path, capsys):
+    assets = tmp_path / "assets"
+    _addon(assets, "cubyz", "blocks/stone.zig.zon")
+    src = _addon(tmp_path / "src", "rocks", "blocks/stone.zig.zon", "blocks/marble.zig.zon")
+    archive = tmp_path / "rocks.tar.gz"
+    with tarfile.open(archive, "w:gz") as tf:
+        tf.add(src, arcname="rocks")
+    # no index yet: the check builds it before the archive is extracted
+    assert core.cli(["install", str(archive), "--assets", str(assets)]) == 0
+    out = capsys.readouterr().out
+    assert out.index("Warning: conflicting block 'stone': cubyz, rocks") < out.index("Installed:")
+    assert AssetIndex.load(assets, sync=False).addons["rocks"] == {"blocks": ["marble", "stone"]}
@@ -0,0 +1,19 @@
+from addon_manager.benchmarks import bench_core
+from pathlib import Path
+
+
+def test_run_benchmarks_smoke(tmp_path: Path):
+    cases = [bench_core.ZipCase(5, "single", 16), bench_core.ZipCase(5, "flat", 16)]
+    results = bench_core.run_benchmarks(tmp_path, [3], cases, repeat=1)
+    assert "list_installed/3" in results
+    assert "install_addon/zip/single-5-small" in results
+    assert "uninstall_addon/flat-5-small" in results
+    assert "install_addon/folder/5-small" in results
+
+
+def test_compare_flags_regressions():
+    baseline = {"a": {"median": 1.0}, "b": {"median": 1.0}}
+    current = {"a": {"median": 1.1}, "b": {"median": 2.0}, "c": {"median": 5.0}}
+    regressions = bench_core.compare(current, baseline, threshold=0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("b:")
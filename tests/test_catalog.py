@@ -0,0 +1,107 @@
+from addon_manager import catalog, core
+from addon_manager.receipts import ReceiptStore
+from pathlib import Path
+import io
+import json
+import zipfile
+
+
+def _zip(name: str, version: str) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr(f"{name}/addon.json", json.dumps({"version": version}))
+        zf.writestr(f"{name}/blocks/thing.zig.zon", ".{}")
+    return buf.getvalue()
+
+
+class _Response:
+    def __init__(self, url: str, body: bytes):
+        self.url = url
+        self.body = body
+        self.status_code = 200
+        self.headers = {"content-length": str(len(body))}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.body)
+
+    def iter_content(self, chunk_size=65536):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+def _serve(monkeypatch, files):
+    def get(url, **kwargs):
+        return _Response(url, files[url])
+    monkeypatch.setattr(catalog.requests, "get", get)
+
+
+def test_parse_version_ordering():
+    ordered = ["0.9", "1.0-alpha", "1.0-beta.2", "1.0-beta.10", "1.0", "1.0.1", "1.2", "1.10", "v2.0.0+build5"]
+    keys = [catalog.parse_version(v) for v in ordered]
+    assert keys == sorted(keys)
+    assert catalog.parse_version("1.0") == catalog.parse_version("1.0.0")
+    assert catalog.is_newer("1.10", "1.9")
+    assert not catalog.is_newer("1.0", None)
+
+
+def test_diff_entries_by_key():
+    old = [{"id": "Ores", "version": "1.0"}, {"id": "trees", "version": "2.0"}, {"name": "Lamps", "version": "0.1"}]
+    new = [{"id": "lamps", "version": "0.1"}, {"id": "ores", "version": "1.1"}, {"id": "trees", "version": "2.0"},
+           {"id": "caves", "version": "0.1"}]
+    # "Lamps" without an id and "lamps" share a key but differ, so they count as changed
+    assert catalog.diff_entries(old, new) == (["caves"], [], ["lamps", "ores"])
+    assert catalog.diff_entries(new, new[1:]) == ([], ["lamps"], [])
+
+
+def test_find_outdated_matches_by_id_and_folder(tmp_path: Path):
+    assets = tmp_path / "assets"
+    for name, manifest in (("ores", {"version": "1.0"}), ("Trees", {"version": "2.0"}),
+                           ("renamed", {"id": "lamps", "version": "0.1"}), ("local", None)):
+        (assets / name).mkdir(parents=True)
+        if manifest:
+            (assets / name / "addon.json").write_text(json.dumps(manifest))
+    entries = [
+        {"id": "ores", "name": "Ores", "version": "1.1", "download": "ores.zip"},
+        {"id": "trees", "name": "Trees", "version": "2.0", "download": "trees.zip"},
+        {"id": "lamps", "name": "Lamps", "version": "0.2", "download": "lamps.zip"},
+    ]
+    outdated = catalog.find_outdated(core.list_installed(assets), entries)
+    assert [(o.name, o.installed, o.latest) for o in outdated] == [("ores", "1.0", "1.1"),
+                                                                   ("renamed", "0.1", "0.2")]
+
+
+def test_cli_outdated_and_upgrade(tmp_path: Path, monkeypatch, capsys):
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    for name in ("ores", "lamps"):
+        (assets / name).mkdir()
+        (assets / name / "addon.json").write_text('{"version": "1.0"}')
+    entries = [
+        {"id": "ores", "name": "Ores", "version": "1.1", "download": "files/ores.zip"},
+        {"id": "lamps", "name": "Lamps", "version": "2.0", "download": "files/lamps-2.0.zip"},
+    ]
+    _serve(monkeypatch, {
+        catalog.CATALOG_URL: json.dumps(entries).encode(),
+        catalog.BASE_URL + "files/ores.zip": _zip("ores", "1.1"),
+        catalog.BASE_URL + "files/lamps-2.0.zip": _zip("lamps", "2.0"),
+    })
+
+    assert core.cli(["outdated", "--assets", str(assets)]) == 0
+    assert capsys.readouterr().out.splitlines() == ["lamps\t1.0\t->\t2.0", "ores\t1.0\t->\t1.1"]
+
+    assert core.cli(["upgrade", "--assets", str(assets)]) == 2
+    assert core.cli(["upgrade", "--all", "--assets", str(assets)]) == 0
+    out = capsys.readouterr().out
+    assert "Upgraded: lamps 1.0 -> 2.0" in out and "Upgraded: ores 1.0 -> 1.1" in out
+    # Upgrades replace the installed folder rather than adding "lamps-2.0"
+    assert core.load_manifest(assets / "lamps") == {"version": "2.0"}
+    assert not (assets / "lamps-2.0").exists()
+    assert catalog.find_outdated(core.list_installed(assets), entries) == []
+    # The receipt keeps pointing at the catalog entry, so later upgrades and uninstalls find it
+    with ReceiptStore(assets) as store:
+        receipt = store.get("lamps")
+    assert (receipt.catalog_id, receipt.version) == ("lamps", "2.0")
+    assert receipt.url == catalog.BASE_URL + "files/lamps-2.0.zip"
@@ -23,3 +23,19 @@ def test_install_and_uninstall(tmp_path: Path):
     assert installed.exists()
     core.uninstall_addon(installed.name, assets)
     assert not installed.exists()
+
+
+def test_addon_signatures_diff(tmp_path: Path):
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    (assets / "a").mkdir()
+    (assets / "a" / "addon.json").write_text('{"version": "1"}')
+    (assets / "b").mkdir()
+    before = core.addon_signatures(assets)
+    assert before["b"] is None
+
+    (assets / "a" / "addon.json").write_text('{"version": "1.1"}')
+    (assets / "b").rmdir()
+    (assets / "c").mkdir()
+    after = core.addon_signatures(assets)
+    assert core.diff_signatures(before, after) == (["c"], ["b"], ["a"])
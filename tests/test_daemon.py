@@ -0,0 +1,153 @@
+from addon_manager import core, daemon
+from pathlib import Path
+import json
+import threading
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(daemon.socket, "AF_UNIX"), reason="needs Unix sockets")
+
+
+@pytest.fixture
+def server(tmp_path: Path, monkeypatch):
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    (assets / "ores").mkdir()
+    (assets / "ores" / "addon.json").write_text(json.dumps({"name": "Ores", "version": "1.2"}))
+    sock = tmp_path / "d.sock"
+    srv = daemon.make_server(assets, sock)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv(daemon.SOCKET_ENV_VAR, str(sock))
+    yield assets, sock
+    srv.shutdown()
+    thread.join(5)
+    assert not thread.is_alive()
+    srv.server_close()
+
+
+def test_rpc_methods(server):
+    assets, sock = server
+    with daemon.Client(sock) as client:
+        assert client.call("ping")["assets"] == str(assets)
+        addons = {a["name"]: a for a in client.call("list")}
+        assert addons["ores"] == {"name": "ores", "path": str(assets / "ores"), "version": "1.2"}
+        result = client.call("run", argv=["list"])
+        assert result["exit"] == 0 and "ores" in result["stdout"]
+        assert client.call("run", argv=["validate", "missing"])["exit"] != 0
+        with pytest.raises(daemon.RPCError) as e:
+            client.call("nope")
+        assert e.value.code == daemon.METHOD_NOT_FOUND
+        with pytest.raises(daemon.RPCError):
+            client.call("run", argv=["serve"])
+    with pytest.raises(FileExistsError):
+        daemon.make_server(assets, sock)
+
+
+def test_cli_forwards_to_server(server, capsys, monkeypatch):
+    assets, sock = server
+    # the server runs the command, the CLI only prints its output
+    monkeypatch.setattr(daemon.Daemon, "run", lambda self, argv, cwd, env: {"exit": 3, "stdout": "hi\n", "stderr": ""})
+    assert core.cli(["list", "--assets", str(assets)]) == 3
+    assert capsys.readouterr().out == "hi\n"
+
+    monkeypatch.setenv(daemon.DISABLE_ENV_VAR, "1")
+    assert core.cli(["list", "--assets", str(assets)]) == 0
+    assert "ores" in capsys.readouterr().out
+
+
+def _broken_server(path: Path, reply: bytes) -> threading.Thread:
+    """A server that reads one request and answers with `reply` (b"" to hang up)."""
+    listener = daemon.socket.socket(daemon.socket.AF_UNIX, daemon.socket.SOCK_STREAM)
+    listener.bind(str(path))
+    listener.listen(1)
+
+    def serve():
+        conn, _ = listener.accept()
+        with conn, listener:
+            conn.makefile("rb").readline()
+            conn.sendall(reply)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    return thread
+
+
+@pytest.mark.parametrize("reply", [b"", b"not json\n", b'{"jsonrpc": "2.0", "id": 1, "result": {}}\n'])
+def test_cli_reports_a_server_that_fails_mid_command(tmp_path: Path, capsys, monkeypatch, reply):
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    sock = tmp_path / "broken.sock"
+    monkeypatch.setenv(daemon.SOCKET_ENV_VAR, str(sock))
+    thread = _broken_server(sock, reply)
+    assert core.cli(["list", "--assets", str(assets)]) == 2
+    out = capsys.readouterr().out
+    assert out.startswith("Error: the server on") and len(out.splitlines()) == 1
+    thread.join(5)
+
+
+def test_cli_reports_server_errors_and_runs_installs_locally(server, capsys, monkeypatch, tmp_path: Path):
+    assets, sock = server
+
+    def fail(self, argv, cwd, env):
+        raise daemon.RPCError(daemon.INTERNAL_ERROR, "boom")
+
+    monkeypatch.setattr(daemon.Daemon, "run", fail)
+    assert core.cli(["list", "--assets", str(assets)]) == 2
+    assert "(boom)" in capsys.readouterr().out
+
+    # installs show their progress, so they are never forwarded
+    bad = tmp_path / "notes.txt"
+    bad.write_text("not an addon")
+    assert core.cli(["install", str(bad), "--assets", str(assets)]) == 2
+    assert "Unsupported addon source" in capsys.readouterr().out
+
+
+def test_run_uses_client_cwd_and_env(server, tmp_path: Path):
+    assets, sock = server
+    (assets / "trees").mkdir()
+    sub = tmp_path / "deep" / "dir"
+    sub.mkdir(parents=True)
+    with daemon.Client(sock) as client:
+        # relative paths are the client's, not the server's
+        result = client.call("run", argv=["list", "--assets", "../../assets"], cwd=str(sub))
+        assert result["exit"] == 0 and "trees" in result["stdout"]
+        result = client.call("run", argv=["config", "lock_timeout"], cwd=str(sub),
+                             env={"CUBYZ_ADDON_LOCK_TIMEOUT": "7"})
+        assert result["stdout"].strip().endswith("7")
+        assert "7" not in client.call("run", argv=["config", "lock_timeout"])["stdout"]
+
+
+def test_commands_run_concurrently(server, monkeypatch):
+    assets, sock = server
+    started = threading.Barrier(2, timeout=5)
+    real = core._run_command
+
+    def slow(parser, args):
+        if args.cmd == "list":
+            started.wait()  # both commands are running at once
+            print(f"hello from {threading.current_thread().name}")
+        return real(parser, args)
+
+    monkeypatch.setattr(core, "_run_command", slow)
+    results = {}
+
+    def call(name):
+        with daemon.Client(sock) as client:
+            results[name] = client.call("run", argv=["list"])
+
+    threads = [threading.Thread(target=call, args=(n,)) for n in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    # each request gets only its own output
+    assert all(r["exit"] == 0 and r["stdout"].count("hello from") == 1 for r in results.values())
+    assert len(results) == 2
+
+
+def test_stop(server, tmp_path: Path):
+    assets, sock = server
+    daemon.stop(sock)
+    with pytest.raises(FileNotFoundError):
+        daemon.stop(tmp_path / "none.sock")
@@ -0,0 +1,147 @@
+from addon_manager import catalog, core, dependencies, profiles
+from addon_manager.dependencies import DependencyError, parse_requirement
+from addon_manager.receipts import ReceiptStore, record_install
+from pathlib import Path
+import io
+import json
+import zipfile
+
+import pytest
+
+
+def _entry(ident, version, deps=None):
+    entry = {"id": ident, "name": ident, "version": version, "download": f"{ident}.zip"}
+    if deps is not None:
+        entry["dependencies"] = deps
+    return entry
+
+
+def _installed(tmp_path: Path, **versions):
+    assets = tmp_path / "assets"
+    assets.mkdir(exist_ok=True)
+    for name, manifest in versions.items():
+        (assets / name).mkdir()
+        (assets / name / "addon.json").write_text(json.dumps(manifest))
+    return assets
+
+
+def test_parse_dependencies_and_constraints():
+    reqs = dependencies.parse_dependencies({"dependencies": ["Ores>=1.2,<2", "lamps"]})
+    assert [str(r) for r in reqs] == ["ores>=1.2,<2", "lamps"]
+    assert reqs[0].allows("1.5") and not reqs[0].allows("2.0") and not reqs[0].allows(None)
+    assert reqs[1].allows(None)
+    assert parse_requirement("x", "1.0").allows("1.0.0")
+    assert dependencies.parse_dependencies({"dependencies": {"a": "*"}}) == [parse_requirement("a")]
+    with pytest.raises(DependencyError):
+        parse_requirement("x", ">=")
+
+
+def test_resolve_orders_closure_and_keeps_satisfied(tmp_path: Path):
+    assets = _installed(tmp_path, base={"version": "1.0"})
+    entries = [
+        _entry("app", "1.0", {"lib": ">=2", "base": ">=1"}),
+        _entry("lib", "2.1", ["core>=0.5"]),
+        _entry("core", "0.5"),
+        _entry("base", "3.0"),
+    ]
+    plan = dependencies.resolve(entries, core.list_installed(assets), install_ids=["app"])
+    assert [p.id for p in plan] == ["core", "lib", "app"]
+    assert plan[1].required_by == ["app"]
+
+    # an installed version that is too old is upgraded in place
+    plan = dependencies.resolve([_entry("app", "1.0", {"base": ">=2"}), _entry("base", "3.0")],
+                                core.list_installed(assets), install_ids=["app"])
+    assert [(p.id, p.folder) for p in plan] == [("base", "base"), ("app", "app")]
+
+
+def test_resolve_reports_cycles_conflicts_and_missing():
+    with pytest.raises(DependencyError, match="cycle: a -> b -> a"):
+        dependencies.resolve([_entry("a", "1", ["b"]), _entry("b", "1", ["a"])], [], install_ids=["a"])
+    with pytest.raises(DependencyError, match="lib: b needs lib<2, but the catalog has 2.0"):
+        dependencies.resolve([_entry("a", "1", ["lib>=2", "b"]), _entry("b", "1", ["lib<2"]),
+                              _entry("lib", "2.0")], [], install_ids=["a"])
+    with pytest.raises(DependencyError, match="nope: not installed and not in the catalog"):
+        dependencies.resolve([_entry("a", "1", ["nope"])], [], install_ids=["a"])
+
+
+def test_resolve_finds_dependencies_by_receipt_and_enables_disabled(tmp_path: Path):
+    # lib was installed from the catalog into a folder of another name; base is disabled
+    assets = _installed(tmp_path, **{"lib-main": {"version": "2.0"}, "base": {"version": "1.0"}})
+    record_install(assets, "lib-main", None, {"catalog_id": "lib", "version": "2.0"})
+    profiles.disable_addon("base", assets)
+    entries = [_entry("app", "1.0", {"lib": ">=2", "base": ">=1"}), _entry("lib", "2.1"),
+               _entry("base", "3.0", ["core"]), _entry("core", "1.0")]
+    with ReceiptStore(assets) as store:
+        receipts = store.all()
+    installed = core.list_installed(assets, disabled=True)
+    plan = dependencies.resolve(entries, installed, install_ids=["app"], receipts=receipts)
+    assert [(p.id, p.folder, p.enable) for p in plan] == [("base", "base", True), ("app", "app", False)]
+    assert dependencies.unsatisfied([parse_requirement("lib", ">=2")], installed, receipts) == []
+    assert dependencies.unsatisfied([parse_requirement("base")], installed, receipts) == [parse_requirement("base")]
+
+    # a disabled copy that is too old is replaced from the catalog instead
+    plan = dependencies.resolve([_entry("app", "1.0", {"base": ">=2"}), _entry("base", "3.0")],
+                                installed, install_ids=["app"], receipts=receipts)
+    assert [(p.id, p.folder, p.enable) for p in plan] == [("base", "base", False), ("app", "app", False)]
+
+
+def test_dependents(tmp_path: Path):
+    assets = _installed(tmp_path, lib={"id": "Lib"}, app={"dependencies": {"lib": ">=1"}}, other={})
+    assert dependencies.dependents(core.list_installed(assets), "lib") == ["app"]
+
+
+def _zip(name: str, manifest: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr(f"{name}/addon.json", json.dumps(manifest))
+        zf.writestr(f"{name}/blocks/{name}.zig.zon", ".{}")
+    return buf.getvalue()
+
+
+class _Response:
+    def __init__(self, url: str, body: bytes):
+        self.url = url
+        self.body = body
+        self.status_code = 200
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.body)
+
+    def iter_content(self, chunk_size=65536):
+        yield self.body
+
+
+def test_cli_install_from_catalog_with_dependencies(tmp_path: Path, monkeypatch, capsys):
+    assets = _installed(tmp_path)
+    (assets / "cubyz").mkdir()
+    entries = [_entry("app", "1.0", {"lib": ">=1"}), _entry("lib", "1.2")]
+    files = {catalog.CATALOG_URL: json.dumps(entries).encode()}
+    for e in entries:
+        files[catalog.BASE_URL + e["download"]] = _zip(e["id"], e)
+    monkeypatch.setattr(catalog.requests, "get", lambda url, **kwargs: _Response(url, files[url]))
+
+    assert core.cli(["install", "app", "--assets", str(assets)]) == 0
+    out = capsys.readouterr().out
+    assert out.index("Installing: lib 1.2 (required by app)") < out.index("Installing: app 1.0")
+    assert (assets / "lib").is_dir() and (assets / "app").is_dir()
+
+    assert core.cli(["uninstall", "lib", "--assets", str(assets)]) == 0
+    assert "Warning: app depend(s) on lib" in capsys.readouterr().out
+
+    # a local zip pulls its missing dependencies from the catalog first
+    local = tmp_path / "tool.zip"
+    local.write_bytes(_zip("tool", {"dependencies": ["lib"]}))
+    assert core.cli(["install", str(local), "--assets", str(assets)]) == 0
+    assert "Installing: lib 1.2 (required by tool)" in capsys.readouterr().out
+    assert (assets / "lib").is_dir() and (assets / "tool").is_dir()
+
+    # a disabled dependency is enabled rather than downloaded again
+    assert profiles.disable_addon("lib", assets).is_dir()
+    del files[catalog.BASE_URL + "lib.zip"]
+    assert core.cli(["install", "app", "--assets", str(assets), "--overwrite"]) == 0
+    assert "Enabling: lib 1.2 (required by app)" in capsys.readouterr().out
+    assert (assets / "lib").is_dir()
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PySide6.QtCore")
+QtGui = pytest.importorskip("PySide6.QtGui")
+
+from addon_manager.ui.events import AddonEvents  # noqa: E402
+
+
+@pytest.fixture(scope="module", autouse=True)
+def app():
+    # A GUI application, so the thumbnail tests in the same session can create pixmaps
+    return QtCore.QCoreApplication.instance() or QtGui.QGuiApplication([])
+
+
+def _spin(ms: int) -> None:
+    loop = QtCore.QEventLoop()
+    QtCore.QTimer.singleShot(ms, loop.quit)
+    loop.exec()
+
+
+def test_notifications_within_a_frame_are_delivered_once():
+    events = AddonEvents()
+    batches = []
+    events.addonsChanged.connect(batches.append)
+    for name in ["trees", "ores", "trees", "", "lamps", "ores"]:
+        events.notify(name)
+    events.notify("caves", "ores")
+    assert batches == []  # nothing before the frame ends
+    _spin(100)
+    assert batches == [["caves", "lamps", "ores", "trees"]]
+
+    # the next burst is a batch of its own
+    events.notify("ores")
+    _spin(100)
+    assert batches[1:] == [["ores"]]
+
+
+def test_flush_delivers_at_once():
+    events = AddonEvents()
+    batches = []
+    events.addonsChanged.connect(batches.append)
+    events.flush()
+    events.notify("ores")
+    events.flush()
+    assert batches == [["ores"]] and not events.timer.isActive()
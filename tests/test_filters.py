@@ -0,0 +1,95 @@
+from addon_manager import core
+from addon_manager.filters import ArchiveFilter, select_zip_members
+from pathlib import Path
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+REPO = {
+    ".github/workflows/ci.yml": b"on: push",
+    "README.md": b"# ores",
+    "art/ore.psd": b"psd",
+    "addons/ores/.addonignore": b"# sources\n*.xcf\nbuild/\n",
+    "addons/ores/addon.json": b'{"version": "1"}',
+    "addons/ores/blocks/ore.zig.zon": b".{}",
+    "addons/ores/blocks/textures/ore.png": b"png",
+    "addons/ores/blocks/textures/ore.xcf": b"xcf",
+    "addons/ores/build/out.bin": b"bin",
+    "addons/other/addon.json": b"{}",
+}
+
+
+def _files(dest: Path):
+    return sorted(p.relative_to(dest).as_posix() for p in dest.rglob("*") if p.is_file())
+
+
+def _zip(path: Path, members) -> Path:
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return path
+
+
+def _tar(path: Path, members) -> Path:
+    with tarfile.open(path, "w:gz") as tf:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return path
+
+
+@pytest.fixture
+def assets(tmp_path: Path) -> Path:
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    return assets
+
+
+@pytest.mark.parametrize("pack", [_zip, _tar])
+@pytest.mark.parametrize("subdir", ["addons/ores", "repo-main/addons/ores"])
+def test_subdir_install_honors_addonignore(tmp_path: Path, assets: Path, pack, subdir):
+    archive = pack(tmp_path / f"repo-main{'.zip' if pack is _zip else '.tar.gz'}",
+                   {f"repo-main/{name}": data for name, data in REPO.items()})
+    dest = core.install_addon(archive, assets, filters=ArchiveFilter(subdir))
+    assert dest == assets / "ores"
+    assert _files(dest) == ["addon.json", "blocks/ore.zig.zon", "blocks/textures/ore.png"]
+    with pytest.raises(ValueError, match="no folder"):
+        core.install_addon(archive, assets, overwrite=True, filters=ArchiveFilter("addons/missing"))
+    assert (dest / "addon.json").exists()
+
+
+@pytest.mark.parametrize("pack", [_zip, _tar])
+def test_include_and_exclude_patterns(tmp_path: Path, assets: Path, pack):
+    archive = pack(tmp_path / ("repo.zip" if pack is _zip else "repo.tar.gz"), REPO)
+    spec = ArchiveFilter(include=["addons/ores/blocks", "addon.json"], exclude=["*.png", ".github/"])
+    dest = core.install_addon(archive, assets, filters=spec)
+    assert _files(dest) == ["addons/ores/addon.json", "addons/ores/blocks/ore.zig.zon",
+                            "addons/ores/blocks/textures/ore.xcf", "addons/other/addon.json"]
+
+
+def test_filtered_zip_members_are_never_read(tmp_path: Path, assets: Path, monkeypatch):
+    archive = _zip(tmp_path / "ores.zip", {"ores/addon.json": b"{}", "ores/.addonignore": b"art\n",
+                                           "ores/art/huge.psd": b"x" * 1000})
+    opened = []
+    real_open = zipfile.ZipFile.open
+    monkeypatch.setattr(zipfile.ZipFile, "open",
+                        lambda self, name, *a, **k: opened.append(getattr(name, "filename", name))
+                        or real_open(self, name, *a, **k))
+    dest = core.install_addon(archive, assets)
+    assert _files(dest) == ["addon.json"]
+    assert "ores/art/huge.psd" not in opened
+
+    with zipfile.ZipFile(archive) as zf:
+        assert select_zip_members(zf, None, "ores") is not None
+    plain = _zip(tmp_path / "plain.zip", {"plain/addon.json": b"{}"})
+    with zipfile.ZipFile(plain) as zf:
+        assert select_zip_members(zf, ArchiveFilter(), "plain") is None
+
+
+def test_folder_sources_reject_filters(tmp_path: Path, assets: Path):
+    (tmp_path / "ores").mkdir()
+    with pytest.raises(ValueError, match="only apply to archives"):
+        core.install_addon(tmp_path / "ores", assets, filters=ArchiveFilter("blocks"))
@@ -0,0 +1,61 @@
+from addon_manager import core, integrity, profiles
+from pathlib import Path
+import os
+
+
+def _install(tmp_path: Path) -> Path:
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    src = tmp_path / "sample"
+    (src / "blocks").mkdir(parents=True)
+    (src / "blocks" / "a.zig.zon").write_text(".{}")
+    (src / "blocks" / "b.zig.zon").write_text(".{ .x = 1 }")
+    (src / "big.bin").write_bytes(b"x" * (integrity.MMAP_THRESHOLD + 1))
+    core.install_addon(src, assets)
+    return assets
+
+
+def test_install_records_manifest(tmp_path: Path):
+    assets = _install(tmp_path)
+    manifest = integrity.load_manifest(assets, "sample")
+    assert sorted(manifest["files"]) == ["big.bin", "blocks/a.zig.zon", "blocks/b.zig.zon"]
+    report = integrity.verify_addon(assets, "sample")
+    assert report.ok and report.hashed == 0
+    core.uninstall_addon("sample", assets)
+    assert integrity.load_manifest(assets, "sample") is None
+
+
+def test_verify_disabled_addon(tmp_path: Path, capsys):
+    assets = _install(tmp_path)
+    profiles.disable_addon("sample", assets)
+    assert integrity.verify_addon(assets, "sample").ok
+    (core.disabled_dir(assets) / "sample" / "blocks" / "a.zig.zon").unlink()
+    assert integrity.verify_addon(assets, "sample").missing == ["blocks/a.zig.zon"]
+    assert core.cli(["verify", "--assets", str(assets)]) == 1
+    assert "  missing: blocks/a.zig.zon" in capsys.readouterr().out
+
+
+def test_verify_reports_changes(tmp_path: Path):
+    assets = _install(tmp_path)
+    addon = assets / "sample"
+    # same size, restored mtime: only a full verify notices
+    a = addon / "blocks" / "a.zig.zon"
+    st = a.stat()
+    a.write_text(".{!")
+    os.utime(a, ns=(st.st_atime_ns, st.st_mtime_ns))
+    (addon / "blocks" / "b.zig.zon").unlink()
+    (addon / "extra.txt").write_text("hi")
+
+    quick = integrity.verify_addon(assets, "sample")
+    assert quick.modified == [] and quick.missing == ["blocks/b.zig.zon"] and quick.extra == ["extra.txt"]
+    full = integrity.verify_addon(assets, "sample", full=True)
+    assert full.modified == ["blocks/a.zig.zon"]
+    assert full.hashed == 2
+
+
+def test_cli_verify(tmp_path: Path, capsys):
+    assets = _install(tmp_path)
+    assert core.cli(["verify", "--assets", str(assets)]) == 0
+    out = capsys.readouterr().out
+    assert "cubyz\tno manifest" in out
+    assert "sample\tok" in out
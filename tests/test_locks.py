@@ -0,0 +1,83 @@
+from addon_manager import core, locks, profiling
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+import pytest
+
+
+def _assets(tmp_path: Path) -> Path:
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    return assets
+
+
+def _hold(lock, ready: threading.Event, release: threading.Event) -> threading.Thread:
+    def run():
+        with lock:
+            ready.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert ready.wait(5)
+    return thread
+
+
+def test_addon_locks_are_per_addon(tmp_path: Path):
+    assets = _assets(tmp_path)
+    ready, release = threading.Event(), threading.Event()
+    holder = _hold(locks.addon_lock(assets, "ores"), ready, release)
+    try:
+        with pytest.raises(locks.LockTimeout) as e:
+            with locks.addon_lock(assets, "ORES", timeout=0.05):
+                pass
+        assert e.value.holder == str(os.getpid()) and "addon 'ORES'" in str(e.value)
+        with locks.addon_lock(assets, "lamps", timeout=0.05):
+            pass
+        assert [a.name for a in core.list_installed(assets)] == ["cubyz"]  # readers are not blocked
+        with pytest.raises(locks.LockTimeout):
+            with locks.assets_lock(assets, shared=False, timeout=0.05):
+                pass
+    finally:
+        release.set()
+        holder.join()
+    with locks.assets_lock(assets, shared=False, timeout=0.05):
+        with locks.addon_lock(assets, "ores"):  # re-entrant within a thread
+            pass
+
+
+def test_install_waits_for_lock_and_reports_it(tmp_path: Path):
+    assets = _assets(tmp_path)
+    src = tmp_path / "ores"
+    (src / "blocks").mkdir(parents=True)
+    ready, release = threading.Event(), threading.Event()
+    holder = _hold(locks.addon_lock(assets, "ores"), ready, release)
+    threading.Timer(0.2, release.set).start()
+    trace = tmp_path / "trace.jsonl"
+    profiling.enable(str(trace))
+    try:
+        core.install_addon(src, assets)
+    finally:
+        profiling.disable()
+        holder.join()
+    waits = [s for s in map(json.loads, trace.read_text().splitlines()) if s["name"] == "lock.wait"]
+    assert len(waits) == 1 and waits[0]["attrs"]["waited"] >= 0.1
+    assert (assets / "ores" / "blocks").is_dir()
+
+
+def test_lock_timeout_setting(tmp_path: Path, monkeypatch):
+    assets = _assets(tmp_path)
+    assert locks.lock_timeout(assets) == 60
+    monkeypatch.setenv("CUBYZ_ADDON_LOCK_TIMEOUT", "0.01")
+    ready, release = threading.Event(), threading.Event()
+    holder = _hold(locks.addon_lock(assets, "ores"), ready, release)
+    start = time.monotonic()
+    try:
+        assert core.cli(["uninstall", "ores", "--assets", str(assets)]) != 0
+    finally:
+        release.set()
+        holder.join()
+    assert time.monotonic() - start < 2
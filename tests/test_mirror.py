@@ -0,0 +1,120 @@
+from addon_manager import catalog, config, core, mirror
+from pathlib import Path
+import io
+import json
+import zipfile
+
+
+def _zip(name: str) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr(f"{name}/blocks/{name}.zig.zon", ".{}")
+    return buf.getvalue()
+
+
+def _source(root: Path, entries) -> str:
+    (root / "files").mkdir(parents=True, exist_ok=True)
+    (root / "addons.json").write_text(json.dumps(entries))
+    return root.as_uri() + "/"
+
+
+def test_mirror_incremental_file_source(tmp_path: Path):
+    src = tmp_path / "src"
+    entries = [{"id": "ores", "download": "files/ores.zip", "icon": "files/ores.png"},
+               {"id": "lamps", "download": "files/lamps.zip"}]
+    source = _source(src, entries)
+    (src / "files" / "ores.zip").write_bytes(_zip("ores"))
+    (src / "files" / "ores.png").write_bytes(b"png")
+    (src / "files" / "lamps.zip").write_bytes(_zip("lamps"))
+    dest = tmp_path / "mirror"
+
+    first = mirror.mirror_catalog(dest, source)
+    assert first.fetched == ["files/lamps.zip", "files/ores.png", "files/ores.zip"] and not first.failed
+    assert (dest / "files" / "ores.zip").read_bytes() == _zip("ores")
+
+    second = mirror.mirror_catalog(dest, source)
+    assert second.fetched == [] and len(second.unchanged) == 3
+
+    (src / "files" / "lamps.zip").write_bytes(_zip("lamps") + b"\0")
+    (src / "addons.json").write_text(json.dumps(entries[1:]))
+    third = mirror.mirror_catalog(dest, source)
+    assert third.fetched == ["files/lamps.zip"]
+    assert third.removed == ["files/ores.png", "files/ores.zip"]
+    assert not (dest / "files" / "ores.zip").exists()
+
+    # a file that cannot be mirrored keeps its source link, so the catalog never points at a missing file
+    (src / "addons.json").write_text(json.dumps(entries))
+    for name in ("ores.zip", "ores.png"):
+        (src / "files" / name).unlink()
+    fourth = mirror.mirror_catalog(dest, source)
+    assert [rel for rel, _ in fourth.failed] == ["files/ores.png", "files/ores.zip"]
+    mirrored = {e["id"]: e for e in json.loads((dest / "addons.json").read_text())}
+    assert mirrored["ores"]["download"] == source + "files/ores.zip"
+    assert mirrored["lamps"]["download"] == "files/lamps.zip"
+
+
+def test_mirror_http_source_uses_etag_or_size(tmp_path: Path, monkeypatch):
+    bodies = {"https://up/addons.json": json.dumps([
+        {"id": "a", "download": "a.zip"},
+        {"id": "b", "download": "https://cdn.example/x/b.zip"},
+    ]).encode(), "https://up/a.zip": b"aaaa", "https://cdn.example/x/b.zip": b"bb"}
+    gets = []
+
+    class Response:
+        def __init__(self, url, status=200, etag=None):
+            self.url, self.status_code = url, status
+            self.headers = {"content-length": str(len(bodies[url]))}
+            if etag:
+                self.headers["etag"] = etag
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return json.loads(bodies[self.url])
+
+        def iter_content(self, chunk_size=65536):
+            yield bodies[self.url]
+
+    def get(url, headers=None, **kwargs):
+        gets.append(url)
+        if url.endswith("a.zip"):  # only this server supports ETags
+            if (headers or {}).get("If-None-Match") == '"v1"':
+                return Response(url, 304)
+            return Response(url, etag='"v1"')
+        return Response(url)
+
+    monkeypatch.setattr(catalog.requests, "get", get)
+    monkeypatch.setattr(catalog.requests, "head", lambda url, **kwargs: Response(url))
+
+    dest = tmp_path / "mirror"
+    assert len(mirror.mirror_catalog(dest, "https://up").fetched) == 2
+    mirrored = json.loads((dest / "addons.json").read_text())
+    assert [e["download"] for e in mirrored] == ["a.zip", "_external/cdn.example/x/b.zip"]
+
+    gets.clear()
+    result = mirror.mirror_catalog(dest, "https://up/")
+    assert result.fetched == [] and len(result.unchanged) == 2
+    assert gets == ["https://up/addons.json", "https://up/a.zip"]  # b.zip only got a HEAD
+
+
+def test_config_base_url_points_clients_at_mirror(tmp_path: Path, monkeypatch):
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    assert config.base_url(assets) == catalog.BASE_URL
+
+    src = tmp_path / "src"
+    source = _source(src, [{"id": "ores", "name": "Ores", "version": "1", "download": "files/ores.zip"}])
+    (src / "files" / "ores.zip").write_bytes(_zip("ores"))
+    dest = tmp_path / "mirror"
+    assert core.cli(["mirror", str(dest), "--source", source, "--assets", str(assets)]) == 0
+
+    assert core.cli(["config", "base_url", dest.as_uri(), "--assets", str(assets)]) == 0
+    assert config.base_url(assets) == dest.as_uri() + "/"
+    entries = catalog.fetch_catalog(catalog.catalog_url(assets))
+    assert entries[0]["download"] == dest.as_uri() + "/files/ores.zip"
+    assert core.cli(["install", "ores", "--assets", str(assets)]) == 0
+    assert (assets / "ores" / "blocks" / "ores.zig.zon").exists()
+
+    monkeypatch.setenv("CUBYZ_ADDON_BASE_URL", "http://elsewhere")
+    assert config.base_url(assets) == "http://elsewhere/"
@@ -0,0 +1,83 @@
+from addon_manager import core, integrity, optimize
+from pathlib import Path
+import struct
+import zlib
+
+
+def _png(width: int = 16, height: int = 16, level: int = 0, extra: bytes = b"") -> bytes:
+    raw = b"".join(b"\0" + bytes((x * 7 + y) % 256 for x in range(width * 3)) for y in range(height))
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (optimize.PNG_SIGNATURE + optimize._chunk(b"IHDR", ihdr) + extra
+            + optimize._chunk(b"tEXt", b"Comment\0made by hand")
+            + optimize._chunk(b"IDAT", zlib.compress(raw, level))
+            + optimize._chunk(b"IEND", b""))
+
+
+def _pixels(png: bytes) -> bytes:
+    chunks = list(optimize._chunks(png))
+    return zlib.decompress(b"".join(body for ctype, body in chunks if ctype == b"IDAT"))
+
+
+def test_optimize_png_is_lossless():
+    original = _png(extra=optimize._chunk(b"tRNS", b"\0\0\0\0\0\0"))
+    smaller = optimize.optimize_png(original)
+    assert smaller is not None and len(smaller) < len(original)
+    assert _pixels(smaller) == _pixels(original)
+    kinds = [ctype for ctype, _ in optimize._chunks(smaller)]
+    assert kinds == [b"IHDR", b"tRNS", b"IDAT", b"IEND"]
+    assert optimize.optimize_png(smaller) is None
+
+
+def test_animated_png_untouched():
+    assert optimize.optimize_png(_png(extra=optimize._chunk(b"acTL", b"\0" * 8))) is None
+
+
+def test_optimize_addons_with_cache(tmp_path: Path):
+    assets = tmp_path / "assets"
+    tex = assets / "shiny" / "blocks" / "textures"
+    tex.mkdir(parents=True)
+    (tex / "gem.png").write_bytes(_png())
+    (assets / "shiny" / "icon.png").write_bytes(_png())  # not a texture folder
+    [result] = optimize.optimize_addons([assets / "shiny"], assets)
+    assert (result.files, result.optimized) == (1, 1)
+    assert result.saved > 0
+    assert (assets / "shiny" / "icon.png").read_bytes() == _png()
+    [again] = optimize.optimize_addons([assets / "shiny"], assets)
+    assert (again.skipped, again.optimized, again.saved) == (1, 0, 0)
+    # A different level is not answered from the cache
+    [other] = optimize.optimize_addons([assets / "shiny"], assets, level=1)
+    assert (other.skipped, other.files) == (0, 1)
+    [other] = optimize.optimize_addons([assets / "shiny"], assets, level=1)
+    assert other.skipped == 1
+
+
+def test_files_that_cannot_be_replaced_are_left_alone(tmp_path: Path, monkeypatch):
+    assets = tmp_path / "assets"
+    tex = assets / "shiny" / "textures"
+    tex.mkdir(parents=True)
+    for name in ("a.png", "b.png"):
+        (tex / name).write_bytes(_png())
+    real = optimize.os.replace
+
+    def replace(src, dst):
+        if Path(dst).name == "a.png":
+            raise PermissionError("read-only")
+        real(src, dst)
+
+    monkeypatch.setattr(optimize.os, "replace", replace)
+    [result] = optimize.optimize_addons([assets / "shiny"], assets)
+    assert (result.files, result.optimized, result.failed) == (2, 1, 1)
+    assert (tex / "a.png").read_bytes() == _png() and sorted(p.name for p in tex.iterdir()) == ["a.png", "b.png"]
+    monkeypatch.setattr(optimize.os, "replace", real)
+    [again] = optimize.optimize_addons([assets / "shiny"], assets)
+    assert (again.optimized, again.skipped, again.failed) == (1, 1, 0)  # tried again
+
+
+def test_install_with_optimize_textures(tmp_path: Path):
+    src = tmp_path / "shiny"
+    (src / "textures").mkdir(parents=True)
+    (src / "textures" / "a.png").write_bytes(_png())
+    assets = tmp_path / "assets"
+    dest = core.install_addon(src, assets, optimize_textures=True)
+    assert len((dest / "textures" / "a.png").read_bytes()) < len(_png())
+    assert integrity.verify_addon(assets, "shiny", full=True).ok
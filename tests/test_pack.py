@@ -0,0 +1,54 @@
+from addon_manager import core, pack
+from pathlib import Path
+import zipfile
+
+
+def _make_addon(tmp_path: Path) -> Path:
+    addon = tmp_path / "src" / "shiny"
+    (addon / "blocks" / "textures").mkdir(parents=True)
+    (addon / "items").mkdir()
+    (addon / "addon.json").write_text('{"version": "1.0.0"}')
+    (addon / "blocks" / "gem.zig.zon").write_text(".{ .texture = \"gem\" }\n" * 50)
+    (addon / "blocks" / "textures" / "gem.png").write_bytes(b"\x89PNG" + b"\0" * 100)
+    (addon / ".git").mkdir()
+    (addon / ".git" / "HEAD").write_text("ref")
+    return addon
+
+
+def test_pack_roundtrip_and_install(tmp_path: Path):
+    addon = _make_addon(tmp_path)
+    out = pack.pack_addon(addon, tmp_path / "shiny.zip", workers=4)
+    with zipfile.ZipFile(out) as zf:
+        assert zf.testzip() is None
+        infos = {i.filename: i for i in zf.infolist()}
+    assert sorted(infos) == ["shiny/addon.json", "shiny/blocks/gem.zig.zon",
+                             "shiny/blocks/textures/gem.png", "shiny/items/"]
+    assert infos["shiny/blocks/textures/gem.png"].compress_type == zipfile.ZIP_STORED
+    assert infos["shiny/blocks/gem.zig.zon"].compress_type == zipfile.ZIP_DEFLATED
+    assert infos["shiny/addon.json"].date_time == (1980, 1, 1, 0, 0, 0)
+
+    assets = tmp_path / "assets"
+    installed = core.install_addon(out, assets)
+    assert (installed / "blocks" / "textures" / "gem.png").read_bytes() == \
+        (addon / "blocks" / "textures" / "gem.png").read_bytes()
+
+
+def test_pack_is_reproducible(tmp_path: Path):
+    addon = _make_addon(tmp_path)
+    first = pack.pack_addon(addon, tmp_path / "a.zip").read_bytes()
+    (addon / "addon.json").touch()
+    second = pack.pack_addon(addon, tmp_path / "b.zip", workers=1).read_bytes()
+    assert first == second
+
+
+def test_pack_zip64_member_count(tmp_path: Path, monkeypatch):
+    addon = tmp_path / "many"
+    (addon / "blocks").mkdir(parents=True)
+    for i in range(5):
+        (addon / "blocks" / f"{i}.zig.zon").write_text(".{}")
+    # force the Zip64 end records on a small archive
+    monkeypatch.setattr(pack, "_ZIP64_COUNT_LIMIT", 1)
+    out = pack.pack_addon(addon, tmp_path / "many.zip")
+    with zipfile.ZipFile(out) as zf:
+        assert len(zf.namelist()) == 5
+        assert zf.read("many/blocks/3.zig.zon") == b".{}"
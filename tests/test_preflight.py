@@ -0,0 +1,68 @@
+from addon_manager import core, preflight
+from addon_manager.preflight import Limits, PreflightError
+from pathlib import Path
+import json
+import zipfile
+
+import pytest
+
+
+def _assets(tmp_path: Path) -> Path:
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    return assets
+
+
+def _zip(path: Path, members) -> Path:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return path
+
+
+@pytest.mark.parametrize("name", ["../evil.zon", "a/../../evil.zon", "/etc/evil", "C:/evil", "a\\..\\evil"])
+def test_unsafe_names_rejected_before_old_install_is_touched(tmp_path: Path, name):
+    assets = _assets(tmp_path)
+    (assets / "ores").mkdir()
+    (assets / "ores" / "addon.json").write_text(json.dumps({"version": "1"}))
+    archive = _zip(tmp_path / "ores.zip", [("ores/addon.json", "{}"), (name, "x")])
+    with pytest.raises(PreflightError, match="Unsafe archive member"):
+        core.install_addon(archive, assets, overwrite=True)
+    assert json.loads((assets / "ores" / "addon.json").read_text()) == {"version": "1"}
+    assert not (tmp_path / "evil.zon").exists()
+
+
+def test_limits_are_configurable(tmp_path: Path, monkeypatch):
+    assets = _assets(tmp_path)
+    archive = _zip(tmp_path / "bomb.zip", [("bomb/zeros.bin", b"\0" * (4 * preflight.MB))])
+    with pytest.raises(PreflightError, match="zip bomb"):
+        core.install_addon(archive, assets)
+    assert not (assets / "bomb").exists()
+
+    monkeypatch.setenv("CUBYZ_ADDON_MAX_COMPRESSION_RATIO", "0")
+    monkeypatch.setenv("CUBYZ_ADDON_MAX_UNPACKED_MB", "1")
+    with pytest.raises(PreflightError, match="more than 1 MB"):
+        core.install_addon(archive, assets)
+    monkeypatch.setenv("CUBYZ_ADDON_MAX_UNPACKED_MB", "0")
+    core.install_addon(archive, assets)
+    assert (assets / "bomb" / "zeros.bin").stat().st_size == 4 * preflight.MB
+
+
+def test_member_count_and_free_space(tmp_path: Path, monkeypatch):
+    names = ["m/"] + [f"m/{i}.zon" for i in range(100000)]
+    sizes, packed = [0] + [10] * 100000, [0] + [5] * 100000
+    stats = preflight.check_members(names, sizes, packed, Limits())
+    assert stats.files == 100000 and stats.total_size == 1000000 and stats.ratio == 2
+    with pytest.raises(PreflightError, match="more than 10 files"):
+        preflight.check_members(names, sizes, packed, Limits(max_files=10))
+    with pytest.raises(PreflightError, match="control character"):
+        preflight.check_members(names + ["m/a\nb"], sizes + [1], packed + [1], Limits())
+
+    class Usage:
+        free = 100 * preflight.MB
+
+    monkeypatch.setattr(preflight.shutil, "disk_usage", lambda path: Usage)
+    preflight.check_free_space(50 * preflight.MB, [tmp_path / "a" / "b"])
+    with pytest.raises(PreflightError, match="Not enough disk space"):
+        # extracting to a temp folder and copying needs the space twice on one volume
+        preflight.check_free_space(50 * preflight.MB, [tmp_path / "a", tmp_path])
@@ -0,0 +1,105 @@
+from addon_manager import core, profiles
+from addon_manager.profiles import disable_addon, enable_addon, save_profile, use_profile
+from pathlib import Path
+import json
+import zipfile
+
+import pytest
+
+
+def _assets(tmp_path: Path, *names) -> Path:
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    for name in names:
+        (assets / name / "blocks").mkdir(parents=True)
+        (assets / name / "addon.json").write_text(json.dumps({"version": "1.0"}))
+    return assets
+
+
+def _enabled(assets: Path):
+    return sorted(a.name for a in core.list_installed(assets))
+
+
+def test_disable_and_enable_rename_the_folder(tmp_path: Path, capsys):
+    assets = _assets(tmp_path, "ores", "trees")
+    inode = (assets / "ores" / "addon.json").stat().st_ino
+    dest = disable_addon("ores", assets)
+    assert dest == core.disabled_dir(assets) / "ores"
+    assert (dest / "addon.json").stat().st_ino == inode
+    assert _enabled(assets) == ["cubyz", "trees"]
+    states = {a.name: a.enabled for a in core.list_installed(assets, disabled=True)}
+    assert states == {"cubyz": True, "ores": False, "trees": True}
+
+    capsys.readouterr()
+    assert core.cli(["list", "--assets", str(assets)]) == 0
+    lines = {line.split("\t")[0]: line for line in capsys.readouterr().out.splitlines()}
+    assert lines["ores"].endswith("\tdisabled") and not lines["trees"].endswith("\tdisabled")
+
+    assert disable_addon("ores", assets) == dest  # already disabled
+    assert core.cli(["enable", "ores", "--assets", str(assets)]) == 0
+    assert _enabled(assets) == ["cubyz", "ores", "trees"]
+    assert (assets / "ores" / "addon.json").stat().st_ino == inode
+    with pytest.raises(ValueError, match="base game"):
+        disable_addon("cubyz", assets)
+    with pytest.raises(FileNotFoundError):
+        enable_addon("missing", assets)
+
+    disable_addon("trees", assets)
+    core.uninstall_addon("trees", assets)
+    assert not (core.disabled_dir(assets) / "trees").exists()
+
+
+def test_installing_a_disabled_addon(tmp_path: Path):
+    assets = _assets(tmp_path, "ores")
+    disable_addon("ores", assets)
+    archive = tmp_path / "ores.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("ores/addon.json", json.dumps({"version": "2.0"}))
+    with pytest.raises(FileExistsError):
+        core.install_addon(archive, assets)
+    with pytest.raises(FileExistsError):
+        core.install_addon(core.disabled_dir(assets) / "ores", assets)
+
+    # overwriting replaces the disabled copy instead of adding a second one
+    core.install_addon(archive, assets, overwrite=True)
+    states = [(a.name, a.enabled) for a in core.list_installed(assets, disabled=True) if a.name == "ores"]
+    assert states == [("ores", True)] and core.load_manifest(assets / "ores") == {"version": "2.0"}
+    disable_addon("ores", assets)
+    assert enable_addon("ores", assets) == assets / "ores"
+
+
+def test_profiles_switch_all_or_nothing(tmp_path: Path, monkeypatch, capsys):
+    assets = _assets(tmp_path, "ores", "trees", "caves")
+    assert save_profile(assets, "everything") == ["caves", "ores", "trees"]
+    save_profile(assets, "light", ["trees"])
+    assert profiles.current_profile(assets) == "everything"
+
+    assert use_profile(assets, "light") == ([], ["caves", "ores"])
+    assert _enabled(assets) == ["cubyz", "trees"] and profiles.current_profile(assets) == "light"
+
+    real_move = profiles._move
+    moves = []
+
+    def failing_move(src, dest):
+        moves.append(src.name)
+        if len(moves) == 2:
+            raise OSError("disk on fire")
+        real_move(src, dest)
+
+    monkeypatch.setattr(profiles, "_move", failing_move)
+    with pytest.raises(OSError, match="disk on fire"):
+        use_profile(assets, "everything")
+    assert _enabled(assets) == ["cubyz", "trees"]  # the first rename was undone
+    monkeypatch.setattr(profiles, "_move", real_move)
+
+    save_profile(assets, "broken", ["trees", "gone"])
+    assert core.cli(["profile", "use", "broken", "--assets", str(assets)]) == 2
+    assert "gone" in capsys.readouterr().out and _enabled(assets) == ["cubyz", "trees"]
+
+    assert core.cli(["profile", "use", "everything", "--assets", str(assets)]) == 0
+    assert _enabled(assets) == ["caves", "cubyz", "ores", "trees"]
+    capsys.readouterr()
+    assert core.cli(["profile", "list", "--assets", str(assets)]) == 0
+    assert "* everything\t3 addons" in capsys.readouterr().out
+    assert core.cli(["profile", "delete", "broken", "--assets", str(assets)]) == 0
+    assert sorted(profiles.load_profiles(assets)) == ["everything", "light"]
@@ -0,0 +1,49 @@
+from addon_manager import core, profiling
+from pathlib import Path
+import json
+import zipfile
+
+
+def _make_zip(tmp_path: Path) -> Path:
+    zp = tmp_path / "zipped.zip"
+    with zipfile.ZipFile(zp, "w") as zf:
+        zf.writestr("zipped/blocks/a.zig.zon", ".{}")
+        zf.writestr("zipped/addon.json", "{}")
+    return zp
+
+
+def test_spans_written_as_jsonl(tmp_path: Path):
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    out = tmp_path / "profile.jsonl"
+    profiling.enable(out)
+    try:
+        core.install_addon(_make_zip(tmp_path), assets)
+        core.list_installed(assets)
+        core.uninstall_addon("zipped", assets)
+    finally:
+        profiling.disable()
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    by_name = {r["name"]: r for r in records}
+    assert {"install_addon", "zip.scan", "zip.extract", "copytree",
+            "list_installed", "uninstall_addon"} <= set(by_name)
+    assert by_name["zip.scan"]["parent"] == "install_addon"
+    assert by_name["copytree"]["attrs"]["files"] == 2
+    assert by_name["list_installed"]["attrs"]["addons"] == 2
+
+
+def test_cli_profile_chrome_trace(tmp_path: Path):
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    trace = tmp_path / "trace.json"
+    assert core.cli(["--profile", str(trace), "list", "--assets", str(assets)]) == 0
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert events[0]["name"] == "list_installed"
+    assert events[0]["ph"] == "X"
+
+
+def test_disabled_spans_are_noops():
+    assert not profiling.enabled()
+    with profiling.span("nothing") as sp:
+        sp.set(bytes=1)
+        sp.add(files=1)
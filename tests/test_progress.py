@@ -0,0 +1,51 @@
+from addon_manager import core
+from addon_manager.progress import InstallCancelled, Progress, Throttle, describe
+from pathlib import Path
+import zipfile
+import pytest
+
+
+def _make_zip(tmp_path: Path, members: int = 50) -> Path:
+    zp = tmp_path / "packed.zip"
+    with zipfile.ZipFile(zp, "w") as zf:
+        for i in range(members):
+            zf.writestr(f"packed/blocks/b{i}.zig.zon", ".{}")
+    return zp
+
+
+def test_install_reports_progress(tmp_path: Path):
+    assets = tmp_path / "assets"
+    events = []
+    core.install_addon(_make_zip(tmp_path), assets, progress=events.append)
+    phases = [e.phase for e in events]
+    assert phases[0] == "extract" and phases[-1] == "copy"
+    last_extract = [e for e in events if e.phase == "extract"][-1]
+    assert (last_extract.done, last_extract.total, last_extract.unit) == (50, 50, "files")
+    assert events[-1].done == events[-1].total == 50
+    # rate limited: far fewer events than members
+    assert len(events) < 20
+
+
+def test_throttle_keeps_first_and_last():
+    events = []
+    report = Throttle(events.append, interval=60)
+    for i in range(1, 101):
+        report("download", i, 100)
+    assert [e.done for e in events] == [1, 100]
+
+
+def test_cancel_removes_partial_install(tmp_path: Path):
+    assets = tmp_path / "assets"
+
+    def cancel(p):
+        if p.phase == "copy":
+            raise InstallCancelled()
+
+    with pytest.raises(InstallCancelled):
+        core.install_addon(_make_zip(tmp_path), assets, progress=cancel)
+    assert not (assets / "packed").exists()
+
+
+def test_describe():
+    text = describe(Progress("download", 1024 * 1024, 4 * 1024 * 1024), 1024 * 1024, 3)
+    assert text == "download: 1.0 MiB / 4.0 MiB  1.0 MiB/s  ETA 0:03"
@@ -0,0 +1,75 @@
+from addon_manager import catalog, config, core, receipts
+from addon_manager.receipts import ReceiptStore
+from pathlib import Path
+import hashlib
+import io
+import json
+import zipfile
+
+
+def _zip(path: Path, folder: str, manifest=None) -> Path:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        if manifest is not None:
+            zf.writestr(f"{folder}/addon.json", json.dumps(manifest))
+        zf.writestr(f"{folder}/blocks/ore.zig.zon", ".{}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(buf.getvalue())
+    return path
+
+
+def _assets(tmp_path: Path) -> Path:
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    return assets
+
+
+def test_install_records_receipt_and_uninstall_by_id(tmp_path: Path):
+    assets = _assets(tmp_path)
+    archive = _zip(tmp_path / "dl" / "shiny-ores-1.0.zip", "shiny-ores")
+    origin = {"catalog_id": "ores", "source": "public", "url": "https://x/ores.zip", "version": "1.0"}
+    core.install_addon(archive, assets, origin=origin)
+
+    with ReceiptStore(assets) as store:
+        receipt = store.find("ORES")
+        assert receipt.addon == "shiny-ores-1.0" and receipt.version == "1.0" and receipt.source == "public"
+        assert receipt.sha256 == hashlib.sha256(archive.read_bytes()).hexdigest()
+        assert store.files("shiny-ores-1.0") == ["shiny-ores-1.0/blocks/ore.zig.zon"]
+        assert store.owner("shiny-ores-1.0/blocks/ore.zig.zon") == "shiny-ores-1.0"
+
+    # the folder name matches no catalog name and addon.json has no version
+    entries = [{"id": "ores", "version": "1.1", "download": "ores.zip"}]
+    with ReceiptStore(assets) as store:
+        outdated = catalog.find_outdated(core.list_installed(assets), entries, store.all())
+    assert [(o.name, o.installed, o.latest) for o in outdated] == [("shiny-ores-1.0", "1.0", "1.1")]
+    assert catalog.find_outdated(core.list_installed(assets), entries) == []
+
+    core.uninstall_addon("ores", assets)
+    assert not (assets / "shiny-ores-1.0").exists()
+    with ReceiptStore(assets) as store:
+        assert store.find("ores") is None and store.owner("shiny-ores-1.0/blocks/ore.zig.zon") is None
+
+
+def test_reads_without_database(tmp_path: Path):
+    assets = _assets(tmp_path)
+    with ReceiptStore(assets) as store:
+        assert store.find("ores") is None and store.all() == {} and store.files("ores") == []
+    assert not receipts.receipts_path(assets).exists()
+
+
+def test_cli_catalog_install_and_owner(tmp_path: Path, capsys):
+    assets = _assets(tmp_path)
+    mirror = tmp_path / "mirror"
+    _zip(mirror / "files" / "ores.zip", "ores", {"version": "2.0"})
+    (mirror / "addons.json").write_text(json.dumps([{"id": "ores", "version": "2.0", "download": "files/ores.zip"}]))
+    config.set_setting(assets, "base_url", mirror.as_uri())
+    assert core.cli(["install", "ores", "--assets", str(assets)]) == 0
+
+    with ReceiptStore(assets) as store:
+        receipt = store.get("ores")
+    assert receipt.catalog_id == "ores" and receipt.url == (mirror / "files" / "ores.zip").as_uri()
+    capsys.readouterr()
+    assert core.cli(["owner", str(assets / "ores" / "blocks" / "ore.zig.zon"), "--assets", str(assets)]) == 0
+    assert capsys.readouterr().out.split("\t")[:4] == ["ores/blocks/ore.zig.zon", "ores", "ores", "2.0"]
+    assert core.cli(["owner", "ores/addon.json", "--assets", str(assets)]) == 0
+    assert core.cli(["owner", "cubyz/x.zon", "--assets", str(assets)]) == 1
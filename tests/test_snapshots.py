@@ -0,0 +1,111 @@
+from addon_manager import core, snapshots
+from addon_manager.profiles import disable_addon, enable_addon
+from addon_manager.integrity import verify_addon
+from addon_manager.receipts import ReceiptStore
+from addon_manager.snapshots import create_snapshot, list_snapshots, restore_snapshot
+from pathlib import Path
+import json
+import zipfile
+
+import pytest
+
+
+def _zip(path: Path, version: str, extra: str = "") -> Path:
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("ores/addon.json", json.dumps({"version": version}))
+        zf.writestr("ores/blocks/ore.zig.zon", f".{{.version = \"{version}\"}}")
+        if extra:
+            zf.writestr(f"ores/blocks/{extra}.zig.zon", ".{}")
+    return path
+
+
+def _assets(tmp_path: Path) -> Path:
+    assets = tmp_path / "assets"
+    (assets / "cubyz" / "blocks").mkdir(parents=True)
+    (assets / "cubyz" / "blocks" / "stone.zig.zon").write_text(".{}")
+    return assets
+
+
+def test_snapshot_survives_upgrades_and_restores(tmp_path: Path):
+    assets = _assets(tmp_path)
+    core.install_addon(_zip(tmp_path / "ores.zip", "1.0"), assets, origin={"catalog_id": "ores"})
+    snap = create_snapshot(assets, "before")
+    ore = assets / "ores" / "blocks" / "ore.zig.zon"
+    linked = snap.path / "assets" / "ores" / "blocks" / "ore.zig.zon"
+    assert snap.files == 3 and snap.copied == 0
+    assert linked.stat().st_ino == ore.stat().st_ino
+
+    # upgrade in place and add another addon: the snapshot keeps the old files
+    core.install_addon(_zip(tmp_path / "ores.zip", "2.0", "gem"), assets, overwrite=True)
+    (assets / "trees").mkdir()
+    assert linked.read_text() == '.{.version = "1.0"}' and ore.read_text() == '.{.version = "2.0"}'
+
+    assert restore_snapshot(assets, "before").name == "before"
+    assert sorted(p.name for p in assets.iterdir()) == ["cubyz", "ores"]
+    assert ore.read_text() == '.{.version = "1.0"}' and not (assets / "ores" / "blocks" / "gem.zig.zon").exists()
+    with ReceiptStore(assets) as store:
+        assert store.get("ores").version == "1.0" and store.files("ores") == ["ores/addon.json",
+                                                                              "ores/blocks/ore.zig.zon"]
+    assert verify_addon(assets, "ores", full=True).ok
+    assert linked.exists() and [s.name for s in list_snapshots(assets)] == ["before"]
+    assert not [p for p in snapshots.snapshots_dir(assets).iterdir() if p.name.startswith(".")]
+
+    # snapshots restore repeatedly, in any order
+    core.uninstall_addon("ores", assets)
+    create_snapshot(assets, "empty")
+    core.install_addon(_zip(tmp_path / "ores.zip", "3.0"), assets)
+    restore_snapshot(assets, "empty")
+    assert not (assets / "ores").exists()
+    restore_snapshot(assets, "before")
+    assert (assets / "ores" / "addon.json").exists()
+
+
+def test_restore_brings_back_disabled_addons(tmp_path: Path, monkeypatch):
+    assets = _assets(tmp_path)
+    core.install_addon(_zip(tmp_path / "ores.zip", "1.0"), assets, origin={"catalog_id": "ores"})
+    (assets / "lamps").mkdir()
+    disable_addon("lamps", assets)
+    create_snapshot(assets, "mixed")
+
+    # enabled since, and disabled since
+    enable_addon("lamps", assets)
+    disable_addon("ores", assets)
+    restore_snapshot(assets, "mixed")
+    states = {a.name: a.enabled for a in core.list_installed(assets, disabled=True)}
+    assert states == {"cubyz": True, "lamps": False, "ores": True}
+    enable_addon("lamps", assets)
+    disable_addon("ores", assets)
+
+    # a restore failing half way leaves everything as it was
+    real_rename = snapshots.os.rename
+
+    def failing_rename(src, dest):
+        if Path(dest).name.startswith("manifests"):
+            raise OSError("disk on fire")
+        real_rename(src, dest)
+
+    monkeypatch.setattr(snapshots.os, "rename", failing_rename)
+    with pytest.raises(OSError, match="disk on fire"):
+        restore_snapshot(assets, "mixed")
+    monkeypatch.undo()
+    states = {a.name: a.enabled for a in core.list_installed(assets, disabled=True)}
+    assert states == {"cubyz": True, "lamps": True, "ores": False}
+    assert (core.disabled_dir(assets) / "ores" / "addon.json").exists()
+    with ReceiptStore(assets) as store:
+        assert store.get("ores").catalog_id == "ores"
+    assert not [p for p in snapshots.snapshots_dir(assets).iterdir() if p.name.startswith(".")]
+
+
+def test_snapshot_cli(tmp_path: Path, capsys):
+    assets = _assets(tmp_path)
+    assert core.cli(["snapshot", "create", "one", "--assets", str(assets)]) == 0
+    assert core.cli(["snapshot", "create", "one", "--assets", str(assets)]) == 2
+    assert core.cli(["snapshot", "create", "../evil", "--assets", str(assets)]) == 2
+    capsys.readouterr()
+    assert core.cli(["snapshot", "list", "--assets", str(assets)]) == 0
+    assert capsys.readouterr().out.startswith("one\t")
+    assert core.cli(["snapshot", "restore", "missing", "--assets", str(assets)]) == 2
+    assert core.cli(["snapshot", "delete", "one", "--assets", str(assets)]) == 0
+    assert list_snapshots(assets) == []
+    with pytest.raises(FileNotFoundError):
+        restore_snapshot(assets, "one")
@@ -0,0 +1,121 @@
+from addon_manager import catalog, config, core, sources
+from addon_manager.sources import CatalogSource
+from pathlib import Path
+import json
+import threading
+import time
+
+import requests
+
+
+def _publish(folder: Path, entries) -> str:
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / "addons.json").write_text(json.dumps(entries))
+    return folder.as_uri() + "/"
+
+
+def test_merge_precedence_is_deterministic():
+    low, high, tie = CatalogSource("low", "a"), CatalogSource("high", "b", priority=5), CatalogSource("tie", "c")
+    merged = sources.merge_catalogs([
+        (low, [{"id": "ores", "version": "1"}, {"id": "lamps", "version": "1"}]),
+        (high, [{"id": "ORES", "version": "2"}]),
+        (tie, [{"id": "lamps", "version": "3"}, {"id": "trees", "version": "1"}]),
+    ])
+    assert [(e["id"], e["version"], e["source"]) for e in merged] == [
+        ("ORES", "2", "high"), ("lamps", "1", "low"), ("trees", "1", "tie")]
+
+
+def test_failed_source_falls_back_to_cache(tmp_path: Path, monkeypatch):
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    local = _publish(tmp_path / "internal", [{"id": "tools", "download": "tools.zip"}])
+    config.set_setting(assets, "sources", [
+        {"name": "internal", "url": local, "priority": 1},
+        {"name": "public", "url": "https://public.example/addons.json", "timeout": 2},
+    ])
+    timeouts = {}
+
+    class Response:
+        status_code = 200
+        headers = {"etag": '"p1"'}
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return [{"id": "ores", "download": "files/ores.zip"}]
+
+    def get(url, timeout=None, headers=None, **kwargs):
+        timeouts[url] = timeout
+        return Response()
+
+    monkeypatch.setattr(catalog.requests, "get", get)
+    merged = sources.load_catalog(assets)
+    assert sorted(e["id"] for e in merged.entries) == ["ores", "tools"]
+    assert timeouts == {"https://public.example/addons.json": 2.0}
+    ores = next(e for e in merged.entries if e["id"] == "ores")
+    assert ores["download"] == "https://public.example/files/ores.zip" and ores["source"] == "public"
+
+    def down(url, **kwargs):
+        raise requests.exceptions.ConnectTimeout("timed out")
+
+    monkeypatch.setattr(catalog.requests, "get", down)
+    merged = sources.load_catalog(assets)
+    assert sorted(e["id"] for e in merged.entries) == ["ores", "tools"]
+    [failed] = merged.errors
+    assert failed.name == "public" and failed.cached
+
+    # without a cached copy the other sources still come through
+    monkeypatch.setattr(sources, "CACHE_DIR", "other_cache")
+    merged = sources.load_catalog(assets)
+    assert [e["id"] for e in merged.entries] == ["tools"] and not merged.errors[0].cached
+
+
+def test_timeout_is_a_deadline_for_the_whole_fetch(tmp_path: Path, monkeypatch):
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    local = _publish(tmp_path / "internal", [{"id": "tools"}])
+    slow = [CatalogSource("internal", local + "addons.json"),
+            CatalogSource("slow", "https://slow.example/addons.json", timeout=0.2)]
+    release = threading.Event()
+
+    def get(url, **kwargs):
+        release.wait(5)  # e.g. a server trickling its response byte by byte
+        raise requests.exceptions.ConnectionError("too late")
+
+    monkeypatch.setattr(catalog.requests, "get", get)
+    start = time.monotonic()
+    merged = sources.load_catalog(assets, slow)
+    release.set()
+    assert time.monotonic() - start < 2
+    assert [e["id"] for e in merged.entries] == ["tools"]
+    [failed] = merged.errors
+    assert failed.name == "slow" and "0.2s" in failed.error
+
+
+def test_malformed_sources_setting(tmp_path: Path, monkeypatch, capsys):
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    monkeypatch.setenv("CUBYZ_ADDON_SOURCES", "[{not json")
+    monkeypatch.setenv("CUBYZ_ADDON_NO_DAEMON", "1")
+    assert core.cli(["sources", "--assets", str(assets)]) == 2
+    assert "Invalid sources setting" in capsys.readouterr().out
+    assert core.cli(["outdated", "--assets", str(assets)]) == 2
+    monkeypatch.setenv("CUBYZ_ADDON_SOURCES", '[{"name": "no url"}]')
+    assert core.cli(["sources", "--assets", str(assets)]) == 2
+
+
+def test_cli_sources_and_default_source(tmp_path: Path, capsys):
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    mirror = _publish(tmp_path / "mirror", [{"id": "ores"}, {"id": "lamps"}])
+    config.set_setting(assets, "base_url", mirror)
+    assert [s.url for s in sources.catalog_sources(assets)] == [mirror + "addons.json"]
+
+    assert core.cli(["config", "sources", json.dumps([mirror, "file:///nonexistent/"]),
+                     "--assets", str(assets)]) == 0
+    capsys.readouterr()
+    assert core.cli(["sources", "--assets", str(assets)]) == 1
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].split("\t")[2:4] == ["2 addons", "ok"]
+    assert "failed" in out[1] and out[-1] == "2 addons after merging"
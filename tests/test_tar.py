@@ -0,0 +1,120 @@
+from addon_manager import core
+from addon_manager.preflight import PreflightError
+from addon_manager.receipts import ReceiptStore
+from pathlib import Path
+import hashlib
+import io
+import tarfile
+
+import pytest
+import requests
+
+
+def _tar(members, mode="w:gz") -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as tf:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            if data is None:
+                info.type = tarfile.DIRTYPE
+                tf.addfile(info)
+            elif isinstance(data, tuple):  # (link type, target)
+                info.type, info.linkname = data
+                tf.addfile(info)
+            else:
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def _assets(tmp_path: Path) -> Path:
+    assets = tmp_path / "assets"
+    (assets / "cubyz").mkdir(parents=True)
+    return assets
+
+
+@pytest.mark.parametrize("suffix,mode", [(".tar.gz", "w:gz"), (".tgz", "w:gz"), (".tar", "w")])
+def test_install_tar_files(tmp_path: Path, suffix, mode):
+    assets = _assets(tmp_path)
+    archive = tmp_path / f"ores{suffix}"
+    archive.write_bytes(_tar([("ores-main", None), ("ores-main/addon.json", b'{"version": "1"}'),
+                              ("ores-main/blocks/ore.zig.zon", b".{}"),
+                              ("ores-main/link", (tarfile.SYMTYPE, "/etc/passwd"))], mode))
+    dest = core.install_addon(archive, assets)
+    assert dest == assets / "ores"
+    assert sorted(p.relative_to(dest).as_posix() for p in dest.rglob("*")) == [
+        "addon.json", "blocks", "blocks/ore.zig.zon"]
+    assert not any((core.state_dir(assets) / core.STAGING_DIR).iterdir())
+
+
+def test_tar_rejects_unsafe_member_and_keeps_old_copy(tmp_path: Path):
+    assets = _assets(tmp_path)
+    (assets / "ores").mkdir()
+    (assets / "ores" / "addon.json").write_text("{}")
+    archive = tmp_path / "ores.tar.gz"
+    archive.write_bytes(_tar([("addon.json", b'{"version": "2"}'), ("../../evil", b"x")]))
+    with pytest.raises(PreflightError):
+        core.install_addon(archive, assets, overwrite=True)
+    assert (assets / "ores" / "addon.json").read_text() == "{}"
+    assert not (tmp_path / "evil").exists()
+
+
+class _Stream(io.BytesIO):
+    """An HTTP body that must be consumed while extraction is already writing files."""
+
+    def __init__(self, data: bytes, watch: Path):
+        super().__init__(data)
+        self.watch = watch
+        self.files_seen_early = 0
+        self.decode_content = False
+
+    def read(self, size=-1):
+        if self.tell() < len(self.getvalue()) // 2 and self.watch.exists():
+            self.files_seen_early = max(self.files_seen_early, sum(1 for p in self.watch.rglob("*") if p.is_file()))
+        return super().read(min(size, 4096) if size and size > 0 else 4096)
+
+
+class _Response:
+    def __init__(self, url, raw, status_code=200, content_type="application/x-gzip"):
+        self.url, self.raw, self.status_code = url, raw, status_code
+        self.headers = {"content-type": content_type, "content-length": str(len(raw.getvalue()))}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def test_github_tarball_streams_without_temp_archive(tmp_path: Path, monkeypatch):
+    assets = _assets(tmp_path)
+    payload = [("tools-master/", None)] + [
+        (f"tools-master/blocks/b{i}.zig.zon", bytes(range(256)) * 64) for i in range(40)]
+    body = _tar(payload)
+    raw = _Stream(body, core.state_dir(assets) / core.STAGING_DIR)
+    gets = []
+
+    def get(url, stream=False, **kwargs):
+        gets.append(url)
+        if url.endswith("/main.tar.gz"):
+            return _Response(url, io.BytesIO(b""), status_code=404)
+        return _Response(url, raw)
+
+    monkeypatch.setattr(requests, "get", get)
+    monkeypatch.setattr(core, "_download", lambda *a, **k: pytest.fail("archive written to disk"))
+    dest = core.install_addon_from_url("https://github.com/someone/tools", assets)
+
+    assert gets == ["https://github.com/someone/tools/archive/refs/heads/main.tar.gz",
+                    "https://github.com/someone/tools/archive/refs/heads/master.tar.gz"]
+    assert dest == assets / "tools" and len(list((dest / "blocks").iterdir())) == 40
+    assert raw.files_seen_early > 0  # members were written while the body was still arriving
+    with ReceiptStore(assets) as store:
+        receipt = store.get("tools")
+    assert receipt.url == "https://github.com/someone/tools" and receipt.sha256 == hashlib.sha256(body).hexdigest()
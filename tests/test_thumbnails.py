@@ -0,0 +1,154 @@
+from pathlib import Path
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PySide6.QtCore")
+QtGui = pytest.importorskip("PySide6.QtGui")
+
+from addon_manager.ui import thumbnails  # noqa: E402
+
+URL = "https://addons.example/icons/ores.png"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def app():
+    return QtGui.QGuiApplication.instance() or QtGui.QGuiApplication([])
+
+
+def _png() -> bytes:
+    image = QtGui.QImage(16, 16, QtGui.QImage.Format.Format_RGB32)
+    image.fill(0xff0000)
+    buf = QtCore.QBuffer()
+    buf.open(QtCore.QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buf, "PNG")
+    return bytes(buf.data())
+
+
+class _Recorder:
+    """Stands in for the loader's signals, so a job can run on the test thread."""
+
+    def __init__(self):
+        self.events = []
+        self.finished = self._Signal(self.events, "finished")
+        self.failed = self._Signal(self.events, "failed")
+
+    class _Signal:
+        def __init__(self, events, name):
+            self.events, self.name = events, name
+
+        def emit(self, url, *args):
+            self.events.append(self.name)
+
+
+class _Response:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code, self.content, self.headers = status_code, content, headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise thumbnails.requests.exceptions.HTTPError(str(self.status_code))
+
+
+def _serve(monkeypatch, *responses):
+    gets = []
+    queue = list(responses)
+
+    class Session:
+        def get(self, url, headers=None, timeout=None):
+            gets.append(dict(headers or {}))
+            return queue.pop(0)
+
+    monkeypatch.setattr(thumbnails, "_http", lambda: Session())
+    return gets
+
+
+def _run(tmp_path: Path, url=URL, disk_bytes=thumbnails.DISK_BYTES):
+    signals = _Recorder()
+    thumbnails._FetchJob(url, tmp_path, signals, disk_bytes).run()
+    return signals.events
+
+
+def test_disk_cache_and_revalidation(tmp_path: Path, monkeypatch):
+    headers = {"ETag": '"v1"', "Last-Modified": "Mon, 05 Oct 2026 10:00:00 GMT"}
+    gets = _serve(monkeypatch, _Response(200, _png(), headers), _Response(304))
+    assert _run(tmp_path) == ["finished"] and gets == [{}]
+
+    # fresh on disk: shown without asking the server
+    assert _run(tmp_path) == ["finished"] and len(gets) == 1
+
+    # stale: shown from disk at once, then revalidated with the validators it was stored with
+    [meta_path] = tmp_path.glob("*.json")
+    meta = json.loads(meta_path.read_text())
+    meta_path.write_text(json.dumps(dict(meta, fetched=0)))
+    assert _run(tmp_path) == ["finished"]
+    assert gets[1] == {"If-None-Match": '"v1"', "If-Modified-Since": headers["Last-Modified"]}
+    assert json.loads(meta_path.read_text())["fetched"] > 0
+
+
+def test_damaged_cache_entry_is_fetched_again(tmp_path: Path, monkeypatch):
+    gets = _serve(monkeypatch, _Response(200, _png()), _Response(404))
+    assert _run(tmp_path) == ["finished"]
+    [meta_path] = tmp_path.glob("*.json")
+    meta_path.write_text("[]")  # valid JSON, but not an object
+    assert _run(tmp_path) == ["failed"] and gets == [{}, {}]
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path: Path, monkeypatch):
+    png = _png()
+    urls = [f"https://addons.example/icons/{i}.png" for i in range(4)]
+    gets = _serve(monkeypatch, *[_Response(200, png) for _ in range(5)])
+    limit = 3 * len(png)
+    for i, url in enumerate(urls[:3]):
+        assert _run(tmp_path, url, limit) == ["finished"]
+        os.utime(next(p for p in tmp_path.glob("*.img") if p.stat().st_mtime > 1000), (i + 1000, i + 1000))
+    assert _run(tmp_path, urls[0], limit) == ["finished"] and len(gets) == 3  # read from disk: now the newest
+
+    assert _run(tmp_path, urls[3], limit) == ["finished"]
+    assert len(list(tmp_path.glob("*.img"))) == 3 and len(list(tmp_path.glob("*.json"))) == 3
+    assert _run(tmp_path, urls[0], limit) == ["finished"] and len(gets) == 4  # kept
+    assert _run(tmp_path, urls[1], limit) == ["finished"] and len(gets) == 5  # evicted, fetched again
+
+
+def test_changed_image_reaches_cards_already_showing_it(tmp_path: Path):
+    loader = thumbnails.ThumbnailLoader(tmp_path)
+    loader.pool.start = lambda job: None
+    shown, updates = [], []
+    loader.updated.connect(lambda url, pixmap: updates.append(url))
+    loader.request(URL, shown.append)
+    image = QtGui.QImage.fromData(_png())
+    loader._on_finished(URL, image)  # from disk
+    loader._on_finished(URL, image)  # the server had a newer one
+    assert len(shown) == 1 and updates == [URL]
+
+
+def test_loader_shares_downloads_evicts_and_remembers_failures(tmp_path: Path, monkeypatch):
+    loader = thumbnails.ThumbnailLoader(tmp_path, memory_entries=2)
+    started = []
+    monkeypatch.setattr(loader.pool, "start", started.append)
+    got = []
+    loader.request(URL, got.append)
+    loader.request(URL, got.append)
+    assert len(started) == 1  # one download for both cards
+
+    image = QtGui.QImage.fromData(_png())
+    loader._on_finished(URL, image)
+    assert len(got) == 2 and got[0] is got[1]
+    loader.request(URL, got.append)
+    assert len(got) == 3 and len(started) == 1  # from memory
+
+    loader._on_finished("https://addons.example/b.png", image)
+    loader._on_finished("https://addons.example/c.png", image)
+    assert list(loader.pixmaps) == ["https://addons.example/b.png", "https://addons.example/c.png"]
+
+    broken = "https://addons.example/broken.png"
+    loader.request(broken, got.append)
+    loader._on_failed(broken)
+    loader.request(broken, got.append)
+    assert len(started) == 2  # not downloaded again on the next repaint
+    now = thumbnails.time.monotonic()
+    monkeypatch.setattr(thumbnails.time, "monotonic", lambda: now + thumbnails.RETRY_FAILED_AFTER)
+    loader.request(broken, got.append)
+    assert len(started) == 3
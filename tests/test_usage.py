@@ -0,0 +1,48 @@
+from addon_manager import core, usage
+from pathlib import Path
+
+
+def _tree(root: Path) -> None:
+    (root / "a" / "blocks" / "deep").mkdir(parents=True)
+    (root / "a" / "addon.json").write_bytes(b"x" * 10)
+    (root / "a" / "blocks" / "one.zig.zon").write_bytes(b"x" * 100)
+    (root / "a" / "blocks" / "deep" / "two.zig.zon").write_bytes(b"x" * 1000)
+    (root / "b").mkdir()
+
+
+def test_addon_usage_and_cache(tmp_path: Path):
+    assets = tmp_path / "assets"
+    _tree(assets)
+    result = usage.addon_usage([assets / "a", assets / "b"], assets)
+    assert result == {assets / "a": (1110, 3), assets / "b": (0, 0)}
+
+    # unchanged directories are answered from the cache
+    cache = usage.UsageCache(core.state_dir(assets) / usage.CACHE_FILE)
+    assert str(assets / "a" / "blocks" / "deep") in cache.entries
+
+    (assets / "a" / "blocks" / "deep" / "three.zig.zon").write_bytes(b"x" * 5)
+    (assets / "a" / "blocks" / "one.zig.zon").unlink()
+    assert usage.addon_usage([assets / "a"], assets) == {assets / "a": (1015, 3)}
+
+
+def test_cli_list_sizes_and_du(tmp_path: Path, capsys):
+    assets = tmp_path / "assets"
+    _tree(assets)
+    assert core.cli(["list", "--sizes", "--assets", str(assets)]) == 0
+    out = capsys.readouterr().out
+    assert "a\tunknown\t1.1 KiB\t3 files" in out
+    assert core.cli(["du", "--top", "1", "--assets", str(assets)]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2
+    assert lines[0].endswith("\ta") and lines[1].endswith("\ttotal")
+
+
+def test_sizes_of_enabled_and_disabled_addons_with_one_name(tmp_path: Path, capsys):
+    assets = tmp_path / "assets"
+    _tree(assets)
+    off = core.disabled_dir(assets) / "a"
+    off.mkdir(parents=True)
+    (off / "addon.json").write_bytes(b"x" * 5)
+    assert core.cli(["list", "--sizes", "--assets", str(assets)]) == 0
+    out = capsys.readouterr().out
+    assert "a\tunknown\t1.1 KiB\t3 files" in out and "a\tunknown\t5 B\t1 files" in out
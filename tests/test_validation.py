@@ -0,0 +1,79 @@
+from addon_manager import core, validation, zon
+from pathlib import Path
+import pytest
+
+
+def test_zon_loads():
+    data = zon.loads('''// comment
+.{
+    .id = "cubyz:stone",
+    .texture = "stone",
+    .drops = .{ .{ .items = .{ .auto }, .chance = 0.5 } },
+    .hardness = 1_000,
+    .@"odd name" = 0x10,
+}''')
+    assert data == {"id": "cubyz:stone", "texture": "stone",
+                    "drops": [{"items": ["auto"], "chance": 0.5}],
+                    "hardness": 1000, "odd name": 16}
+    with pytest.raises(ValueError):
+        zon.loads('.{ .id = "unterminated }')
+
+
+def _make_assets(tmp_path: Path) -> Path:
+    assets = tmp_path / "assets"
+    (assets / "cubyz" / "blocks" / "textures").mkdir(parents=True)
+    (assets / "cubyz" / "blocks" / "textures" / "stone.png").write_bytes(b"png")
+    addon = assets / "myaddon"
+    (addon / "blocks").mkdir(parents=True)
+    (addon / "blocks" / "good.zig.zon").write_text('.{ .texture = "cubyz:stone" }')
+    (addon / "blocks" / "missing.zig.zon").write_text('.{ .texture_top = "nothere" }')
+    (addon / "blocks" / "broken.json").write_text('{"id": ')
+    return assets
+
+
+def test_deep_validate_reports_problems(tmp_path: Path):
+    assets = _make_assets(tmp_path)
+    [report] = validation.deep_validate([assets / "myaddon"], assets)
+    messages = sorted((str(i.path.name), i.message) for i in report.issues)
+    assert report.files == 3
+    assert [name for name, _ in messages] == ["broken.json", "missing.zig.zon"]
+    assert "nothere" in messages[1][1]
+
+
+def test_unparseable_values_are_reported_per_file(tmp_path: Path):
+    huge = tmp_path / "huge.zig.zon"
+    huge.write_text('.{ .name = "\\u{ffffffffffffffffffff}" }')
+    deep = tmp_path / "deep.json"
+    deep.write_text("[" * 100000 + "]" * 100000)
+    for path in (huge, deep):
+        record = validation.parse_data_file(str(path))
+        assert record["error"] and record["textures"] == []
+
+
+def test_deep_validate_uses_cache(tmp_path: Path):
+    assets = _make_assets(tmp_path)
+    addon = assets / "myaddon"
+    first = validation.deep_validate([addon], assets)[0]
+    assert first.cached == 0
+    second = validation.deep_validate([addon], assets)[0]
+    assert second.cached == 3
+    assert len(second.issues) == len(first.issues)
+    # a changed file is parsed again
+    (addon / "blocks" / "broken.json").write_text('{"id": "fixed"}')
+    third = validation.deep_validate([addon], assets)[0]
+    assert third.cached == 2
+    assert len(third.issues) == 1
+
+
+def test_deep_validate_parallel(tmp_path: Path, monkeypatch):
+    assets = _make_assets(tmp_path)
+    monkeypatch.setattr(validation, "PARALLEL_THRESHOLD", 1)
+    [report] = validation.deep_validate([assets / "myaddon"], assets, workers=2, use_cache=False)
+    assert len(report.issues) == 2
+
+
+def test_cli_validate_deep(tmp_path: Path, capsys):
+    assets = _make_assets(tmp_path)
+    assert core.cli(["validate", "--deep", "--assets", str(assets), "myaddon"]) == 1
+    out = capsys.readouterr().out
+    assert "myaddon\t2 problem(s)" in out
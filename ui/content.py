@@ -105,7 +105,7 @@ strong {
 </div>
 <ol>
     <li>Click <strong>Install from File...</strong></li>
-    <li>Select a <code>.zip</code> file or addon folder</li>
+    <li>Select a <code>.zip</code>, <code>.tar.gz</code> or <code>.tar</code> file or addon folder</li>
     <li>The addon will be extracted to your assets folder</li>
     <li>If an addon already exists, uninstall it first or use the CLI with <code>--overwrite</code></li>
 </ol>
@@ -0,0 +1,42 @@
+"""
+Change notifications for installed addons, coalesced per frame
+"""
+
+from PySide6 import QtCore
+
+# Notifications arriving within one frame (~60 Hz) are delivered together
+FRAME_MS = 16
+
+
+class AddonEvents(QtCore.QObject):
+    """Central place to report which addons changed on disk
+
+    Installs, uninstalls, enabling and disabling, and the filesystem watcher
+    all call `notify` with the addon folder names they touched. The names
+    are collected and delivered as one `addonsChanged` signal per frame, so
+    an operation reported from several places, or a burst of them, costs a
+    single update of just the affected rows and cards.
+    """
+
+    addonsChanged = QtCore.Signal(list)  # sorted folder names
+
+    def __init__(self, parent=None, interval_ms=FRAME_MS):
+        super().__init__(parent)
+        self.pending = set()
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def notify(self, *names):
+        """Report changed addons; delivered with everything else reported this frame"""
+        self.pending.update(str(name) for name in names if name)
+        if self.pending and not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        """Deliver pending notifications now"""
+        self.timer.stop()
+        if self.pending:
+            names, self.pending = sorted(self.pending), set()
+            self.addonsChanged.emit(names)
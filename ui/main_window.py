@@ -8,11 +8,23 @@ import requests
 from pathlib import Path
 from PySide6 import QtWidgets, QtCore, QtGui
 
-from ..core import find_assets_root, list_installed, install_addon, install_addon_from_url, uninstall_addon
-from .widgets import BrowserAddonCard, AddonListItem
+from ..catalog import diff_entries, entry_key
+from ..asset_index import format_conflict
+from ..dependencies import dependents
+from ..sources import load_catalog
+from ..core import (AddonInfo, disabled_dir, find_assets_root, list_installed, install_addon,
+                    install_addon_from_url, load_manifest, state_dir, uninstall_addon)
+from ..profiles import disable_addon, enable_addon
+from ..progress import InstallCancelled
+from ..receipts import ReceiptStore
+from ..usage import addon_usage
+from .widgets import BrowserAddonCard, AddonListItem, InstallProgressDialog
 from .styles import MAIN_STYLESHEET
 from .content import INFO_HTML
 from .icon import get_app_icon
+from .thumbnails import ThumbnailLoader
+from .watcher import AssetsWatcher
+from .events import AddonEvents
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -48,13 +60,34 @@ class MainWindow(QtWidgets.QMainWindow):
         tabs.setObjectName("mainTabs")
         main_layout.addWidget(tabs)
 
+        # Thumbnails for browser cards, loaded only for cards in view
+        self.thumbnails = ThumbnailLoader(state_dir(self.assets) / 'thumbnails', self)
+        self.thumbnails.updated.connect(self.update_thumbnail)
+        self.thumbnail_timer = QtCore.QTimer(self)
+        self.thumbnail_timer.setSingleShot(True)
+        self.thumbnail_timer.setInterval(50)
+        self.thumbnail_timer.timeout.connect(self.load_visible_thumbnails)
+
         # Create tabs
         self._create_addons_tab(tabs)
         self._create_browser_tab(tabs)
         self._create_info_tab(tabs)
+        tabs.currentChanged.connect(self.schedule_thumbnails)
 
-        # Store browser cards for status updates
+        # Browser cards in catalog order and by entry key, kept across refreshes
         self.browser_cards = []
+        self.browser_card_by_key = {}
+        self.catalog_entries = []
+
+        # Installed list rows by addon name. Changes made here and ones the
+        # watcher sees on disk are reported to `events`, which delivers them
+        # once per frame so only the affected rows and cards are updated
+        self.addon_items = {}
+        self.events = AddonEvents(self)
+        self.events.addonsChanged.connect(self.apply_addon_changes)
+        self.watcher = AssetsWatcher(self.assets, self)
+        self.watcher.addonsChanged.connect(
+            lambda added, removed, changed: self.events.notify(*added, *removed, *changed))
 
         # Initialize list and browser
         self.refresh()
@@ -165,6 +198,11 @@ class MainWindow(QtWidgets.QMainWindow):
         
         self.browser_scroll.setWidget(self.browser_container)
         browser_layout.addWidget(self.browser_scroll)
+        
+        # Load thumbnails for cards that scroll into view
+        scrollbar = self.browser_scroll.verticalScrollBar()
+        scrollbar.valueChanged.connect(self.schedule_thumbnails)
+        scrollbar.rangeChanged.connect(self.schedule_thumbnails)
 
         tabs.addTab(browser_tab, 'Browse')
 
@@ -186,44 +224,132 @@ class MainWindow(QtWidgets.QMainWindow):
     def refresh(self):
         """Refresh the list of installed addons"""
         self.listw.clear()
-        for a in list_installed(self.assets):
-            # Check if this is the default Cubyz folder
-            is_default = a.name.lower() == 'cubyz'
-            
-            # Create custom widget for this addon
-            addon_widget = AddonListItem(a, is_default)
-            
-            # Create list item and set the custom widget
-            list_item = QtWidgets.QListWidgetItem()
-            list_item.setSizeHint(addon_widget.sizeHint())
-            self.listw.addItem(list_item)
-            self.listw.setItemWidget(list_item, addon_widget)
+        self.addon_items = {}
+        # What is installed, by folder name; kept current by `apply_addon_changes`
+        self.installed_addons = {}
+        for a in list_installed(self.assets, sizes=True, disabled=True):
+            self.installed_addons[a.name] = a
+            self._add_addon_row(a)
+        self.watcher.sync()
+
+    def _add_addon_row(self, addon_info):
+        """Append a row for an installed addon"""
+        # Check if this is the default Cubyz folder
+        is_default = addon_info.name.lower() == 'cubyz'
+        
+        # Create custom widget for this addon
+        addon_widget = AddonListItem(addon_info, is_default)
+        addon_widget.enabledToggled.connect(self.set_addon_enabled)
+        
+        # Create list item and set the custom widget
+        list_item = QtWidgets.QListWidgetItem()
+        list_item.setSizeHint(addon_widget.sizeHint())
+        self.listw.addItem(list_item)
+        self.listw.setItemWidget(list_item, addon_widget)
+        self.addon_items[addon_info.name] = list_item
+
+    def apply_addon_changes(self, names):
+        """Update only the rows and browser cards of the addons in `names`"""
+        # Disabled addons (e.g. disabled from the CLI) keep their row
+        present = [name for name in names if self._addon_path(name)[0].exists()]
+        for name in names:
+            if name in present:
+                continue
+            self.installed_addons.pop(name, None)
+            item = self.addon_items.pop(name, None)
+            if item is not None:
+                self.listw.takeItem(self.listw.row(item))
+        sizes = addon_usage([self._addon_path(name)[0] for name in present], self.assets)
+        for name in present:
+            info = self.installed_addons[name] = self._read_addon(name, sizes)
+            item = self.addon_items.get(name)
+            if item is None:
+                self._add_addon_row(info)
+            else:
+                self.listw.itemWidget(item).set_addon_info(info)
+        # Changes made from here need not be reported again by the watcher
+        self.watcher.acknowledge(names)
+        self.refresh_browser_status(names)
+
+    def _addon_path(self, name):
+        """Folder of an addon and whether it is enabled"""
+        path = self.assets / name
+        if not path.exists() and (disabled_dir(self.assets) / name).exists():
+            return disabled_dir(self.assets) / name, False
+        return path, True
+
+    def _read_addon(self, name, sizes):
+        """Build AddonInfo for one addon, re-reading only its addon.json"""
+        path, enabled = self._addon_path(name)
+        size, file_count = sizes.get(path, (None, None))
+        return AddonInfo(name, path, load_manifest(path), size, file_count, enabled)
+
+    def set_addon_enabled(self, name, enable):
+        """Enable or disable an addon from its row, moving its folder in or out of assets/"""
+        try:
+            if enable:
+                enable_addon(name, self.assets)
+            else:
+                disable_addon(name, self.assets)
+        except Exception as e:
+            action = 'enable' if enable else 'disable'
+            QtWidgets.QMessageBox.critical(self, 'Error', f'Failed to {action} addon "{name}":\n\n{str(e)}')
+        self.events.notify(name)
 
     def install_dialog(self):
         """Show file dialog to install addon from local file"""
-        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, 'Select addon folder or zip', str(Path.cwd()))
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, 'Select addon folder or archive', str(Path.cwd()))
         if path:
             try:
                 p = Path(path)
-                if p.is_dir():
-                    install_addon(p, self.assets, overwrite=False)
-                else:
-                    install_addon(p, self.assets)
+                progress = InstallProgressDialog("Installing addon...", self)
+                progress.show()
+                try:
+                    if p.is_dir():
+                        dest = install_addon(p, self.assets, overwrite=False, progress=progress,
+                                             on_conflicts=self.confirm_conflicts)
+                    else:
+                        dest = install_addon(p, self.assets, progress=progress, on_conflicts=self.confirm_conflicts)
+                finally:
+                    progress.close()
+                self.events.notify(dest.name)
                 QtWidgets.QMessageBox.information(self, 'Installed', 'Addon installed successfully')
-                self.refresh()
-                self.refresh_browser_status()
+            except InstallCancelled:
+                pass
             except Exception as e:
                 QtWidgets.QMessageBox.critical(self, 'Error', str(e))
 
+    def confirm_conflicts(self, name, conflicts):
+        """Ask before installing addon `name`, which defines blocks, items or biomes other addons define
+
+        Called by core before anything is written; declining cancels the install.
+        """
+        lines = [format_conflict(key, owners + [name]) for key, owners in conflicts.items()]
+        more = f'\n... and {len(lines) - 10} more' if len(lines) > 10 else ''
+        answer = QtWidgets.QMessageBox.question(
+            self, 'Conflicting addon',
+            f'"{name}" defines things other addons define too; only one of them will be used:\n'
+            + '\n'.join(lines[:10]) + more + '\n\nInstall anyway?',
+            QtWidgets.QMessageBox.StandardButton.Yes | QtWidgets.QMessageBox.StandardButton.No)
+        if answer != QtWidgets.QMessageBox.StandardButton.Yes:
+            raise InstallCancelled("Installation cancelled")
+
     def install_from_url(self):
         """Show dialog to install addon from URL"""
-        url, ok = QtWidgets.QInputDialog.getText(self, 'Install from URL', 'Enter GitHub or zip URL:')
+        url, ok = QtWidgets.QInputDialog.getText(self, 'Install from URL', 'Enter GitHub, zip or tar.gz URL:')
         if ok and url:
             try:
-                install_addon_from_url(url, self.assets)
+                progress = InstallProgressDialog("Downloading addon...", self)
+                progress.show()
+                try:
+                    dest = install_addon_from_url(url, self.assets, progress=progress,
+                                                  on_conflicts=self.confirm_conflicts)
+                finally:
+                    progress.close()
+                self.events.notify(dest.name)
                 QtWidgets.QMessageBox.information(self, 'Installed', 'Addon installed successfully')
-                self.refresh()
-                self.refresh_browser_status()
+            except InstallCancelled:
+                pass
             except Exception as e:
                 QtWidgets.QMessageBox.critical(self, 'Error', str(e))
 
@@ -259,10 +385,12 @@ class MainWindow(QtWidgets.QMainWindow):
             
         # Proceed with uninstall confirmation
         name = addon_widget.addon_info.name
+        users = dependents(list_installed(self.assets), name)
+        warning = f'\n\nWarning: {", ".join(users)} depend(s) on this addon.' if users else ''
         reply = QtWidgets.QMessageBox.question(
             self, 
             'Confirm Removal', 
-            f'Are you sure you want to remove the addon "{name}"?\n\nThis action cannot be undone.',
+            f'Are you sure you want to remove the addon "{name}"?{warning}\n\nThis action cannot be undone.',
             QtWidgets.QMessageBox.StandardButton.Yes | QtWidgets.QMessageBox.StandardButton.No,
             QtWidgets.QMessageBox.StandardButton.No
         )
@@ -270,28 +398,26 @@ class MainWindow(QtWidgets.QMainWindow):
         if reply == QtWidgets.QMessageBox.StandardButton.Yes:
             try:
                 uninstall_addon(name, self.assets)
+                self.events.notify(name)
                 QtWidgets.QMessageBox.information(self, 'Removed', f'Addon "{name}" has been successfully removed.')
-                self.refresh()
-                self.refresh_browser_status()
             except Exception as e:
                 QtWidgets.QMessageBox.critical(self, 'Error', f'Failed to remove addon "{name}":\n\n{str(e)}')
 
     def refresh_browser(self):
         """Fetch and display addons from the online repository"""
-        # Clear existing content
+        # Clear messages from the last refresh; the cards stay until the new catalog is compared
         for i in reversed(range(self.browser_layout_inner.count())):
             child = self.browser_layout_inner.itemAt(i).widget()
-            if child:
+            if child is None:
+                self.browser_layout_inner.takeAt(i)  # the trailing stretch
+            elif not isinstance(child, BrowserAddonCard):
                 child.setParent(None)
         
-        # Clear browser cards list
-        self.browser_cards = []
-        
         # Show loading message
         self.loading_label = QtWidgets.QLabel("Loading addons...")
         self.loading_label.setObjectName("loadingLabel")
         self.loading_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        self.browser_layout_inner.addWidget(self.loading_label)
+        self.browser_layout_inner.insertWidget(0, self.loading_label)
         
         # Disable refresh button during loading
         self.btn_refresh_browser.setEnabled(False)
@@ -301,13 +427,21 @@ class MainWindow(QtWidgets.QMainWindow):
         QtWidgets.QApplication.processEvents()
         
         try:
-            # Fetch addon data directly (simplified approach)
-            url = "https://addons.ashframe.net/addons.json"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            addons_data = response.json()
-            self.display_addons(addons_data)
+            # All configured sources, fetched concurrently; failed ones fall back to their cache
+            catalog = load_catalog(self.assets)
+            problems = "\n".join(
+                f"{s.name}: {s.error}" + (" (showing cached copy)" if s.cached else "")
+                for s in catalog.errors
+            )
+            if problems and not catalog.entries:
+                self.display_error(problems)
+                return
+            self.display_addons(catalog.entries)
+            if problems:
+                warning_label = QtWidgets.QLabel(f"Some catalog sources are unavailable:\n{problems}")
+                warning_label.setObjectName("errorLabel")
+                warning_label.setWordWrap(True)
+                self.browser_layout_inner.insertWidget(0, warning_label)
             
         except requests.exceptions.RequestException as e:
             self.display_error(f"Network error: {str(e)}")
@@ -326,6 +460,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if hasattr(self, 'loading_label'):
             self.loading_label.setParent(None)
         
+        self.update_cards(addons_data)
         if not addons_data:
             error_label = QtWidgets.QLabel("No addons found.")
             error_label.setObjectName("errorLabel")
@@ -333,20 +468,45 @@ class MainWindow(QtWidgets.QMainWindow):
             self.browser_layout_inner.addWidget(error_label)
             return
         
-        # Add addon cards
-        for addon_data in addons_data:
-            addon_card = BrowserAddonCard(addon_data, self)
-            self.browser_cards.append(addon_card)
-            self.browser_layout_inner.addWidget(addon_card)
-        
         # Add stretch to push cards to top
         self.browser_layout_inner.addStretch()
+        self.schedule_thumbnails()
+    
+    def update_cards(self, addons_data):
+        """Bring the browser cards in line with `addons_data`, touching only entries that differ
+        
+        Cards are matched to entries by id: unchanged entries keep their card
+        as it is, changed ones are updated in place and only new or removed
+        entries create or delete a card.
+        """
+        added, removed, changed = diff_entries(self.catalog_entries, addons_data)
+        self.catalog_entries = addons_data
+        for key in removed:
+            card = self.browser_card_by_key.pop(key)
+            self.browser_layout_inner.removeWidget(card)
+            card.deleteLater()
+        if added or changed:
+            by_key = {entry_key(entry): entry for entry in addons_data}
+            installed = list_installed(self.assets, disabled=True)
+            with ReceiptStore(self.assets) as receipts:
+                for key in changed:
+                    self.browser_card_by_key[key].set_addon_data(by_key[key], installed, receipts)
+                for key in added:
+                    self.browser_card_by_key[key] = BrowserAddonCard(by_key[key], self, installed, receipts)
+        
+        # Keep the cards in catalog order, moving only those out of place
+        self.browser_cards = [self.browser_card_by_key[entry_key(entry)] for entry in addons_data]
+        for i, card in enumerate(self.browser_cards):
+            if self.browser_layout_inner.indexOf(card) != i:
+                self.browser_layout_inner.removeWidget(card)
+                self.browser_layout_inner.insertWidget(i, card)
     
     def display_error(self, error_message):
         """Display error message in browser"""
         # Remove loading label
         if hasattr(self, 'loading_label'):
             self.loading_label.setParent(None)
+        self.update_cards([])
         
         error_label = QtWidgets.QLabel(f"Failed to load addons:\n{error_message}")
         error_label.setObjectName("errorLabel")
@@ -354,10 +514,41 @@ class MainWindow(QtWidgets.QMainWindow):
         error_label.setWordWrap(True)
         self.browser_layout_inner.addWidget(error_label)
     
-    def refresh_browser_status(self):
-        """Refresh the install status of all browser cards"""
+    def schedule_thumbnails(self, *args):
+        """Check for newly visible cards once scrolling settles"""
+        self.thumbnail_timer.start()
+    
+    def load_visible_thumbnails(self):
+        """Request thumbnails only for browser cards currently in view"""
+        if not self.browser_scroll.isVisible():
+            return
+        viewport = self.browser_scroll.viewport()
+        for card in self.browser_cards:
+            rect = QtCore.QRect(card.mapTo(viewport, QtCore.QPoint(0, 0)), card.size())
+            if rect.intersects(viewport.rect()):
+                card.load_thumbnail()
+    
+    def update_thumbnail(self, url, pixmap):
+        """Show a thumbnail that changed on the server on every card already showing it"""
         for card in self.browser_cards:
-            card.update_install_status()
+            if card.thumbnail_requested and card.thumbnail_url == url:
+                card.set_thumbnail(pixmap, url)
+    
+    def refresh_browser_status(self, names=None):
+        """Refresh the install status of the browser cards, or only those `names` may affect
+
+        Uses the installed addons as last read by `refresh` and `apply_addon_changes`,
+        so the assets folder is not listed again.
+        """
+        cards = self.browser_cards
+        if names is not None and not names:
+            return
+        installed = list(self.installed_addons.values())
+        with ReceiptStore(self.assets) as receipts:
+            if names is not None:
+                cards = [card for card in cards if card.concerns(names, receipts)]
+            for card in cards:
+                card.update_install_status(installed, receipts)
 
 
 def run_gui():
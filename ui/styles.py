@@ -143,6 +143,11 @@ QMainWindow {
     color: #ffffff;
 }
 
+#addonSize {
+    font-size: 11px;
+    color: #9d9d9d;
+}
+
 #statusLabel {
     font-size: 11px;
     color: #cccccc;
@@ -215,6 +220,18 @@ QMainWindow {
     background-color: #34ce57;
 }
 
+#updateButton {
+    background-color: #0e639c;
+    color: #ffffff;
+    border: 1px solid #1177bb;
+    font-size: 12px;
+    font-weight: 600;
+}
+
+#updateButton:hover {
+    background-color: #1177bb;
+}
+
 #installedButton {
     background-color: #6c757d;
     color: #ffffff;
@@ -0,0 +1,246 @@
+"""
+Asynchronous thumbnail loading for browser addon cards
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import requests
+from PySide6 import QtCore, QtGui
+
+from ..catalog import file_path
+
+THUMBNAIL_SIZE = 48
+MEMORY_ENTRIES = 256
+# The disk cache is trimmed to this size, least recently used images first
+DISK_BYTES = 32 * 1024 * 1024
+MAX_THREADS = 6
+# Disk entries younger than this are used without asking the server again
+REVALIDATE_AFTER = 3600
+REQUEST_TIMEOUT = 10
+# A URL that failed to load is not tried again for this long
+RETRY_FAILED_AFTER = 300
+
+_session = threading.local()
+_evict_lock = threading.Lock()
+
+
+def _http():
+    """One requests session per worker thread (sessions are not thread-safe)"""
+    if not hasattr(_session, 'value'):
+        _session.value = requests.Session()
+    return _session.value
+
+
+def _decode(data):
+    """Decode and scale image bytes to a thumbnail QImage (safe off the GUI thread)"""
+    image = QtGui.QImage.fromData(data)
+    if image.isNull():
+        return None
+    return image.scaled(
+        THUMBNAIL_SIZE, THUMBNAIL_SIZE,
+        QtCore.Qt.AspectRatioMode.KeepAspectRatio,
+        QtCore.Qt.TransformationMode.SmoothTransformation,
+    )
+
+
+def _evict(cache_dir, max_bytes):
+    """Delete the least recently used cached images until the cache fits in `max_bytes`
+
+    Reading or revalidating an image touches its mtime, so mtime is the
+    last access time.
+    """
+    with _evict_lock:
+        entries = []
+        try:
+            with os.scandir(cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith('.img'):
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((st.st_mtime, st.st_size, Path(entry.path)))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= max_bytes:
+                break
+            for stale in (path, path.with_suffix('.json')):
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+            total -= size
+
+
+class _Signals(QtCore.QObject):
+    finished = QtCore.Signal(str, QtGui.QImage)
+    failed = QtCore.Signal(str)
+
+
+class _FetchJob(QtCore.QRunnable):
+    """Loads one thumbnail: disk cache first, then the network (with revalidation)"""
+
+    def __init__(self, url, cache_dir, signals, disk_bytes=DISK_BYTES):
+        super().__init__()
+        self.url = url
+        self.signals = signals
+        self.cache_dir = cache_dir
+        self.disk_bytes = disk_bytes
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        self.data_path = cache_dir / f"{key}.img"
+        self.meta_path = cache_dir / f"{key}.json"
+
+    def run(self):
+        if self.url.startswith('file:'):
+            # Local mirror: nothing to cache
+            try:
+                image = _decode(file_path(self.url).read_bytes())
+            except OSError:
+                image = None
+            if image is None:
+                self.signals.failed.emit(self.url)
+            else:
+                self.signals.finished.emit(self.url, image)
+            return
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding='utf-8'))
+            data = self.data_path.read_bytes()
+        except (OSError, ValueError):
+            meta, data = None, None
+        if not isinstance(meta, dict):
+            meta, data = None, None  # damaged cache entry: fetch again
+
+        shown = False
+        if data is not None:
+            image = _decode(data)
+            if image is not None:
+                self.signals.finished.emit(self.url, image)
+                shown = True
+                self._touch()
+            if shown and time.time() - meta.get('fetched', 0) < REVALIDATE_AFTER:
+                return
+
+        headers = {}
+        if meta and data is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        try:
+            response = _http().get(self.url, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 304 and data is not None:
+                meta['fetched'] = time.time()
+                self._write_meta(meta)
+                return
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            if not shown:
+                self.signals.failed.emit(self.url)
+            return
+
+        image = _decode(response.content)
+        if image is None:
+            if not shown:
+                self.signals.failed.emit(self.url)
+            return
+        try:
+            self.data_path.parent.mkdir(parents=True, exist_ok=True)
+            self.data_path.write_bytes(response.content)
+            self._write_meta({
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched': time.time(),
+            })
+        except OSError:
+            pass
+        else:
+            _evict(self.cache_dir, self.disk_bytes)
+        self.signals.finished.emit(self.url, image)
+
+    def _touch(self):
+        """Mark the cached image as just used, for eviction"""
+        try:
+            os.utime(self.data_path)
+        except OSError:
+            pass
+
+    def _write_meta(self, meta):
+        try:
+            self.meta_path.write_text(json.dumps(meta), encoding='utf-8')
+        except OSError:
+            pass
+
+
+class ThumbnailLoader(QtCore.QObject):
+    """Fetches thumbnails on a thread pool and keeps recent ones in a memory LRU
+
+    `request(url, callback)` calls `callback(pixmap)` on the GUI thread, right
+    away when the pixmap is in memory, otherwise once it has been loaded.
+    Concurrent requests for the same URL share one download. A URL that
+    failed is not requested again for `RETRY_FAILED_AFTER` seconds, so cards
+    with a broken thumbnail do not download it on every repaint. The disk
+    cache is an LRU as well, limited to `disk_bytes`. When revalidation
+    finds that a cached image changed on the server, the new one is
+    delivered through `updated`.
+    """
+
+    updated = QtCore.Signal(str, QtGui.QPixmap)  # url, new pixmap
+
+    def __init__(self, cache_dir, parent=None, memory_entries=MEMORY_ENTRIES, disk_bytes=DISK_BYTES):
+        super().__init__(parent)
+        self.cache_dir = Path(cache_dir)
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self.pixmaps = OrderedDict()
+        self.waiting = {}
+        self.failed = {}  # url -> when it failed
+
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(MAX_THREADS)
+
+        self.signals = _Signals()
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+
+    def request(self, url, callback):
+        pixmap = self.pixmaps.get(url)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(url)
+            callback(pixmap)
+            return
+        if url in self.waiting:
+            self.waiting[url].append(callback)
+            return
+        failed_at = self.failed.get(url)
+        if failed_at is not None:
+            if time.monotonic() - failed_at < RETRY_FAILED_AFTER:
+                return
+            del self.failed[url]
+        self.waiting[url] = [callback]
+        self.pool.start(_FetchJob(url, self.cache_dir, self.signals, self.disk_bytes))
+
+    def _on_finished(self, url, image):
+        pixmap = QtGui.QPixmap.fromImage(image)
+        self.pixmaps[url] = pixmap
+        self.pixmaps.move_to_end(url)
+        while len(self.pixmaps) > self.memory_entries:
+            self.pixmaps.popitem(last=False)
+        waiters = self.waiting.pop(url, None)
+        if waiters is None:
+            # A revalidation found a newer image than the one already shown
+            self.updated.emit(url, pixmap)
+            return
+        for callback in waiters:
+            callback(pixmap)
+
+    def _on_failed(self, url):
+        self.waiting.pop(url, None)
+        self.failed[url] = time.monotonic()
@@ -0,0 +1,85 @@
+"""
+Filesystem watcher that keeps the installed addon list in sync with assets/
+"""
+
+from pathlib import Path
+from PySide6 import QtCore
+
+from ..core import addon_signatures, diff_signatures
+
+
+class AssetsWatcher(QtCore.QObject):
+    """Watches the assets root and reports which addons were added, removed or changed
+
+    Bursts of filesystem events (an extraction, a folder copied in by hand)
+    are debounced into a single rescan. A rescan only stats each addon's
+    addon.json, so the list can re-read just the affected manifests.
+    """
+
+    addonsChanged = QtCore.Signal(list, list, list)  # added, removed, changed
+
+    def __init__(self, assets_root, parent=None, debounce_ms=300):
+        super().__init__(parent)
+        self.assets_root = Path(assets_root)
+        self.signatures = addon_signatures(self.assets_root)
+
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._schedule)
+        self.watcher.fileChanged.connect(self._schedule)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.rescan)
+
+        self._update_watched()
+
+    def _watch_targets(self):
+        """Paths to watch: the root, every addon folder and every addon.json"""
+        if not self.assets_root.exists():
+            return set()
+        targets = {str(self.assets_root)}
+        for name, signature in self.signatures.items():
+            addon = self.assets_root / name
+            targets.add(str(addon))
+            if signature is not None:
+                targets.add(str(addon / 'addon.json'))
+        return targets
+
+    def _update_watched(self):
+        wanted = self._watch_targets()
+        current = set(self.watcher.directories()) | set(self.watcher.files())
+        stale = current - wanted
+        new = wanted - current
+        if stale:
+            self.watcher.removePaths(list(stale))
+        if new:
+            self.watcher.addPaths(list(new))
+
+    def _schedule(self, _path=None):
+        # Restart the debounce timer on every event
+        self.timer.start()
+
+    def sync(self):
+        """Take a fresh snapshot without reporting changes (after a full refresh)"""
+        self.signatures = addon_signatures(self.assets_root)
+        self._update_watched()
+
+    def acknowledge(self, names):
+        """Take in the current state of just `names`, so changes already handled are not reported"""
+        new = addon_signatures(self.assets_root)
+        for name in names:
+            if name in new:
+                self.signatures[name] = new[name]
+            else:
+                self.signatures.pop(name, None)
+        self._update_watched()
+
+    def rescan(self):
+        """Compare the assets root with the last snapshot and emit the differences"""
+        new = addon_signatures(self.assets_root)
+        added, removed, changed = diff_signatures(self.signatures, new)
+        self.signatures = new
+        self._update_watched()
+        if added or removed or changed:
+            self.addonsChanged.emit(added, removed, changed)
@@ -7,15 +7,54 @@ import requests
 from pathlib import Path
 from PySide6 import QtWidgets, QtCore, QtGui
 from ..core import list_installed, install_addon_from_url
+from urllib.parse import urljoin
+from ..catalog import BASE_URL, download_url, entry_names, entry_origin, install_entry, is_newer
+from ..dependencies import install_plan, resolve
+from ..progress import InstallCancelled, RateMeter, describe, format_bytes
+from ..receipts import ReceiptStore
+
+
+class InstallProgressDialog(QtWidgets.QProgressDialog):
+    """Determinate progress dialog usable directly as a core progress callback"""
+
+    PHASE_LABELS = {
+        'download': 'Downloading',
+        'extract': 'Extracting',
+        'copy': 'Copying files',
+    }
+
+    def __init__(self, title, parent=None):
+        super().__init__(title, "Cancel", 0, 1000, parent)
+        self.setWindowModality(QtCore.Qt.WindowModality.WindowModal)
+        self.setMinimumDuration(0)
+        self.setAutoClose(False)
+        self.setAutoReset(False)
+        self.meter = RateMeter()
+
+    def __call__(self, progress):
+        """Receive a (rate-limited) progress event from core"""
+        if self.wasCanceled():
+            raise InstallCancelled("Installation cancelled")
+        fraction = progress.fraction
+        if fraction is None:
+            # Unknown total: show a busy indicator for this phase
+            self.setRange(0, 0)
+        else:
+            self.setRange(0, 1000)
+            self.setValue(int(fraction * 1000))
+        label = self.PHASE_LABELS.get(progress.phase, progress.phase.capitalize())
+        self.setLabelText(f"{label}...\n{describe(progress, *self.meter.update(progress))}")
+        QtWidgets.QApplication.processEvents()
 
 
 class BrowserAddonCard(QtWidgets.QWidget):
     """Widget representing an addon card in the browser"""
     
-    def __init__(self, addon_data, parent_window):
+    def __init__(self, addon_data, parent_window, installed_addons=None, receipts=None):
         super().__init__()
-        self.addon_data = addon_data
+        self.addon_data = None
         self.parent_window = parent_window
+        self.installed_addon = None
         
         self.setObjectName("addonCard")
         self.setFixedHeight(120)
@@ -24,39 +63,39 @@ class BrowserAddonCard(QtWidgets.QWidget):
         layout.setContentsMargins(12, 8, 12, 8)
         layout.setSpacing(12)
         
-        # Icon placeholder (could be enhanced to load actual images)
-        icon_label = QtWidgets.QLabel("📦")
-        icon_label.setObjectName("addonIcon")
-        icon_label.setFixedSize(48, 48)
-        icon_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(icon_label)
+        # Icon placeholder, replaced by the catalog thumbnail once the card is visible
+        self.icon_label = QtWidgets.QLabel("📦")
+        self.icon_label.setObjectName("addonIcon")
+        self.icon_label.setFixedSize(48, 48)
+        self.icon_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.icon_label)
+        self.thumbnail_url = None
+        self.thumbnail_requested = False
         
         # Addon info
         info_layout = QtWidgets.QVBoxLayout()
         info_layout.setSpacing(4)
         
         # Name and version
-        name_label = QtWidgets.QLabel(f"{addon_data['name']} ({addon_data['version']})")
-        name_label.setObjectName("browserAddonName")
-        info_layout.addWidget(name_label)
+        self.name_label = QtWidgets.QLabel()
+        self.name_label.setObjectName("browserAddonName")
+        info_layout.addWidget(self.name_label)
         
         # Author
-        author_label = QtWidgets.QLabel(f"by {addon_data['author']}")
-        author_label.setObjectName("browserAddonAuthor")
-        info_layout.addWidget(author_label)
+        self.author_label = QtWidgets.QLabel()
+        self.author_label.setObjectName("browserAddonAuthor")
+        info_layout.addWidget(self.author_label)
         
         # Description
-        desc_label = QtWidgets.QLabel(addon_data['description'])
-        desc_label.setObjectName("browserAddonDesc")
-        desc_label.setWordWrap(True)
-        info_layout.addWidget(desc_label)
-        
-        # Tags
-        if addon_data.get('tags'):
-            tags_text = " • ".join(addon_data['tags'])
-            tags_label = QtWidgets.QLabel(f"Tags: {tags_text}")
-            tags_label.setObjectName("browserAddonTags")
-            info_layout.addWidget(tags_label)
+        self.desc_label = QtWidgets.QLabel()
+        self.desc_label.setObjectName("browserAddonDesc")
+        self.desc_label.setWordWrap(True)
+        info_layout.addWidget(self.desc_label)
+        
+        # Tags, hidden for entries without any
+        self.tags_label = QtWidgets.QLabel()
+        self.tags_label.setObjectName("browserAddonTags")
+        info_layout.addWidget(self.tags_label)
         
         layout.addLayout(info_layout)
         layout.addStretch()
@@ -68,30 +107,83 @@ class BrowserAddonCard(QtWidgets.QWidget):
         self.install_btn.clicked.connect(self.install_addon)
         layout.addWidget(self.install_btn)
         
+        self.set_addon_data(addon_data, installed_addons, receipts)
+    
+    def set_addon_data(self, addon_data, installed_addons=None, receipts=None):
+        """Show catalog entry `addon_data`, updating the card in place when the entry changed"""
+        self.addon_data = addon_data
+        self.name_label.setText(f"{addon_data['name']} ({addon_data['version']})")
+        self.author_label.setText(f"by {addon_data['author']}")
+        self.desc_label.setText(addon_data['description'])
+        self.tags_label.setText(f"Tags: {' • '.join(addon_data['tags'])}" if addon_data.get('tags') else "")
+        self.tags_label.setVisible(bool(addon_data.get('tags')))
+        
+        icon = addon_data.get('icon') or addon_data.get('thumbnail')
+        thumbnail_url = urljoin(BASE_URL, icon) if icon else None
+        if thumbnail_url != self.thumbnail_url:
+            self.thumbnail_url = thumbnail_url
+            self.thumbnail_requested = False
+            self.icon_label.setText("📦")
+        
         # Check if already installed
-        self.update_install_status()
+        self.update_install_status(installed_addons, receipts)
+    
+    def load_thumbnail(self):
+        """Request the thumbnail once (called when the card scrolls into view)"""
+        if self.thumbnail_url and not self.thumbnail_requested:
+            self.thumbnail_requested = True
+            url = self.thumbnail_url
+            self.parent_window.thumbnails.request(url, lambda pixmap: self.set_thumbnail(pixmap, url))
     
-    def update_install_status(self):
-        """Update the install button status based on whether addon is installed"""
-        # Check if this addon is already installed - fix case sensitivity issue
-        installed_addons = list_installed(self.parent_window.assets)
-        addon_id = self.addon_data['id'].lower()
-        
-        # Check multiple possible name variations
-        possible_names = [
-            addon_id,
-            self.addon_data['name'].lower().replace(' ', '_'),
-            self.addon_data['name'].lower().replace(' ', ''),
-            self.addon_data['download'].split('/')[-1].replace('.zip', '').lower()
-        ]
-        
-        is_installed = any(
-            addon.name.lower() in possible_names or 
-            any(name in addon.name.lower() for name in possible_names)
-            for addon in installed_addons
-        )
-        
-        if is_installed:
+    def set_thumbnail(self, pixmap, url=None):
+        """Show a loaded thumbnail instead of the placeholder"""
+        try:
+            if url is None or url == self.thumbnail_url:
+                self.icon_label.setPixmap(pixmap)
+        except RuntimeError:
+            # The card was destroyed (e.g. by a browser refresh) while loading
+            pass
+    
+    def update_install_status(self, installed_addons=None, receipts=None):
+        """Update the install button status based on whether addon is installed
+        
+        Pass `installed_addons` and an open `ReceiptStore` as `receipts` when
+        updating many cards so the assets folder is only listed once.
+        """
+        if installed_addons is None:
+            installed_addons = list_installed(self.parent_window.assets, disabled=True)
+        if receipts is None:
+            with ReceiptStore(self.parent_window.assets) as store:
+                return self.update_install_status(installed_addons, store)
+        
+        # Addons installed from the catalog have a receipt naming their folder
+        receipt = receipts.find(str(self.addon_data['id'])) if self.addon_data.get('id') else None
+        by_folder = {addon.name.lower(): addon for addon in installed_addons}
+        self.installed_addon = by_folder.get(receipt.addon.lower()) if receipt else None
+        if self.installed_addon is None:
+            # Installed by hand or before receipts: check multiple possible name variations,
+            # skipping folders known to come from another catalog entry
+            possible_names = entry_names(self.addon_data)
+            self.installed_addon = next((
+                addon for addon in installed_addons
+                if (addon.name.lower() in possible_names or
+                    any(name in addon.name.lower() for name in possible_names))
+                and not self._other_entry(receipts.get(addon.name))
+            ), None)
+        
+        style = self.install_btn.objectName()
+        installed_version = None
+        if self.installed_addon is not None and self.installed_addon.manifest:
+            installed_version = self.installed_addon.manifest.get('version')
+        if installed_version is None and receipt is not None and self.installed_addon is not None:
+            installed_version = receipt.version
+        
+        if self.installed_addon is not None and is_newer(self.addon_data.get('version'), installed_version):
+            self.install_btn.setText("Update")
+            self.install_btn.setEnabled(True)
+            self.install_btn.setObjectName("updateButton")
+            self.install_btn.setToolTip(f"Installed: {installed_version}")
+        elif self.installed_addon is not None:
             self.install_btn.setText("Installed")
             self.install_btn.setEnabled(False)
             self.install_btn.setObjectName("installedButton")
@@ -100,42 +192,85 @@ class BrowserAddonCard(QtWidgets.QWidget):
             self.install_btn.setEnabled(True)
             self.install_btn.setObjectName("installButton")
         
-        # Refresh button style
-        self.install_btn.style().unpolish(self.install_btn)
-        self.install_btn.style().polish(self.install_btn)
+        if self.install_btn.objectName() != "updateButton":
+            self.install_btn.setToolTip("")
+        
+        # Refresh button style, only when it changed
+        if self.install_btn.objectName() != style:
+            self.install_btn.style().unpolish(self.install_btn)
+            self.install_btn.style().polish(self.install_btn)
+    
+    def concerns(self, names, receipts):
+        """Whether a change to the addon folders `names` may change this card's status"""
+        entry_id = str(self.addon_data.get('id', '')).lower()
+        possible_names = entry_names(self.addon_data)
+        for name in names:
+            folder = name.lower()
+            if self.installed_addon is not None and self.installed_addon.name.lower() == folder:
+                return True
+            if folder in possible_names or any(n in folder for n in possible_names):
+                return True
+            receipt = receipts.get(name)
+            if receipt is not None and (receipt.catalog_id or '').lower() == entry_id:
+                return True
+        return False
+    
+    def _other_entry(self, receipt):
+        """Whether `receipt` records an install of a different catalog entry"""
+        return (receipt is not None and receipt.catalog_id is not None and
+                receipt.catalog_id.lower() != str(self.addon_data.get('id', '')).lower())
     
     def install_addon(self):
         """Install the addon from the online repository"""
         try:
-            # Construct the full download URL
-            base_url = "https://addons.ashframe.net/"
-            download_url = base_url + self.addon_data['download']
+            # Resolve dependencies before touching disk
+            assets = self.parent_window.assets
+            extras = []
+            if self.addon_data.get('dependencies'):
+                with ReceiptStore(assets) as store:
+                    receipts = store.all()
+                plan = resolve(self.parent_window.catalog_entries, list_installed(assets, disabled=True),
+                               install_ids=[self.addon_data['id']], receipts=receipts)
+                extras = plan[:-1]  # the addon itself comes last
             
             # Show progress dialog
-            progress = QtWidgets.QProgressDialog("Downloading addon...", "Cancel", 0, 0, self)
-            progress.setWindowModality(QtCore.Qt.WindowModality.WindowModal)
+            progress = InstallProgressDialog("Downloading addon...", self)
             progress.show()
             
-            # Install from URL
-            install_addon_from_url(download_url, self.parent_window.assets, overwrite=True)
+            updating = self.installed_addon is not None
+            try:
+                confirm = self.parent_window.confirm_conflicts
+                installed = install_plan(extras, assets, progress=progress, on_conflicts=confirm)
+                if updating:
+                    # Replace the installed copy, keeping its folder name
+                    installed.append(install_entry(self.addon_data, self.parent_window.assets,
+                                                   name=self.installed_addon.name, progress=progress,
+                                                   on_conflicts=confirm))
+                else:
+                    installed.append(install_addon_from_url(download_url(self.addon_data),
+                                                            self.parent_window.assets, overwrite=True,
+                                                            progress=progress,
+                                                            origin=entry_origin(self.addon_data),
+                                                            on_conflicts=confirm))
+            finally:
+                progress.close()
             
-            progress.close()
+            # Update the installed list and the cards of every addon this touched
+            self.parent_window.events.notify(*(path.name for path in installed))
             
             QtWidgets.QMessageBox.information(
                 self, 
-                'Installation Complete', 
-                f'"{self.addon_data["name"]}" has been successfully installed!'
+                'Update Complete' if updating else 'Installation Complete', 
+                f'"{self.addon_data["name"]}" has been successfully '
+                f'{"updated" if updating else "installed"}!'
+                + (f'\n\nAlso installed: {", ".join(f"{p.folder} {p.version}" for p in extras if not p.enable)}'
+                   if any(not p.enable for p in extras) else '')
+                + (f'\n\nEnabled: {", ".join(p.folder for p in extras if p.enable)}'
+                   if any(p.enable for p in extras) else '')
             )
             
-            # Update button status
-            self.update_install_status()
-            
-            # Refresh the installed addons list
-            self.parent_window.refresh()
-            
-            # Refresh all browser cards to update their status
-            self.parent_window.refresh_browser_status()
-            
+        except InstallCancelled:
+            pass
         except Exception as e:
             QtWidgets.QMessageBox.critical(
                 self, 
@@ -146,6 +281,8 @@ class BrowserAddonCard(QtWidgets.QWidget):
 
 class AddonListItem(QtWidgets.QWidget):
     """Widget representing an installed addon in the list"""
+
+    enabledToggled = QtCore.Signal(str, bool)  # addon name, enable
     
     def __init__(self, addon_info, is_default=False):
         super().__init__()
@@ -168,15 +305,18 @@ class AddonListItem(QtWidgets.QWidget):
         info_layout = QtWidgets.QVBoxLayout()
         info_layout.setSpacing(2)
         
-        # Name and version
-        name_ver = f"{addon_info.name}"
-        if addon_info.manifest and 'version' in addon_info.manifest:
-            name_ver += f" ({addon_info.manifest['version']})"
-        else:
-            name_ver += " (unknown)"
-            
-        self.name_label = QtWidgets.QLabel(name_ver)
+        # Name and version (plus disk usage, shown on the right)
+        self.name_label = QtWidgets.QLabel()
         self.name_label.setObjectName("addonName")
+        self.size_label = QtWidgets.QLabel()
+        self.size_label.setObjectName("addonSize")
+        self.size_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignRight | QtCore.Qt.AlignmentFlag.AlignVCenter)
+        # Disabled addons stay installed but are not loaded by the game
+        self.enabled_box = QtWidgets.QCheckBox("Enabled")
+        self.enabled_box.setObjectName("enabledBox")
+        self.enabled_box.setEnabled(not is_default)
+        self.enabled_box.toggled.connect(lambda on: self.enabledToggled.emit(self.addon_info.name, on))
+        self.set_addon_info(addon_info)
         info_layout.addWidget(self.name_label)
         
         # Status label
@@ -192,12 +332,33 @@ class AddonListItem(QtWidgets.QWidget):
         layout.addLayout(info_layout)
         
         layout.addStretch()
+        layout.addWidget(self.size_label)
+        layout.addWidget(self.enabled_box)
         
         # If default addon, disable lock button
         if self.is_default:
             self.lock_btn.setEnabled(False)
             self.is_locked = True
     
+    def set_addon_info(self, addon_info):
+        """Show updated addon details (e.g. after its addon.json changed)"""
+        self.addon_info = addon_info
+        name_ver = f"{addon_info.name}"
+        if addon_info.manifest and 'version' in addon_info.manifest:
+            name_ver += f" ({addon_info.manifest['version']})"
+        else:
+            name_ver += " (unknown)"
+        if not addon_info.enabled:
+            name_ver += " - disabled"
+        self.name_label.setText(name_ver)
+        self.enabled_box.blockSignals(True)
+        self.enabled_box.setChecked(addon_info.enabled)
+        self.enabled_box.blockSignals(False)
+        if addon_info.size is not None:
+            self.size_label.setText(f"{format_bytes(addon_info.size)}\n{addon_info.file_count} files")
+        else:
+            self.size_label.setText("")
+    
     def update_lock_icon(self):
         """Update the lock icon and tooltip"""
         if self.is_locked:
@@ -0,0 +1,124 @@
+"""Disk usage accounting for addon folders.
+
+Directories are scanned with `os.scandir` on a thread pool, one tree level
+at a time, so wide addons are read in parallel. Each directory's own totals
+(bytes and file count of the files directly inside it, plus its
+subdirectory names) are cached together with the directory's mtime; a
+directory whose mtime is unchanged is not listed again, so repeated queries
+only cost one `stat` per directory.
+
+A directory's mtime changes when entries are added, removed or renamed, not
+when an existing file is rewritten in place, so sizes can lag behind such
+edits until the cache is bypassed (`use_cache=False`).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import profiling
+from .core import state_dir
+
+CACHE_FILE = "usage_cache.json"
+CACHE_VERSION = 1
+
+Usage = Tuple[int, int]  # (bytes, files)
+
+
+def _scan_dir(path: str, cached: Optional[list]) -> list:
+    """Return [mtime_ns, bytes, files, subdirs] for one directory."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return [None, 0, 0, []]
+    if cached is not None and cached[0] == mtime:
+        return cached
+    size = files = 0
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        size += entry.stat(follow_symlinks=False).st_size
+                        files += 1
+                except OSError:
+                    continue
+    except OSError:
+        return [None, 0, 0, []]
+    return [mtime, size, files, sorted(subdirs)]
+
+
+class UsageCache:
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.entries: Dict[str, list] = {}
+        self.dirty = False
+        if path is not None and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("version") == CACHE_VERSION:
+                    self.entries = data["entries"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "entries": self.entries}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def tree_usage(roots: Iterable[Path], cache: UsageCache, workers: Optional[int] = None) -> Dict[Path, Usage]:
+    """Total (bytes, files) below each root, walking all roots level by level in parallel."""
+    roots = list(roots)
+    totals: Dict[Path, List[int]] = {root: [0, 0] for root in roots}
+    frontier = [(str(root), root) for root in roots]
+    seen: Dict[Path, set] = {root: set() for root in roots}
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4)) as pool:
+        while frontier:
+            results = pool.map(lambda item: _scan_dir(item[0], cache.entries.get(item[0])), frontier)
+            next_frontier = []
+            for (path, root), entry in zip(frontier, results):
+                if entry[0] is None:
+                    cache.dirty |= cache.entries.pop(path, None) is not None
+                    continue
+                if cache.entries.get(path) is not entry:
+                    cache.entries[path] = entry
+                    cache.dirty = True
+                seen[root].add(path)
+                totals[root][0] += entry[1]
+                totals[root][1] += entry[2]
+                next_frontier.extend((os.path.join(path, name), root) for name in entry[3])
+            frontier = next_frontier
+    # Forget directories that no longer exist below the scanned roots
+    for root in roots:
+        prefix = str(root) + os.sep
+        stale = [k for k in cache.entries if k.startswith(prefix) and k not in seen[root]]
+        for k in stale:
+            del cache.entries[k]
+        cache.dirty |= bool(stale)
+    return {root: (t[0], t[1]) for root, t in totals.items()}
+
+
+def addon_usage(addon_paths: Iterable[Path], assets_root: Path, workers: Optional[int] = None,
+                use_cache: bool = True) -> Dict[Path, Usage]:
+    """Map each addon folder to its (bytes, files).
+
+    Keyed by path, not name, since an enabled and a disabled addon may share
+    a folder name.
+    """
+    addon_paths = list(addon_paths)
+    cache = UsageCache(state_dir(assets_root) / CACHE_FILE if use_cache else None)
+    with profiling.span("usage", addons=len(addon_paths)):
+        usage = tree_usage(addon_paths, cache, workers)
+    cache.save()
+    return usage
@@ -0,0 +1,229 @@
+"""Deep addon validation.
+
+`validate_addon_dir` in core only checks that an addon folder looks like an
+addon. `deep_validate` goes further: it parses every JSON/ZON data file under
+the content folders and checks that every texture they reference exists.
+
+Parsing runs in a process pool. Parse results are cached per file, keyed by
+(path, size, mtime), in the manager's state folder, so revalidating an
+unchanged addon set only costs a `stat` per file. Texture existence is always
+rechecked because textures can change independently of the data files.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from . import profiling, zon
+from .core import state_dir, validate_addon_dir
+
+DATA_FOLDERS = ("blocks", "items", "biomes", "recipes")
+DATA_SUFFIXES = (".json", ".zon")
+CACHE_FILE = "validate_cache.json"
+CACHE_VERSION = 1
+# Below this many uncached files the process pool costs more than it saves.
+PARALLEL_THRESHOLD = 64
+
+
+@dataclass
+class ValidationIssue:
+    path: Path
+    message: str
+
+
+@dataclass
+class ValidationReport:
+    name: str
+    path: Path
+    issues: List[ValidationIssue] = field(default_factory=list)
+    files: int = 0
+    cached: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+
+def iter_data_files(addon_path: Path) -> Iterator[Path]:
+    """Yield every JSON/ZON file below the addon's content folders."""
+    for folder in DATA_FOLDERS:
+        top = addon_path / folder
+        if not top.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames.sort()
+            for fn in sorted(filenames):
+                if fn.lower().endswith(DATA_SUFFIXES):
+                    yield Path(dirpath) / fn
+
+
+def _collect_textures(value, out: List[str], under_texture: bool = False) -> None:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _collect_textures(item, out, under_texture or str(key).lower().startswith("texture"))
+    elif isinstance(value, list):
+        for item in value:
+            _collect_textures(item, out, under_texture)
+    elif under_texture and isinstance(value, str) and value:
+        out.append(value)
+
+
+def parse_data_file(path: str) -> dict:
+    """Parse one data file and return a picklable, JSON-serializable record.
+
+    The record has `error` (None when the file parsed) and `textures` (every
+    string found under a `texture*` key).
+    """
+    try:
+        text = Path(path).read_text(encoding="utf-8")
+        if path.lower().endswith(".json"):
+            data = json.loads(text)
+        else:
+            data = zon.loads(text)
+        textures: List[str] = []
+        _collect_textures(data, textures)
+    except RecursionError:
+        return {"error": "nested too deeply", "textures": []}
+    except (OSError, UnicodeDecodeError, ValueError, OverflowError) as e:  # OverflowError: a huge \u{...}
+        return {"error": str(e), "textures": []}
+    return {"error": None, "textures": textures}
+
+
+class ParseCache:
+    """On-disk cache of `parse_data_file` records keyed by (path, size, mtime)."""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.entries: Dict[str, list] = {}
+        self.dirty = False
+        if path is not None and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("version") == CACHE_VERSION:
+                    self.entries = data["entries"]
+            except (OSError, ValueError, KeyError):
+                self.entries = {}
+
+    @classmethod
+    def for_assets(cls, assets_root: Path) -> "ParseCache":
+        return cls(state_dir(assets_root) / CACHE_FILE)
+
+    def get(self, file: Path, st: os.stat_result) -> Optional[dict]:
+        entry = self.entries.get(str(file))
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def put(self, file: Path, st: os.stat_result, record: dict) -> None:
+        self.entries[str(file)] = [st.st_size, st.st_mtime_ns, record]
+        self.dirty = True
+
+    def prune(self, prefix: Path, keep: Iterable[str]) -> None:
+        """Drop entries below `prefix` that are not in `keep` (deleted files)."""
+        keep = set(keep)
+        root = str(prefix) + os.sep
+        stale = [k for k in self.entries if k.startswith(root) and k not in keep]
+        for k in stale:
+            del self.entries[k]
+        self.dirty = self.dirty or bool(stale)
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "entries": self.entries}), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def parse_files(files: List[Path], cache: ParseCache,
+                workers: Optional[int] = None) -> Tuple[Dict[Path, dict], Set[Path]]:
+    """Return the parse record for every file and the set of files actually parsed.
+
+    Only cache misses are parsed; everything else comes from `cache`.
+    """
+    records: Dict[Path, dict] = {}
+    misses = []
+    for f in files:
+        st = f.stat()
+        record = cache.get(f, st)
+        if record is None:
+            misses.append((f, st))
+        else:
+            records[f] = record
+    with profiling.span("validate.parse", files=len(files), parsed=len(misses)):
+        paths = [str(f) for f, _ in misses]
+        if len(misses) < PARALLEL_THRESHOLD or workers == 1:
+            results = map(parse_data_file, paths)
+            _store(misses, results, cache, records)
+        else:
+            workers = workers or os.cpu_count() or 1
+            chunksize = max(1, len(paths) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                _store(misses, pool.map(parse_data_file, paths, chunksize=chunksize), cache, records)
+    return records, {f for f, _ in misses}
+
+
+def _store(misses, results, cache: ParseCache, records: Dict[Path, dict]) -> None:
+    for (f, st), record in zip(misses, results):
+        cache.put(f, st, record)
+        records[f] = record
+
+
+def texture_candidates(ref: str, addon: str, folder: str, assets_root: Path) -> List[Path]:
+    """Files that would satisfy a texture reference like `cubyz:stone` or `stone.png`.
+
+    Unqualified references resolve against the referencing addon. A texture is
+    looked up in `<namespace>/<folder>/textures/`, then `<namespace>/textures/`
+    and finally directly in `<namespace>/`.
+    """
+    namespace, _, name = ref.rpartition(":")
+    namespace = namespace or addon
+    name = name.strip("/")
+    if not name:
+        return []
+    if not name.lower().endswith(".png"):
+        name += ".png"
+    base = assets_root / namespace
+    return [base / folder / "textures" / name, base / "textures" / name, base / name]
+
+
+def deep_validate(addons: Iterable[Path], assets_root: Path, workers: Optional[int] = None,
+                  use_cache: bool = True) -> List[ValidationReport]:
+    """Validate every addon folder in `addons` and return one report per addon."""
+    cache = ParseCache.for_assets(assets_root) if use_cache else ParseCache(None)
+    addons = list(addons)
+    files_by_addon = {addon: list(iter_data_files(addon)) for addon in addons}
+    all_files = [f for files in files_by_addon.values() for f in files]
+    with profiling.span("validate.deep", addons=len(addons), files=len(all_files)):
+        records, parsed = parse_files(all_files, cache, workers)
+        exists: Dict[Path, bool] = {}
+        reports = []
+        for addon, files in files_by_addon.items():
+            report = ValidationReport(addon.name, addon, files=len(files),
+                                      cached=sum(1 for f in files if f not in parsed))
+            if not validate_addon_dir(addon):
+                report.issues.append(ValidationIssue(addon, "no addon.json or content folders"))
+            for f in files:
+                record = records[f]
+                rel = f.relative_to(addon)
+                if record["error"]:
+                    report.issues.append(ValidationIssue(rel, record["error"]))
+                    continue
+                for ref in record["textures"]:
+                    candidates = texture_candidates(ref, addon.name, rel.parts[0], assets_root)
+                    for c in candidates:
+                        if c not in exists:
+                            exists[c] = c.is_file()
+                    if candidates and not any(exists[c] for c in candidates):
+                        report.issues.append(ValidationIssue(rel, f"missing texture {ref!r}"))
+            cache.prune(addon, (str(f) for f in files))
+            reports.append(report)
+    cache.save()
+    return reports
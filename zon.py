@@ -0,0 +1,219 @@
+"""Minimal reader for ZON (Zig Object Notation), the format of Cubyz data files.
+
+Only what appears in addon data files is supported: anonymous structs and
+tuples (`.{ .a = 1 }`, `.{ 1, 2 }`), strings including `\\\\` multiline
+strings, character literals, numbers, `true`/`false`/`null`, enum literals
+(`.stone`) and `//` comments. Structs become dicts, tuples lists and enum
+literals plain strings.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+_NUMBER = re.compile(
+    r"-?(?:0x[0-9a-fA-F_]+(?:\.[0-9a-fA-F_]+)?(?:[pP][-+]?[0-9_]+)?"
+    r"|0o[0-7_]+|0b[01_]+"
+    r"|[0-9][0-9_]*(?:\.[0-9_]+)?(?:[eE][-+]?[0-9_]+)?)"
+)
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "\\": "\\", "'": "'", '"': '"'}
+
+
+class ZonError(ValueError):
+    def __init__(self, message: str, text: str, pos: int):
+        line = text.count("\n", 0, pos) + 1
+        col = pos - (text.rfind("\n", 0, pos) + 1) + 1
+        super().__init__(f"{message} at line {line}, column {col}")
+        self.line = line
+        self.column = col
+
+
+def loads(text: str) -> Any:
+    """Parse a ZON document and return the Python value."""
+    parser = _Parser(text)
+    value = parser.value()
+    parser.skip()
+    if parser.pos != len(text):
+        raise parser.error("Unexpected trailing data")
+    return value
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def error(self, message: str) -> ZonError:
+        return ZonError(message, self.text, self.pos)
+
+    def skip(self) -> None:
+        text, n = self.text, len(self.text)
+        while self.pos < n:
+            c = text[self.pos]
+            if c in " \t\r\n\ufeff":
+                self.pos += 1
+            elif text.startswith("//", self.pos):
+                end = text.find("\n", self.pos)
+                self.pos = n if end < 0 else end + 1
+            else:
+                break
+
+    def peek(self) -> str:
+        self.skip()
+        return self.text[self.pos:self.pos + 1]
+
+    def expect(self, s: str) -> None:
+        self.skip()
+        if not self.text.startswith(s, self.pos):
+            raise self.error(f"Expected {s!r}")
+        self.pos += len(s)
+
+    def value(self) -> Any:
+        c = self.peek()
+        if not c:
+            raise self.error("Unexpected end of input")
+        if self.text.startswith(".{", self.pos):
+            return self.container()
+        if c == ".":
+            self.pos += 1
+            return self.name()
+        if c == '"':
+            return self.string()
+        if c == "\\":
+            return self.multiline_string()
+        if c == "'":
+            return self.char()
+        m = _IDENT.match(self.text, self.pos)
+        if m and m.group() in ("true", "false", "null"):
+            self.pos = m.end()
+            return {"true": True, "false": False, "null": None}[m.group()]
+        return self.number()
+
+    def name(self) -> str:
+        if self.text.startswith('@"', self.pos):
+            self.pos += 1
+            return self.string()
+        m = _IDENT.match(self.text, self.pos)
+        if not m:
+            raise self.error("Expected identifier")
+        self.pos = m.end()
+        return m.group()
+
+    def container(self) -> Any:
+        self.pos += 2  # ".{"
+        if self.peek() == "}":
+            self.pos += 1
+            return {}
+        # `.{ .name = value }` is a struct; anything else is a tuple.
+        save = self.pos
+        is_struct = False
+        if self.text.startswith(".", self.pos) and not self.text.startswith(".{", self.pos):
+            self.pos += 1
+            try:
+                self.name()
+                is_struct = self.peek() == "="
+            except ZonError:
+                pass
+        self.pos = save
+        if is_struct:
+            result: Any = {}
+            while self.peek() != "}":
+                self.expect(".")
+                key = self.name()
+                self.expect("=")
+                result[key] = self.value()
+                if self.peek() == ",":
+                    self.pos += 1
+                elif self.peek() != "}":
+                    raise self.error("Expected ',' or '}'")
+        else:
+            result = []
+            while self.peek() != "}":
+                result.append(self.value())
+                if self.peek() == ",":
+                    self.pos += 1
+                elif self.peek() != "}":
+                    raise self.error("Expected ',' or '}'")
+        self.pos += 1
+        return result
+
+    def _escape(self) -> str:
+        text = self.text
+        c = text[self.pos:self.pos + 1]
+        if c in _ESCAPES:
+            self.pos += 1
+            return _ESCAPES[c]
+        if c == "x":
+            digits = text[self.pos + 1:self.pos + 3]
+            self.pos += 3
+            return chr(int(digits, 16))
+        if c == "u" and text.startswith("u{", self.pos):
+            end = text.find("}", self.pos)
+            if end < 0:
+                raise self.error("Unterminated unicode escape")
+            code = text[self.pos + 2:end]
+            self.pos = end + 1
+            return chr(int(code, 16))
+        raise self.error("Invalid escape sequence")
+
+    def string(self) -> str:
+        self.pos += 1  # opening quote
+        text, out = self.text, []
+        while True:
+            end = self.pos
+            while end < len(text) and text[end] not in '"\\\n':
+                end += 1
+            out.append(text[self.pos:end])
+            self.pos = end
+            if end >= len(text) or text[end] == "\n":
+                raise self.error("Unterminated string")
+            self.pos += 1
+            if text[end] == '"':
+                return "".join(out)
+            out.append(self._escape())
+
+    def multiline_string(self) -> str:
+        lines = []
+        while self.text.startswith("\\\\", self.pos):
+            end = self.text.find("\n", self.pos)
+            end = len(self.text) if end < 0 else end
+            lines.append(self.text[self.pos + 2:end].rstrip("\r"))
+            self.pos = end
+            self.skip()
+        return "\n".join(lines)
+
+    def char(self) -> int:
+        self.pos += 1
+        if self.text.startswith("\\", self.pos):
+            self.pos += 1
+            c = self._escape()
+        else:
+            c = self.text[self.pos:self.pos + 1]
+            self.pos += 1
+        self.expect("'")
+        return ord(c)
+
+    def number(self) -> Any:
+        m = _NUMBER.match(self.text, self.pos)
+        if not m:
+            raise self.error("Unexpected character %r" % self.text[self.pos])
+        self.pos = m.end()
+        raw = m.group().replace("_", "")
+        return _to_number(raw)
+
+
+def _to_number(raw: str) -> Any:
+    sign, body = (-1, raw[1:]) if raw.startswith("-") else (1, raw)
+    lower = body.lower()
+    if lower.startswith("0x"):
+        if "." in lower or "p" in lower:
+            return sign * float.fromhex(body)
+        return sign * int(body, 16)
+    if lower.startswith(("0o", "0b")):
+        return sign * int(body, 0)
+    if any(c in lower for c in ".e"):
+        return sign * float(body)
+    return sign * int(body)
+